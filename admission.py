@@ -0,0 +1,210 @@
+"""
+Admission control for the Horse Racing Dashboard's AI endpoints
+Per-client rate limits, a bounded upstream queue with a deadline and a
+circuit breaker, so bursts degrade to sample answers instead of piling up
+"""
+
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+import time
+
+from scheduler import RateBudget
+
+
+class Overloaded(Exception):
+    """The upstream cannot take another call right now; serve a fallback instead"""
+
+    reason = "overloaded"
+
+    def __init__(self, retry_after: float = 1.0):
+        super().__init__(self.reason)
+        self.retry_after = retry_after
+
+
+class QueueFull(Overloaded):
+    reason = "queue_full"
+
+
+class QueueTimeout(Overloaded):
+    reason = "queue_timeout"
+
+
+class CircuitOpen(Overloaded):
+    reason = "circuit_open"
+
+
+class ClientLimiter:
+    """Token bucket per client: ``per_minute`` calls on average, ``burst`` at once
+
+    Buckets of the least recently seen clients are dropped beyond
+    ``max_clients``; a dropped client simply starts again with a full bucket.
+    """
+
+    def __init__(self, per_minute: float, burst: float, max_clients: int = 10000):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, client: str) -> float:
+        """Take one token for ``client``; 0 if allowed, else seconds until it may retry"""
+        if self.per_minute <= 0:
+            return 0.0
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = RateBudget(self.per_minute, self.burst)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        if bucket.available() < 1:
+            self.limited += 1
+            return max(0.001, bucket.seconds_until(1))
+        bucket.spend(1)
+        self.allowed += 1
+        return 0.0
+
+    def stats(self) -> dict:
+        return {
+            "per_minute": self.per_minute,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited
+        }
+
+
+class AdmissionQueue:
+    """At most ``max_concurrency`` calls in flight and ``max_queue`` waiting
+
+    A call arriving to a full queue is rejected with QueueFull at once; a
+    queued call that has not started within ``deadline_seconds`` gives up
+    with QueueTimeout. Both are cheap for the caller to turn into a fallback.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, deadline_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline_seconds = deadline_seconds
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(self.deadline_seconds)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.deadline_seconds)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise QueueTimeout(self.deadline_seconds) from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "deadline_seconds": self.deadline_seconds,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast with CircuitOpen. After ``reset_seconds`` one trial call
+    is let through (half-open): success closes the circuit, failure opens it
+    for another ``reset_seconds``.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.opens = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def check(self):
+        """Raise CircuitOpen unless a call may go ahead now"""
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial):
+            self.short_circuited += 1
+            raise CircuitOpen(self.retry_after() or 1.0)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.opens += 1
+            # A failed trial re-opens the circuit for a full period
+            self.opened_at = time.monotonic()
+
+    @contextmanager
+    def guard(self):
+        """Run one upstream call through the breaker, recording its outcome"""
+        self.check()
+        trial = self.state == "half_open"
+        if trial:
+            self.trial = True
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        else:
+            self.record_success()
+        finally:
+            if trial:
+                self.trial = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "short_circuited": self.short_circuited,
+            "retry_after_seconds": round(self.retry_after(), 1)
+        }
@@ -0,0 +1,416 @@
+"""
+AI prediction and insights service for the Horse Racing Dashboard
+Non-blocking OpenAI calls with a bounded concurrency limit and per-call timeouts
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+
+from admission import AdmissionQueue, CircuitBreaker, Overloaded
+from lazy import Lazy
+from metrics import LLM_BUCKETS, registry
+
+# Upstream limits - override via environment for tuning or local stub servers
+AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', '8'))
+AI_TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', '20'))
+AI_BATCH_SIZE = int(os.getenv('AI_BATCH_SIZE', '4'))
+AI_STREAM_IDLE_SECONDS = float(os.getenv('AI_STREAM_IDLE_SECONDS', '10'))
+AI_QUEUE_MAX = int(os.getenv('AI_QUEUE_MAX', '32'))
+AI_QUEUE_DEADLINE_SECONDS = float(os.getenv('AI_QUEUE_DEADLINE_SECONDS', '5'))
+AI_BREAKER_FAILURES = int(os.getenv('AI_BREAKER_FAILURES', '5'))
+AI_BREAKER_RESET_SECONDS = float(os.getenv('AI_BREAKER_RESET_SECONDS', '30'))
+DISCONNECT_POLL_SECONDS = 0.25
+
+PREDICTION_SYSTEM_PROMPT = "You are an expert horse racing analyst. Provide confident, data-driven predictions based on form, odds, and track conditions."
+INSIGHTS_SYSTEM_PROMPT = "You are an expert Australian horse racing analyst and betting advisor. Provide helpful, accurate insights about horse racing, betting strategies, and race analysis."
+
+# OpenAI client (optional - only if API key is available).
+# OPENAI_BASE_URL points the client at any OpenAI-compatible server, e.g. a local stub.
+# The SDK is heavy to import, so the client is created on first use or by the startup warm-up.
+def create_client():
+    from openai import AsyncOpenAI
+    client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=os.getenv('OPENAI_BASE_URL') or None)
+    print("OpenAI client initialized successfully")
+    return client
+
+
+ai_client = Lazy("ai_client", create_client)
+ai_enabled = bool(os.getenv('OPENAI_API_KEY'))
+if not ai_enabled:
+    print("Warning: OPENAI_API_KEY environment variable not set")
+
+# Caps upstream LLM calls in flight and queued across all requests; calls that
+# cannot start in time, or while the upstream keeps failing, get a fallback
+upstream_queue = AdmissionQueue(AI_MAX_CONCURRENCY, AI_QUEUE_MAX, AI_QUEUE_DEADLINE_SECONDS)
+upstream_breaker = CircuitBreaker(AI_BREAKER_FAILURES, AI_BREAKER_RESET_SECONDS)
+
+# Upstream timing and outcomes, by call type (prediction, batch, insights, stream)
+llm_wait = registry.histogram("llm_slot_wait_seconds", "Time waiting for an upstream LLM slot", ("call",))
+llm_latency = registry.histogram("llm_request_duration_seconds", "Upstream LLM call latency", ("call",), LLM_BUCKETS)
+llm_tokens = registry.counter("llm_tokens_total", "Tokens reported by the upstream LLM", ("call", "type"))
+llm_errors = registry.counter("llm_errors_total", "Failed upstream LLM calls", ("call", "error"))
+ai_fallbacks = registry.counter(
+    "ai_fallbacks_total", "AI responses served without a model answer", ("function", "reason")
+)
+
+
+# ========================================
+# Prompt Building and Parsing
+# ========================================
+
+def sample_prediction(race_data: dict) -> dict:
+    """Intelligent sample prediction from race data, used when AI is unavailable"""
+    horses = race_data.get('horses', [])
+    if horses:
+        # Pick the horse with best odds as primary pick
+        top_pick = min(horses, key=lambda h: h.get('odds', 999))
+        second_pick = sorted(horses, key=lambda h: h.get('odds', 999))[1] if len(horses) > 1 else horses[0]
+        confidence = 65 + (hash(race_data.get('id', '')) % 20)  # 65-85% confidence
+
+        return {
+            "top_pick": top_pick['name'],
+            "second_pick": second_pick['name'],
+            "confidence": confidence,
+            "analysis": f"{top_pick['name']} shows strong form with {top_pick['jockey']} in the saddle. Trainer {top_pick['trainer']} has excellent track record at {race_data.get('track', 'this track')}.",
+            "bet_type": "WIN",
+            "model": "sample_intelligent"
+        }
+
+    return {
+        "analysis": "AI predictions are not available. Using sample data instead.",
+        "confidence": 0,
+        "model": "sample"
+    }
+
+
+def degraded_prediction(race_data: dict, overload: Overloaded) -> dict:
+    """Sample prediction served while the upstream is overloaded or failing"""
+    return {
+        **sample_prediction(race_data),
+        "degraded": overload.reason,
+        "retry_after": round(overload.retry_after, 1)
+    }
+
+
+def busy_insights(overload: Overloaded) -> dict:
+    """Insight response served while the upstream is overloaded or failing"""
+    return {
+        "response": "Our AI analyst is busy right now. Please try again in a few seconds.",
+        "model": "busy",
+        "degraded": overload.reason,
+        "retry_after": round(overload.retry_after, 1)
+    }
+
+
+def format_horses(race_data: dict) -> str:
+    """Runner lines included in prediction prompts"""
+    return "\n".join([
+        f"- {h['name']}: Odds {h['odds']}, Jockey: {h['jockey']}, Trainer: {h['trainer']}, Form: {h['form']}, Trend: {h['trend']}"
+        for h in race_data.get('horses', [])[:4]
+    ])
+
+
+def build_prediction_prompt(race_data: dict) -> str:
+    """Build the race analysis prompt sent to the model"""
+    horses_info = format_horses(race_data)
+
+    return f"""Analyze this horse racing race and provide a brief, confident prediction:
+
+Race: {race_data.get('race', 'Unknown')}
+Track: {race_data.get('track', 'Unknown')}
+Distance: {race_data.get('distance', 'Unknown')}
+Class: {race_data.get('class', 'Unknown')}
+Going: {race_data.get('going', 'Unknown')}
+
+Horses:
+{horses_info}
+
+Provide:
+1. Top 2 horse predictions (horse name and confidence %)
+2. Brief analysis (1-2 sentences)
+3. Recommended bet type (WIN/PLACE/EACH WAY)
+
+Format as JSON with keys: top_pick, second_pick, confidence, analysis, bet_type"""
+
+
+def build_batch_prediction_prompt(races: list) -> str:
+    """Build one prompt covering several races, answered as JSON keyed by race id"""
+    blocks = []
+    for race_data in races:
+        horses_info = format_horses(race_data)
+        blocks.append(f"""Race ID: {race_data['id']}
+Race: {race_data.get('race', 'Unknown')}
+Track: {race_data.get('track', 'Unknown')}
+Distance: {race_data.get('distance', 'Unknown')}
+Class: {race_data.get('class', 'Unknown')}
+Going: {race_data.get('going', 'Unknown')}
+
+Horses:
+{horses_info}""")
+
+    races_info = "\n\n".join(blocks)
+    return f"""Analyze each of these horse races and provide a brief, confident prediction for every race:
+
+{races_info}
+
+For each race provide:
+1. Top 2 horse predictions (horse name and confidence %)
+2. Brief analysis (1-2 sentences)
+3. Recommended bet type (WIN/PLACE/EACH WAY)
+
+Format as a JSON object mapping each Race ID to an object with keys: top_pick, second_pick, confidence, analysis, bet_type"""
+
+
+def parse_prediction_response(ai_response: str) -> dict:
+    """Extract the JSON prediction from a model reply, falling back to raw text"""
+    try:
+        json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+    except:
+        pass
+
+    return {
+        "analysis": ai_response,
+        "confidence": 75,
+        "model": "gpt-4.1-mini"
+    }
+
+
+# ========================================
+# Upstream Calls
+# ========================================
+
+def record_error(call: str, error: Exception):
+    llm_errors.inc(call, "timeout" if isinstance(error, asyncio.TimeoutError) else type(error).__name__)
+
+
+async def complete_chat(system_prompt: str, user_prompt: str, max_tokens: int, call: str = "prediction") -> str:
+    """Run one chat completion within the admission limits and timeout
+
+    Raises Overloaded (without calling the upstream) if the queue is full,
+    the call cannot start within the queue deadline or the circuit is open.
+    """
+    upstream_breaker.check()
+    queued = time.perf_counter()
+    async with upstream_queue.slot():
+        started = time.perf_counter()
+        llm_wait.observe(started - queued, call)
+        with upstream_breaker.guard():
+            try:
+                response = await asyncio.wait_for(
+                    (await ai_client.aget()).chat.completions.create(
+                        model="gpt-4-mini",
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": system_prompt
+                            },
+                            {
+                                "role": "user",
+                                "content": user_prompt
+                            }
+                        ],
+                        temperature=0.7,
+                        max_tokens=max_tokens
+                    ),
+                    timeout=AI_TIMEOUT_SECONDS
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                record_error(call, e)
+                raise
+            finally:
+                llm_latency.observe(time.perf_counter() - started, call)
+    if response.usage:
+        llm_tokens.inc(call, "prompt", amount=response.usage.prompt_tokens)
+        llm_tokens.inc(call, "completion", amount=response.usage.completion_tokens)
+    return response.choices[0].message.content
+
+
+async def generate_ai_prediction(race_data: dict) -> dict:
+    """Generate AI-powered prediction for a race using OpenAI"""
+    if not ai_enabled:
+        # Generate intelligent sample prediction based on race data
+        ai_fallbacks.inc("prediction", "disabled")
+        return sample_prediction(race_data)
+
+    try:
+        ai_response = await complete_chat(PREDICTION_SYSTEM_PROMPT, build_prediction_prompt(race_data), 300)
+        return parse_prediction_response(ai_response)
+    except asyncio.CancelledError:
+        raise
+    except Overloaded as e:
+        ai_fallbacks.inc("prediction", e.reason)
+        return degraded_prediction(race_data, e)
+    except Exception as e:
+        print(f"Error generating AI prediction: {e!r}")
+        ai_fallbacks.inc("prediction", "error")
+        return {
+            "error": str(e) or type(e).__name__,
+            "analysis": "AI analysis temporarily unavailable"
+        }
+
+
+async def generate_ai_prediction_batch(races: list) -> dict:
+    """Generate predictions for several races with a single model request
+
+    Returns a dict of race id -> prediction. Races the model left out of its
+    reply get an error entry so callers can still return partial results.
+    """
+    if not ai_enabled:
+        ai_fallbacks.inc("prediction", "disabled", amount=len(races))
+        return {race['id']: sample_prediction(race) for race in races}
+    if len(races) == 1:
+        return {races[0]['id']: await generate_ai_prediction(races[0])}
+
+    try:
+        ai_response = await complete_chat(PREDICTION_SYSTEM_PROMPT, build_batch_prediction_prompt(races), 300 * len(races), call="batch")
+        json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+        parsed = json.loads(json_match.group()) if json_match else {}
+    except asyncio.CancelledError:
+        raise
+    except Overloaded as e:
+        ai_fallbacks.inc("prediction", e.reason, amount=len(races))
+        return {race['id']: degraded_prediction(race, e) for race in races}
+    except Exception as e:
+        print(f"Error generating batch AI prediction: {e!r}")
+        ai_fallbacks.inc("prediction", "error", amount=len(races))
+        return {
+            race['id']: {"error": str(e) or type(e).__name__, "analysis": "AI analysis temporarily unavailable"}
+            for race in races
+        }
+
+    results = {}
+    for race in races:
+        prediction = parsed.get(race['id']) if isinstance(parsed, dict) else None
+        if isinstance(prediction, dict):
+            results[race['id']] = prediction
+        else:
+            ai_fallbacks.inc("prediction", "missing")
+            results[race['id']] = {
+                "error": "Race missing from batch response",
+                "analysis": "AI analysis temporarily unavailable"
+            }
+    return results
+
+
+async def generate_ai_insights(query: str) -> dict:
+    """Generate AI insights for user queries about horse racing"""
+    if not ai_enabled:
+        ai_fallbacks.inc("insights", "disabled")
+        return {
+            "response": "AI insights are not available at this time. Please try again later.",
+            "model": "sample"
+        }
+
+    try:
+        return {
+            "response": await complete_chat(INSIGHTS_SYSTEM_PROMPT, query, 500, call="insights"),
+            "model": "gpt-4.1-mini"
+        }
+    except asyncio.CancelledError:
+        raise
+    except Overloaded as e:
+        ai_fallbacks.inc("insights", e.reason)
+        return busy_insights(e)
+    except Exception as e:
+        print(f"Error generating AI insights: {e!r}")
+        ai_fallbacks.inc("insights", "error")
+        return {
+            "error": str(e) or type(e).__name__,
+            "response": "AI insights temporarily unavailable"
+        }
+
+
+async def stream_ai_insights(query: str):
+    """Stream AI insights for a user query as text deltas
+
+    Yields each token chunk as soon as the model produces it. The upstream
+    stream is only read when the consumer asks for the next chunk, so a slow
+    client slows the upstream read instead of buffering tokens in memory.
+    Closing the generator (e.g. on client disconnect) closes the upstream
+    connection. Raises on upstream failure so the caller can report it, and
+    Overloaded before the first chunk if the upstream cannot take the call.
+    """
+    if not ai_enabled:
+        ai_fallbacks.inc("insights", "disabled")
+        yield "AI insights are not available at this time. Please try again later."
+        return
+
+    upstream_breaker.check()
+    queued = time.perf_counter()
+    async with upstream_queue.slot():
+        started = time.perf_counter()
+        llm_wait.observe(started - queued, "stream")
+        with upstream_breaker.guard():
+            try:
+                stream = await asyncio.wait_for(
+                    (await ai_client.aget()).chat.completions.create(
+                        model="gpt-4-mini",
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": INSIGHTS_SYSTEM_PROMPT
+                            },
+                            {
+                                "role": "user",
+                                "content": query
+                            }
+                        ],
+                        temperature=0.7,
+                        max_tokens=500,
+                        stream=True
+                    ),
+                    timeout=AI_TIMEOUT_SECONDS
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                record_error("stream", e)
+                raise
+            chunk_count = 0
+            try:
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        # Idle timeout between tokens rather than for the whole answer
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=AI_STREAM_IDLE_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        chunk_count += 1
+                        yield chunk.choices[0].delta.content
+            except (asyncio.CancelledError, GeneratorExit):
+                raise
+            except Exception as e:
+                record_error("stream", e)
+                raise
+            finally:
+                # Streams report no usage; each content chunk is roughly one token
+                llm_latency.observe(time.perf_counter() - started, "stream")
+                llm_tokens.inc("stream", "completion", amount=chunk_count)
+                await stream.response.aclose()
+
+
+async def cancel_on_disconnect(request, coro):
+    """Await ``coro`` but cancel it if the HTTP client disconnects first
+
+    Returns the coroutine's result, or None when the client went away.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                return None
+    finally:
+        if not task.done():
+            task.cancel()
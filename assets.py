@@ -0,0 +1,275 @@
+"""
+Static asset pipeline for the Horse Racing Dashboard
+Minifies and content-hashes CSS/JS at startup, precompresses every variant
+and serves hashed names as immutable, so repeat visits only revalidate the page
+"""
+
+import hashlib
+import os
+import re
+
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+
+from response_cache import EncodedPayload, brotli
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Hashed names change with content, so only the page itself is revalidated
+REVALIDATE = "no-cache"
+HASH_LENGTH = 12
+# Starlette appends the charset to text/* types itself
+MEDIA_TYPES = {".css": "text/css", ".js": "application/javascript; charset=utf-8", ".html": "text/html"}
+
+CSS_STRING_OR_COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+HTML_COMMENT = re.compile(r"<!--(?!\[).*?-->", re.S)
+STATIC_REFERENCE = re.compile(r'((?:href|src)=["\'])/static/([^"\'?#]+)(["\'])')
+# After these characters a "/" starts a regex literal rather than a division
+REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^") | {""}
+
+
+def minify_css(text: str) -> str:
+    """Drop comments and collapse whitespace; strings are left untouched"""
+    parts = []
+    last = 0
+    for match in CSS_STRING_OR_COMMENT.finditer(text):
+        parts.append(squeeze_css(text[last:match.start()]))
+        # Strings are kept, comments dropped
+        parts.append(match.group(1) or "")
+        last = match.end()
+    parts.append(squeeze_css(text[last:]))
+    return "".join(parts).strip()
+
+
+def squeeze_css(text: str) -> str:
+    text = CSS_PUNCTUATION.sub(r"\1", " ".join(text.split()))
+    return text.replace(";}", "}")
+
+
+def minify_js(text: str) -> str:
+    """Drop comments, indentation and blank lines
+
+    Deliberately conservative: line breaks are kept so automatic semicolon
+    insertion behaves exactly as before, and strings, template literals and
+    regex literals are copied verbatim.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    line_start = True
+    while i < n:
+        char = text[i]
+        if char == "\n":
+            while out and out[-1] in " \t":
+                out.pop()
+            if out and out[-1] != "\n":
+                out.append("\n")
+            line_start = True
+            i += 1
+            continue
+        if line_start and char in " \t\r":
+            i += 1
+            continue
+        line_start = False
+        if char in "'\"`":
+            end = skip_literal(text, i, char)
+            out.append(text[i:end])
+            i = end
+        elif text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = n if newline < 0 else newline
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            if "\n" not in text[i:end] and out and out[-1] not in " \t\n":
+                # Keep tokens either side of an inline comment apart
+                out.append(" ")
+            i = end
+        elif char == "/" and previous_token(out) in REGEX_PRECEDERS:
+            end = skip_regex(text, i)
+            out.append(text[i:end])
+            i = end
+        else:
+            if char == "\r":
+                char = ""
+            out.append(char)
+            i += 1
+    return "".join(out).strip() + "\n"
+
+
+def skip_literal(text: str, start: int, quote: str) -> int:
+    """Index just past the string or template literal opening at ``start``"""
+    i = start + 1
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == quote:
+            return i + 1
+        if quote == "`" and text.startswith("${", i):
+            i = skip_substitution(text, i + 2)
+            continue
+        i += 1
+    return len(text)
+
+
+def skip_substitution(text: str, start: int) -> int:
+    """Index just past the ``${...}`` expression whose body starts at ``start``"""
+    depth = 1
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char in "'\"`":
+            i = skip_literal(text, i, char)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(text)
+
+
+def skip_regex(text: str, start: int) -> int:
+    """Index just past the regex literal (and its flags) opening at ``start``"""
+    i = start + 1
+    in_class = False
+    while i < len(text) and text[i] != "\n":
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(text) and text[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def previous_token(out: list) -> str:
+    """Last non-whitespace character emitted so far, or "" at the start"""
+    for chunk in reversed(out):
+        stripped = chunk.rstrip()
+        if stripped:
+            return stripped[-1]
+    return ""
+
+
+def minify_html(text: str) -> str:
+    """Drop comments, indentation and blank lines; pages with <pre>/<textarea> keep their whitespace"""
+    text = HTML_COMMENT.sub("", text)
+    if "<pre" in text or "<textarea" in text:
+        return text
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip()) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+class Asset:
+    """One built file: minified bytes with gzip/brotli variants and a content ETag"""
+
+    def __init__(self, name: str, body: bytes, media_type: str):
+        digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        stem, ext = os.path.splitext(name)
+        self.name = name
+        self.hashed_name = f"{stem}.{digest}{ext}"
+        self.media_type = media_type
+        self.etag = f'"{digest}"'
+        self.payload = EncodedPayload(body)
+        # Built once at startup, so the slowest, smallest settings are affordable
+        self.payload.precompress(gzip_level=9, brotli_quality=11)
+
+    def respond(self, request_headers, cache_control: str) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control}
+        if self.etag in [tag.strip() for tag in request_headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        return self.payload.respond(request_headers.get("accept-encoding", ""), headers, self.media_type)
+
+    def stats(self) -> dict:
+        stats = {"path": self.hashed_name, "bytes": len(self.payload.body), "gzip": len(self.payload.variant("gzip"))}
+        if brotli is not None:
+            stats["br"] = len(self.payload.variant("br"))
+        return stats
+
+
+class AssetPipeline:
+    """Builds fingerprinted CSS/JS and an index page that references them
+
+    Run once at startup; edits to files under ``directory`` need a restart
+    (or ASSET_PIPELINE=0 while working on the frontend).
+    """
+
+    def __init__(self, directory: str, url_prefix: str = "/static", enabled: bool = True):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.enabled = enabled
+        self.assets = {}
+        self._hashed = {}
+        self.index = None
+        self.original_bytes = 0
+
+    def build(self, index_name: str = "index.html"):
+        if not self.enabled:
+            return
+        for name in sorted(os.listdir(self.directory)):
+            ext = os.path.splitext(name)[1]
+            minify = MINIFIERS.get(ext)
+            if minify is None:
+                continue
+            with open(os.path.join(self.directory, name), encoding="utf-8") as source:
+                text = source.read()
+            self.original_bytes += len(text.encode("utf-8"))
+            asset = Asset(name, minify(text).encode("utf-8"), MEDIA_TYPES[ext])
+            self.assets[name] = asset
+            self._hashed[asset.hashed_name] = asset
+
+        with open(os.path.join(self.directory, index_name), encoding="utf-8") as source:
+            html = source.read()
+        html = STATIC_REFERENCE.sub(self._rewrite, html)
+        self.index = Asset(index_name, minify_html(html).encode("utf-8"), MEDIA_TYPES[".html"])
+
+    def _rewrite(self, match) -> str:
+        asset = self.assets.get(match.group(2))
+        if asset is None:
+            return match.group(0)
+        return f"{match.group(1)}{self.url_prefix}/{asset.hashed_name}{match.group(3)}"
+
+    def hashed(self, path: str) -> Asset:
+        """The asset served under a fingerprinted name, if any"""
+        return self._hashed.get(path)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "source_bytes": self.original_bytes,
+            "assets": {name: asset.stats() for name, asset in self.assets.items()}
+        }
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """StaticFiles that serves pipeline assets from memory under their hashed names
+
+    ``await get_pipeline()`` returns the built AssetPipeline, so it can be
+    built lazily off the event loop. Unhashed names still come from disk, so
+    pages cached before a deploy keep working.
+    """
+
+    def __init__(self, directory: str, get_pipeline, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.get_pipeline = get_pipeline
+
+    async def get_response(self, path: str, scope) -> Response:
+        asset = (await self.get_pipeline()).hashed(path)
+        if asset is None:
+            return await super().get_response(path, scope)
+        return asset.respond(Headers(scope=scope), IMMUTABLE)
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Horse Racing Dashboard
+Synthetic race-day generator, stub LLM and load driver (python -m benchmarks.load)
+"""
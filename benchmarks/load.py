@@ -0,0 +1,363 @@
+"""
+Load driver for the Horse Racing Dashboard
+Starts the app on a synthetic race day (with a stub LLM), drives concurrent
+requests at the main endpoints and reports latency, throughput and memory
+
+    python -m benchmarks.load --races 100,1000,10000 --concurrency 32 --duration 10
+    python -m benchmarks.load --check benchmarks/thresholds.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.race_day import generate_race_day
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Per-client AI limit of the app process behind the ai_limiter scenario
+LIMITER_RATE_PER_MINUTE = 20
+LIMITER_BURST = 5
+LIMITER_RACES = 1000
+
+
+# ========================================
+# Scenarios
+# ========================================
+
+def scenario_paths(card: list, rng: random.Random) -> dict:
+    """Scenario name -> function returning the next path to request"""
+    tracks = sorted({race["track"] for race in card})
+    race_ids = [race["id"] for race in card]
+    static = ["/", "/static/app.js", "/static/style.css"]
+    return {
+        "odds": lambda: "/api/odds",
+        "odds_page": lambda: "/api/odds?compact=true&limit=100",
+        "filter": lambda: f"/api/filter?track={rng.choice(tracks)}",
+        "ai_prediction": lambda: f"/api/ai-prediction/{rng.choice(race_ids)}",
+        "static": lambda: rng.choice(static)
+    }
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def drive(client: httpx.AsyncClient, next_path, concurrency: int, duration: float) -> dict:
+    """Run ``concurrency`` request loops for ``duration`` seconds
+
+    Rate-limited (429) responses are counted apart from errors, with their
+    own latencies, so a limiter rejecting requests is not read as a fault.
+    """
+    latencies = []
+    limited = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            path = next_path()
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            if status is not None and status < 400:
+                latencies.append((time.perf_counter() - started) * 1000)
+            elif status == 429:
+                limited.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    limited.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "limited": len(limited),
+        "limited_p95_ms": round(percentile(limited, 0.95), 2),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0
+    }
+
+
+# ========================================
+# Processes
+# ========================================
+
+def memory_mb(pid: int) -> dict:
+    """Resident and peak resident memory of a process, from /proc (Linux only)"""
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                name, _, value = line.partition(":")
+                if name in ("VmRSS", "VmHWM"):
+                    usage["rss_mb" if name == "VmRSS" else "peak_rss_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return usage
+
+
+def start_server(module: str, port: int, env: dict, log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode} before becoming ready")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server not ready after {timeout}s: {url}")
+
+
+# ========================================
+# Runs
+# ========================================
+
+async def bench_card(races: int, args, workdir: str, stub_url: str) -> dict:
+    """Benchmark every scenario against one app process serving ``races`` races"""
+    card = generate_race_day(races, seed=args.seed)
+    card_path = os.path.join(workdir, f"race_day_{races}.json")
+    with open(card_path, "w") as out:
+        json.dump(card, out)
+
+    env = {
+        "RACE_CARD": card_path,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": stub_url,
+        "AI_PRECOMPUTE": "0",
+        # Every request comes from this one client; the limiter has its own scenario
+        "AI_CLIENT_RATE_PER_MINUTE": "0",
+        "HISTORY_PATH": os.path.join(workdir, f"history_{races}.bin"),
+        "SHARED_STATE": "local"
+    }
+    process = start_server("main:app", args.port, env, os.path.join(workdir, f"app_{races}.log"))
+    base_url = f"http://127.0.0.1:{args.port}"
+    result = {"races": races, "runners": sum(len(race["horses"]) for race in card), "scenarios": {}}
+    try:
+        started = time.perf_counter()
+        await wait_ready(f"{base_url}/health", process)
+        result["startup_s"] = round(time.perf_counter() - started, 2)
+        # Measure the warm app: lazily built subsystems finish in the background
+        await wait_ready(f"{base_url}/ready", process)
+        result["ready_s"] = round(time.perf_counter() - started, 2)
+        result["memory_idle"] = memory_mb(process.pid)
+
+        rng = random.Random(args.seed)
+        paths = scenario_paths(card, rng)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            for name in args.scenarios:
+                # Warm up routes and caches before measuring
+                await drive(client, paths[name], min(args.concurrency, 4), min(1.0, args.duration))
+                result["scenarios"][name] = await drive(client, paths[name], args.concurrency, args.duration)
+                print(f"  {races:>6} races  {name:<14} {format_row(result['scenarios'][name])}", flush=True)
+        result["memory"] = memory_mb(process.pid)
+    finally:
+        stop_server(process)
+    return result
+
+
+async def bench_limiter(args, workdir: str, stub_url: str) -> dict:
+    """Drive AI predictions from one client against the per-client limiter
+
+    Races are drawn from a large card so most requests miss the prediction
+    cache and need a token. Reports the driver's view (allowed, 429s and
+    their latency) next to the server's limiter counters and the budget the
+    client was entitled to.
+    """
+    card = generate_race_day(LIMITER_RACES, seed=args.seed)
+    card_path = os.path.join(workdir, "race_day_limiter.json")
+    with open(card_path, "w") as out:
+        json.dump(card, out)
+
+    env = {
+        "RACE_CARD": card_path,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": stub_url,
+        "AI_PRECOMPUTE": "0",
+        "AI_CLIENT_RATE_PER_MINUTE": str(LIMITER_RATE_PER_MINUTE),
+        "AI_CLIENT_BURST": str(LIMITER_BURST),
+        "HISTORY_PATH": os.path.join(workdir, "history_limiter.bin"),
+        "SHARED_STATE": "local"
+    }
+    process = start_server("main:app", args.port, env, os.path.join(workdir, "app_limiter.log"))
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_ready(f"{base_url}/ready", process)
+        rng = random.Random(args.seed)
+        race_ids = [race["id"] for race in card]
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            started = time.perf_counter()
+            row = await drive(client, lambda: f"/api/ai-prediction/{rng.choice(race_ids)}", args.concurrency, args.duration)
+            elapsed = time.perf_counter() - started
+            row["server"] = (await client.get("/health")).json()["ai_admission"]["clients"]
+        row["budget"] = round(LIMITER_BURST + LIMITER_RATE_PER_MINUTE * elapsed / 60, 1)
+    finally:
+        stop_server(process)
+    return row
+
+
+def format_row(row: dict) -> str:
+    return (
+        f"{row['rps']:>9.1f} rps  p50 {row['p50_ms']:>8.2f}  p95 {row['p95_ms']:>8.2f}  "
+        f"p99 {row['p99_ms']:>8.2f} ms  errors {row['errors']}  429s {row['limited']}"
+    )
+
+
+def check_thresholds(results: list, thresholds: dict, limiter: dict = None) -> list:
+    """Threshold breaches as readable strings (empty if everything passed)
+
+    ``thresholds`` maps a race count to ``{"max_rss_mb": n, "<scenario>":
+    {"p95_ms": n, "p99_ms": n, "min_rps": n, "max_errors": n, "max_limited": n}}``;
+    any key may be left out. Race counts without thresholds are not checked.
+    The ``ai_limiter`` entry, ``{"limited_p95_ms": n, "max_errors": n}``,
+    checks the limiter run: it must reject the client once its budget is
+    spent, never admit more model calls than the budget, and reject quickly.
+    """
+    breaches = []
+    limit = thresholds.get("ai_limiter")
+    if limiter is not None and limit is not None:
+        if limiter["limited"] == 0:
+            breaches.append("ai_limiter: no requests were rate limited (429)")
+        if limiter["server"]["allowed"] > limiter["budget"]:
+            breaches.append(f"ai_limiter: {limiter['server']['allowed']} model calls allowed > budget {limiter['budget']}")
+        if "limited_p95_ms" in limit and limiter["limited_p95_ms"] > limit["limited_p95_ms"]:
+            breaches.append(f"ai_limiter: 429 p95 {limiter['limited_p95_ms']} ms > {limit['limited_p95_ms']}")
+        if limiter["errors"] > limit.get("max_errors", 0):
+            breaches.append(f"ai_limiter: {limiter['errors']} errors (not 429)")
+    for result in results:
+        limits = thresholds.get(str(result["races"]))
+        if not limits:
+            continue
+        label = f"{result['races']} races"
+        peak = result.get("memory", {}).get("peak_rss_mb")
+        if "max_rss_mb" in limits and peak is not None and peak > limits["max_rss_mb"]:
+            breaches.append(f"{label}: peak RSS {peak} MB > {limits['max_rss_mb']} MB")
+        for name, row in result["scenarios"].items():
+            limit = limits.get(name, {})
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                if key in limit and row[key] > limit[key]:
+                    breaches.append(f"{label} {name}: {key} {row[key]} > {limit[key]}")
+            if "min_rps" in limit and row["rps"] < limit["min_rps"]:
+                breaches.append(f"{label} {name}: {row['rps']} rps < {limit['min_rps']}")
+            if row["errors"] > limit.get("max_errors", 0):
+                breaches.append(f"{label} {name}: {row['errors']} errors")
+            if row["limited"] > limit.get("max_limited", 0):
+                breaches.append(f"{label} {name}: {row['limited']} rate limited (429)")
+    return breaches
+
+
+async def run(args) -> tuple:
+    results = []
+    limiter = None
+    with tempfile.TemporaryDirectory(prefix="racing-bench-") as workdir:
+        stub = start_server(
+            "benchmarks.stub_llm:app", args.stub_port,
+            {"STUB_DELAY_SECONDS": str(args.stub_delay)}, os.path.join(workdir, "stub.log")
+        )
+        try:
+            await wait_ready(f"http://127.0.0.1:{args.stub_port}/calls", stub)
+            for races in args.races:
+                print(f"Benchmarking {races} races", flush=True)
+                results.append(await bench_card(races, args, workdir, f"http://127.0.0.1:{args.stub_port}/v1"))
+                memory = results[-1].get("memory", {})
+                print(
+                    f"  startup {results[-1]['startup_s']}s, ready {results[-1]['ready_s']}s, RSS {memory.get('rss_mb')} MB "
+                    f"(peak {memory.get('peak_rss_mb')} MB)", flush=True
+                )
+            if args.limiter:
+                print(f"Benchmarking the AI limiter ({LIMITER_RATE_PER_MINUTE}/min, burst {LIMITER_BURST}, one client)", flush=True)
+                limiter = await bench_limiter(args, workdir, f"http://127.0.0.1:{args.stub_port}/v1")
+                print(
+                    f"  {limiter['requests']} allowed, {limiter['limited']} 429s (p95 {limiter['limited_p95_ms']} ms), "
+                    f"errors {limiter['errors']}; server allowed {limiter['server']['allowed']} of budget {limiter['budget']}",
+                    flush=True
+                )
+        finally:
+            stop_server(stub)
+    return results, limiter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Horse Racing Dashboard on synthetic race days")
+    parser.add_argument("--races", default="100,1000,10000", help="comma-separated card sizes")
+    parser.add_argument("--scenarios", default="odds,odds_page,filter,ai_prediction,static",
+                        help="comma-separated: odds, odds_page, filter, ai_prediction, static")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--stub-delay", type=float, default=0.2, help="stub LLM latency in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stub-port", type=int, default=8766)
+    parser.add_argument("--no-limiter", dest="limiter", action="store_false",
+                        help="skip the ai_limiter run against the per-client AI limit")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--check", help="thresholds file; exit 1 if any is breached")
+    args = parser.parse_args()
+    args.races = [int(races) for races in args.races.split(",") if races.strip()]
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(scenario_paths([], random.Random()))
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results, limiter = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump({"cards": results, "ai_limiter": limiter}, out, indent=2)
+
+    if args.check:
+        with open(args.check) as limits:
+            breaches = check_thresholds(results, json.load(limits), limiter)
+        if breaches:
+            print("Regression thresholds breached:")
+            for breach in breaches:
+                print(f"  {breach}")
+            sys.exit(1)
+        print("All regression thresholds passed")
+
+
+if __name__ == "__main__":
+    main()
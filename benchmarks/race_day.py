@@ -0,0 +1,151 @@
+"""
+Synthetic race-day generator for benchmarks
+Realistic cards at any scale across every venue in AUSTRALIAN_TRACKS, plus odds ticks
+"""
+
+import argparse
+import json
+import math
+import random
+
+from tracks import AUSTRALIAN_TRACKS
+
+FIRST_JUMP_MINUTES = 11 * 60
+LAST_JUMP_MINUTES = 21 * 60 + 55
+RACE_GAP_MINUTES = 35
+MARKET_OVERROUND = 1.16
+
+DISTANCES = ["1000m", "1100m", "1200m", "1400m", "1600m", "1800m", "2000m", "2400m", "3200m"]
+CLASSES = ["Maiden", "Class 1", "Class 2", "Class 3", "Benchmark 64", "Benchmark 78", "Listed", "Group 3", "Group 2", "Group 1"]
+PRIZES = ["$35,000", "$50,000", "$75,000", "$100,000", "$125,000", "$200,000", "$500,000", "$1,000,000"]
+GOINGS = ["Firm", "Good", "Good", "Good", "Soft", "Soft", "Heavy"]
+NAME_WORDS = [
+    "Thunder", "Silver", "Golden", "Midnight", "Royal", "Storm", "Desert", "Coral", "Outback", "Southern",
+    "Lightning", "Wild", "Blue", "Red", "Crimson", "Iron", "Velvet", "Shadow", "Star", "River",
+    "Bullet", "Phoenix", "Express", "Runner", "Flame", "Dancer", "Reef", "Comet", "Legend", "Spirit",
+    "Heat", "Breeze", "Rocket", "Charm", "Echo", "Harbour", "Ridge", "Arrow", "Crown", "Dream"
+]
+JOCKEYS = [
+    "James McDonald", "Hugh Bowman", "Tommy Berry", "Blake Shinn", "Damien Oliver", "Kerrin McEvoy",
+    "Craig Williams", "Mark Zahra", "Jamie Kah", "Nash Rawiller", "Rachel King", "Zac Purton",
+    "Ryan Maloney", "Jye McNeil", "Ben Melham", "Tim Clark", "Sam Clipperton", "Regan Bayliss"
+]
+TRAINERS = [
+    "Chris Waller", "Gai Waterhouse", "Peter Snowden", "John O'Shea", "Ciaron Maher", "Mick Price",
+    "Lindsay Park", "Annabel Neasham", "Tony McEvoy", "Kris Lees", "Grahame Begg", "Tony Gollan",
+    "Adam Durrant", "Matthew Smith", "Bjorn Baker", "Anthony Freedman"
+]
+
+
+def format_jump(minutes: int) -> str:
+    """'2:15 PM' style jump time, as used in race names"""
+    hour, minute = divmod(minutes, 60)
+    suffix = "PM" if hour >= 12 else "AM"
+    return f"{(hour - 1) % 12 + 1}:{minute:02d} {suffix}"
+
+
+def market_odds(rng: random.Random, runners: int) -> list:
+    """Win odds for a field: lognormal strengths priced with a bookmaker overround"""
+    strengths = [rng.lognormvariate(0, 0.8) for _ in range(runners)]
+    total = sum(strengths)
+    return [max(1.2, round(1 / (strength / total * MARKET_OVERROUND), 2)) for strength in strengths]
+
+
+def generate_race_day(races: int, seed: int = 1, min_runners: int = 8, max_runners: int = 24) -> list:
+    """A card of ``races`` races in the SAMPLE_RACES format
+
+    Races are dealt round-robin to every venue, so each venue holds a
+    meeting with jumps RACE_GAP_MINUTES apart (wrapping within the racing
+    day when a meeting is very long). Every tenth race is featured.
+    """
+    rng = random.Random(seed)
+    venues = [(state, track) for state, tracks in AUSTRALIAN_TRACKS.items() for track in tracks]
+    starts = {track: FIRST_JUMP_MINUTES + rng.randrange(0, 60, 5) for _, track in venues}
+    span = LAST_JUMP_MINUTES - FIRST_JUMP_MINUTES
+    card = []
+    for index in range(races):
+        state, track = venues[index % len(venues)]
+        race_number = index // len(venues)
+        jump = FIRST_JUMP_MINUTES + (starts[track] - FIRST_JUMP_MINUTES + race_number * RACE_GAP_MINUTES) % span
+        runners = rng.randint(min_runners, max_runners)
+        used_names = set()
+        horses = []
+        for number, odds in enumerate(market_odds(rng, runners), start=1):
+            name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)}"
+            while name in used_names:
+                name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)}"
+            used_names.add(name)
+            trend = rng.choice(["up", "down", "stable"])
+            move = 0.0 if trend == "stable" else round(rng.uniform(0.1, 1.0), 1)
+            horses.append({
+                "name": name,
+                "number": number,
+                "odds": odds,
+                "place_odds": round(1 + (odds - 1) / (4 if runners >= 8 else 3), 2),
+                "jockey": rng.choice(JOCKEYS),
+                "trainer": rng.choice(TRAINERS),
+                "weight": f"{rng.randint(53, 60)}kg",
+                "form": "-".join(str(rng.choice([1, 2, 3, 4, 5, 6, 7, 8, 9, 0])) for _ in range(rng.randint(3, 5))),
+                "trend": trend,
+                "trendValue": "0.0" if trend == "stable" else f"{move if trend == 'up' else -move:+.1f}"
+            })
+        card.append({
+            "id": f"bd{index + 1}",
+            "race": f"{track} R{race_number + 1} - {format_jump(jump)}",
+            "track": track,
+            "state": state,
+            "distance": rng.choice(DISTANCES),
+            "class": rng.choice(CLASSES),
+            "prize": rng.choice(PRIZES),
+            "going": rng.choice(GOINGS),
+            "featured": index % 10 == 0,
+            "horses": horses
+        })
+    return card
+
+
+def generate_ticks(card: list, ticks: int, seed: int = 1, start_ts: float = 0.0, per_second: float = 200.0):
+    """Odds ticks (ingestion format) drifting runners' prices as a random walk"""
+    rng = random.Random(seed)
+    prices = {}
+    for tick in range(ticks):
+        race = rng.choice(card)
+        horse = rng.choice(race["horses"])
+        key = (race["id"], horse["number"])
+        odds = prices.get(key, horse["odds"])
+        odds = max(1.2, round(odds * math.exp(rng.gauss(0, 0.04)), 2))
+        prices[key] = odds
+        yield {
+            "race_id": race["id"],
+            "number": horse["number"],
+            "odds": odds,
+            "place_odds": round(1 + (odds - 1) / 4, 2),
+            "ts": round(start_ts + tick / per_second, 3)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic race day")
+    parser.add_argument("--races", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-runners", type=int, default=8)
+    parser.add_argument("--max-runners", type=int, default=24)
+    parser.add_argument("--out", default="race_day.json", help="card file, loadable with RACE_CARD")
+    parser.add_argument("--ticks", type=int, default=0, help="also write this many odds ticks")
+    parser.add_argument("--ticks-out", default="ticks.jsonl", help="tick file, replayable with ODDS_FEED=replay:<file>")
+    args = parser.parse_args()
+
+    card = generate_race_day(args.races, args.seed, args.min_runners, args.max_runners)
+    with open(args.out, "w") as out:
+        json.dump(card, out)
+    print(f"Wrote {len(card)} races ({sum(len(race['horses']) for race in card)} runners) to {args.out}")
+
+    if args.ticks:
+        with open(args.ticks_out, "w") as out:
+            for tick in generate_ticks(card, args.ticks, args.seed):
+                out.write(json.dumps(tick) + "\n")
+        print(f"Wrote {args.ticks} ticks to {args.ticks_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Stub LLM for benchmarks
+A minimal OpenAI-compatible chat completions server with a fixed delay, so
+AI endpoints can be load tested without calling (or paying for) a real model
+"""
+
+import asyncio
+import json
+import os
+import re
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+app = FastAPI(title="Stub LLM")
+
+STUB_DELAY_SECONDS = float(os.getenv('STUB_DELAY_SECONDS', '0.2'))
+STUB_STREAM_CHUNKS = int(os.getenv('STUB_STREAM_CHUNKS', '10'))
+
+PREDICTION = {
+    "top_pick": "Stub Runner",
+    "second_pick": "Stub Runner Up",
+    "confidence": 75,
+    "analysis": "Benchmark stub prediction.",
+    "bet_type": "WIN"
+}
+calls = {"completions": 0, "streams": 0}
+
+
+def completion(model: str, content: str) -> dict:
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 200, "completion_tokens": 60, "total_tokens": 260}
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    """Prediction JSON after STUB_DELAY_SECONDS, keyed by race for batch prompts"""
+    model = body.get("model", "stub")
+    if body.get("stream"):
+        calls["streams"] += 1
+        return StreamingResponse(stream_chunks(model), media_type="text/event-stream")
+
+    calls["completions"] += 1
+    await asyncio.sleep(STUB_DELAY_SECONDS)
+    prompt = body["messages"][-1]["content"]
+    race_ids = re.findall(r"Race ID: (\S+)", prompt)
+    content = json.dumps({race_id: PREDICTION for race_id in race_ids} if race_ids else PREDICTION)
+    return completion(model, content)
+
+
+async def stream_chunks(model: str):
+    for index in range(STUB_STREAM_CHUNKS):
+        await asyncio.sleep(STUB_DELAY_SECONDS / STUB_STREAM_CHUNKS)
+        chunk = {
+            "id": "stub",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": f"Insight {index}. "}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/calls")
+async def get_calls():
+    return calls
@@ -0,0 +1,222 @@
+"""
+Exotic bet pricing for the Horse Racing Dashboard
+Harville finishing-order probabilities from win odds as NumPy arrays:
+quinella, exacta, trifecta and first four, plus dutching stakes
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Runners that fill each exotic, in finishing order
+BET_PLACES = {"quinella": 2, "exacta": 2, "trifecta": 3, "first4": 4}
+# Typical Australian tote commissions, used to turn fair prices into dividend estimates
+TAKEOUT = {"win": 0.145, "quinella": 0.175, "exacta": 0.20, "trifecta": 0.21, "first4": 0.23}
+
+
+def win_probabilities(odds: list) -> np.ndarray:
+    """Win probabilities implied by decimal odds with the overround removed
+
+    Runners without a price above 1.0 (e.g. scratched) get probability 0.
+    """
+    odds = np.array([price if price else np.nan for price in odds], dtype=float)
+    valid = odds > 1.0
+    implied = np.where(valid, 1.0 / np.where(valid, odds, 1.0), 0.0)
+    total = implied.sum()
+    return implied / total if total > 0 else implied
+
+
+def order_probabilities(p: np.ndarray, places: int) -> np.ndarray:
+    """Harville probability of every finishing order of ``places`` runners
+
+    Returns an array with one axis per place: ``[i, j]`` is P(i wins, j runs
+    second), ``[i, j, k]`` adds k third, and so on. Each place is won in
+    proportion to the win probabilities of the runners still left, so the
+    whole tensor comes from broadcasting: P(next = k | gone) = p_k / (1 - sum
+    of gone). Orders repeating a runner are 0.
+    """
+    n = len(p)
+    probability = p.copy()
+    # Win probability already placed along each partial order
+    taken = p.copy()
+    for place in range(1, places):
+        following = p.reshape((1,) * place + (n,))
+        remaining = np.maximum(1.0 - taken, 1e-12)
+        probability = probability[..., None] * following / remaining[..., None]
+        # A runner cannot fill two places
+        probability *= distinct_mask(n, place + 1)
+        taken = taken[..., None] + following
+    return probability
+
+
+@lru_cache(maxsize=64)
+def distinct_mask(n: int, places: int) -> np.ndarray:
+    """True where all ``places`` indices differ; cached per field size, so treat as read-only"""
+    grids = np.indices((n,) * places, sparse=True)
+    mask = np.ones((n,) * places, dtype=bool)
+    for a in range(places):
+        for b in range(a + 1, places):
+            mask &= grids[a] != grids[b]
+    mask.flags.writeable = False
+    return mask
+
+
+def bet_probabilities(p: np.ndarray, bet: str) -> np.ndarray:
+    """Probability of each combination of ``bet``; quinellas are symmetric, the rest ordered"""
+    probability = order_probabilities(p, BET_PLACES[bet])
+    if bet == "quinella":
+        probability = probability + probability.T
+    return probability
+
+
+def top_combinations(probability: np.ndarray, bet: str, limit: int) -> list:
+    """(positions tuple, probability) of the ``limit`` likeliest combinations"""
+    flat = probability
+    if bet == "quinella":
+        # Each unordered pair once
+        flat = np.triu(probability, 1)
+    flat = flat.ravel()
+    limit = min(limit, int(np.count_nonzero(flat)))
+    if limit <= 0:
+        return []
+    best = np.argpartition(-flat, limit - 1)[:limit]
+    best = best[np.argsort(-flat[best], kind="stable")]
+    return [
+        (tuple(int(index) for index in np.unravel_index(position, probability.shape)), float(flat[position]))
+        for position in best
+    ]
+
+
+def selection_probability(probability: np.ndarray, bet: str, legs: list) -> tuple:
+    """(probability, combinations) covered by a selection
+
+    ``legs`` holds one list of runner positions per place, or a single list
+    for a box (any order; for quinellas any two of them). A two-leg
+    quinella covers the pairs with one runner from each leg, in either order.
+    """
+    places = BET_PLACES[bet]
+    n = probability.shape[0]
+    if len(legs) == 1:
+        runners = sorted(set(legs[0]))
+        chosen = np.zeros(n, dtype=bool)
+        chosen[runners] = True
+        mask = chosen
+        for _ in range(places - 1):
+            mask = mask[..., None] & chosen
+        return covered_by(probability, bet, mask & distinct_mask(n, places))
+    if len(legs) != places:
+        raise ValueError(f"A {bet} needs {places} legs or a single box")
+    if bet == "quinella":
+        # Either leg may fill either place: leg1 x leg2 plus leg2 x leg1
+        first, second = (np.zeros(n, dtype=bool) for _ in range(2))
+        first[sorted(set(legs[0]))] = True
+        second[sorted(set(legs[1]))] = True
+        mask = np.outer(first, second) | np.outer(second, first)
+        return covered_by(probability, bet, mask & distinct_mask(n, places))
+    index = np.ix_(*[sorted(set(leg)) for leg in legs])
+    combinations = int(np.count_nonzero(distinct_mask(n, places)[index]))
+    return float(probability[index].sum()), combinations
+
+
+def covered_by(probability: np.ndarray, bet: str, mask: np.ndarray) -> tuple:
+    """(probability, combinations) of the combinations in a boolean mask
+
+    Quinella tables hold each pair twice (symmetric), so only pairs above
+    the diagonal are counted.
+    """
+    if bet == "quinella":
+        mask = np.triu(mask, 1)
+    return float(probability[mask].sum()), int(np.count_nonzero(mask))
+
+
+def dutch(odds: list, stake: float) -> list:
+    """Stakes splitting ``stake`` so every selection returns the same amount
+
+    Each stake is proportional to the selection's implied probability
+    (1/odds); returns (stake, return) per selection.
+    """
+    implied = [1.0 / price for price in odds]
+    total = sum(implied)
+    stakes = [stake * share / total for share in implied]
+    return [(round(amount, 2), round(amount * price, 2)) for amount, price in zip(stakes, odds)]
+
+
+class ExoticPricer:
+    """Prices exotics and dutches for one race from its runners' win odds"""
+
+    def __init__(self, race: dict):
+        self.race = race
+        self.horses = race.get("horses", [])
+        self.numbers = [horse.get("number") for horse in self.horses]
+        self.position = {number: index for index, number in enumerate(self.numbers)}
+        self.p = win_probabilities([horse.get("odds") for horse in self.horses])
+        self._probabilities = {}
+
+    def probabilities(self, bet: str) -> np.ndarray:
+        if bet not in self._probabilities:
+            self._probabilities[bet] = bet_probabilities(self.p, bet)
+        return self._probabilities[bet]
+
+    def positions(self, numbers: list) -> list:
+        """Runner positions for saddlecloth numbers; raises ValueError for unknown, unpriced or repeated runners"""
+        if not numbers:
+            raise ValueError("No runners selected")
+        positions = []
+        for number in numbers:
+            if numbers.count(number) > 1:
+                raise ValueError(f"Runner {number} is listed more than once")
+            position = self.position.get(number)
+            if position is None:
+                raise ValueError(f"No runner number {number}")
+            if self.p[position] == 0:
+                raise ValueError(f"Runner {number} has no win price")
+            positions.append(position)
+        return positions
+
+    def quote(self, bet: str, probability: float) -> dict:
+        fair = 1.0 / probability if probability > 0 else None
+        return {
+            "probability": round(probability, 6),
+            "fair_price": round(fair, 2) if fair else None,
+            "estimated_dividend": round(fair * (1 - TAKEOUT[bet]), 2) if fair else None
+        }
+
+    def top(self, bet: str, limit: int) -> list:
+        """Likeliest combinations with their fair prices"""
+        return [
+            {"runners": [self.numbers[index] for index in order], **self.quote(bet, probability)}
+            for order, probability in top_combinations(self.probabilities(bet), bet, limit)
+        ]
+
+    def price_selection(self, bet: str, legs: list, stake: float = None) -> dict:
+        """Chance, price and flexi percentage of a selection given as saddlecloth numbers per leg"""
+        probability, combinations = selection_probability(
+            self.probabilities(bet), bet, [self.positions(leg) for leg in legs]
+        )
+        if not combinations:
+            # e.g. a two-runner trifecta box, or a standout with the same runner in every leg
+            raise ValueError(f"This selection covers no {bet} combinations (it needs {BET_PLACES[bet]} different runners)")
+        selection = {"bet": bet, "legs": legs, "combinations": combinations, **self.quote(bet, probability)}
+        if stake and combinations:
+            selection["stake"] = stake
+            selection["flexi_percent"] = round(100 * stake / combinations, 2)
+        return selection
+
+    def dutch(self, numbers: list, stake: float) -> dict:
+        """Equal-return stakes across runners, with the model's chance of a collect"""
+        positions = self.positions(numbers)
+        odds = [self.horses[position]["odds"] for position in positions]
+        stakes = dutch(odds, stake)
+        collect = stakes[0][1] if stakes else 0.0
+        chance = float(self.p[positions].sum())
+        return {
+            "stake": stake,
+            "runners": [
+                {"number": number, "horse": self.horses[position].get("name"), "odds": price, "stake": amount, "return": paid}
+                for number, position, price, (amount, paid) in zip(numbers, positions, odds, stakes)
+            ],
+            "return": collect,
+            "profit": round(collect - stake, 2),
+            "probability": round(chance, 4),
+            "expected_profit": round(chance * collect - stake, 2)
+        }
@@ -0,0 +1,302 @@
+"""
+Odds feed ingestion for the Horse Racing Dashboard
+Consumes a tick stream from a pluggable source and applies batches as
+copy-on-write race snapshots
+"""
+
+import asyncio
+import importlib
+import json
+import math
+import time
+from abc import ABC, abstractmethod
+
+# Fields a tick may change; anything else in a tick is ignored
+RUNNER_TICK_FIELDS = ("odds", "place_odds")
+RACE_TICK_FIELDS = ("going",)
+
+
+# ========================================
+# Tick Sources
+# ========================================
+
+class TickSource(ABC):
+    """Base class for odds feeds
+
+    A tick is a dict with ``race_id``, optionally ``number`` (saddlecloth) and
+    ``ts`` (epoch seconds), plus the fields that changed, e.g.
+    ``{"race_id": "hr1", "number": 1, "odds": 3.4, "place_odds": 1.7}``.
+    """
+
+    @abstractmethod
+    def ticks(self):
+        """Async iterator of ticks; ends when the feed is exhausted"""
+
+
+class QueueSource(TickSource):
+    """In-process feed: anything put on ``queue`` is ingested (None ends the feed)"""
+
+    def __init__(self, max_pending: int = 10000):
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    async def ticks(self):
+        while True:
+            tick = await self.queue.get()
+            if tick is None:
+                return
+            yield tick
+
+
+class ReplaySource(TickSource):
+    """Replays ticks from a JSON-lines file, for testing and load generation
+
+    With ``speed`` set, ticks are paced by their ``ts`` gaps divided by
+    ``speed``; with ``speed=0`` they are replayed as fast as possible.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+
+    async def ticks(self):
+        while True:
+            previous_ts = None
+            with open(self.path) as feed:
+                for line in feed:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    tick = json.loads(line)
+                    ts = tick.get("ts")
+                    if self.speed and ts is not None and previous_ts is not None and ts > previous_ts:
+                        await asyncio.sleep((ts - previous_ts) / self.speed)
+                    previous_ts = ts
+                    yield tick
+            if not self.loop:
+                return
+            await asyncio.sleep(0)
+
+
+def source_from_spec(spec: str) -> TickSource:
+    """Build a tick source from a spec string
+
+    ``replay:<path>[,speed=<x>][,loop]`` replays a JSON-lines file;
+    ``python:<module>:<callable>`` calls a factory returning a TickSource.
+    """
+    kind, _, target = spec.partition(":")
+    if kind == "replay":
+        path, *options = target.split(",")
+        speed = 1.0
+        loop = False
+        for option in options:
+            name, _, value = option.partition("=")
+            if name == "speed":
+                speed = float(value)
+            elif name == "loop":
+                loop = True
+        return ReplaySource(path, speed=speed, loop=loop)
+    if kind == "python":
+        module_name, _, factory = target.partition(":")
+        return getattr(importlib.import_module(module_name), factory)()
+    raise ValueError(f"Unknown odds feed: {spec}")
+
+
+# ========================================
+# Applying Ticks
+# ========================================
+
+def clean_tick(tick) -> dict:
+    """A copy of ``tick`` with its number, prices and timestamp coerced, or None if malformed
+
+    Numbers must be whole, prices finite decimal odds above 1.0 and
+    timestamps finite, so one bad tick cannot poison the history or rankings.
+    """
+    if not isinstance(tick, dict) or not isinstance(tick.get("race_id"), str):
+        return None
+    tick = dict(tick)
+    try:
+        if tick.get("number") is not None:
+            number = tick["number"]
+            if isinstance(number, bool) or float(number) != int(float(number)):
+                return None
+            tick["number"] = int(float(number))
+        for field in RUNNER_TICK_FIELDS:
+            if field in tick:
+                price = float(tick[field])
+                if not (math.isfinite(price) and price > 1.0):
+                    return None
+                tick[field] = price
+        if tick.get("ts") is not None:
+            tick["ts"] = float(tick["ts"])
+            if not math.isfinite(tick["ts"]):
+                return None
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return tick
+
+
+def apply_ticks(get_race, ticks: list) -> tuple:
+    """Apply a batch of ticks copy-on-write
+
+    Returns ``(updated_races, applied_ticks, skipped, invalid)``: the
+    accepted ticks as coerced by clean_tick, the number of ticks for unknown
+    races or runners and the number of malformed ticks dropped. Published
+    races and runners are never mutated: every touched race and runner is a
+    fresh copy, so readers of the current snapshot never see a half-applied
+    batch.
+    """
+    updated = {}
+    copied = {}
+    applied = []
+    skipped = 0
+    invalid = 0
+    for tick in ticks:
+        tick = clean_tick(tick)
+        if tick is None:
+            invalid += 1
+            continue
+        race_id = tick["race_id"]
+        race = updated.get(race_id)
+        if race is None:
+            current = get_race(race_id)
+            if current is None:
+                skipped += 1
+                continue
+            race = dict(current)
+            race["horses"] = list(current.get("horses", []))
+            updated[race_id] = race
+            copied[race_id] = set()
+
+        number = tick.get("number")
+        if number is None:
+            for field in RACE_TICK_FIELDS:
+                if field in tick:
+                    race[field] = tick[field]
+            applied.append(tick)
+            continue
+
+        for index, horse in enumerate(race["horses"]):
+            if horse.get("number") == number:
+                if number not in copied[race_id]:
+                    horse = dict(horse)
+                    race["horses"][index] = horse
+                    copied[race_id].add(number)
+                for field in RUNNER_TICK_FIELDS:
+                    if field in tick:
+                        horse[field] = tick[field]
+                applied.append(tick)
+                break
+        else:
+            skipped += 1
+
+    return list(updated.values()), applied, skipped, invalid
+
+
+class OddsIngestor:
+    """Batches ticks from a source and hands each batch to ``apply``
+
+    A batch is flushed when it reaches ``batch_size`` ticks or when
+    ``batch_interval`` seconds have passed since its first tick. ``apply``
+    receives the list of ticks, runs on the event loop and returns the
+    numbers of ticks it skipped and of malformed ticks it dropped. A batch
+    that fails to apply is logged and dropped; the feed carries on.
+    """
+
+    def __init__(self, source: TickSource, apply, batch_size: int = 500, batch_interval: float = 0.25):
+        self.source = source
+        self.apply = apply
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._task = None
+        self.ticks = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.failed_batches = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+        self.last_batch_at = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def flush(self, batch: list):
+        started = time.perf_counter()
+        try:
+            skipped, invalid = self.apply(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            print(f"Error applying {len(batch)} odds ticks, batch dropped: {e!r}")
+            return
+        self.skipped += skipped
+        self.invalid += invalid
+        self.last_batch_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.ticks += len(batch)
+        self.batches += 1
+        self.last_batch_at = time.time()
+
+    async def _run(self):
+        ticks = self.source.ticks().__aiter__()
+        batch = []
+        pending = None
+        deadline = None
+        finished = False
+        try:
+            while not finished:
+                if pending is None:
+                    pending = asyncio.ensure_future(ticks.__anext__())
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+
+                if pending in done:
+                    try:
+                        tick = pending.result()
+                    except StopAsyncIteration:
+                        # The last partial batch is flushed below
+                        finished = True
+                    else:
+                        if not batch:
+                            deadline = time.monotonic() + self.batch_interval
+                        batch.append(tick)
+                        if len(batch) < self.batch_size:
+                            continue
+                    finally:
+                        pending = None
+
+                if batch:
+                    self.flush(batch)
+                batch = []
+                deadline = None
+        except asyncio.CancelledError:
+            if pending is not None:
+                pending.cancel()
+            raise
+        except Exception as e:
+            # Only the source can fail here; flush() handles its own errors
+            print(f"Error reading odds feed: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "ticks": self.ticks,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_batch_ms": self.last_batch_ms,
+            "last_batch_at": self.last_batch_at
+        }
@@ -0,0 +1,142 @@
+"""
+Lazy subsystems for the Horse Racing Dashboard
+Heavy components are built on first use or by a background warm-up after
+startup, so a new instance takes traffic before its indexes are built
+"""
+
+import asyncio
+import threading
+import time
+
+
+class Lazy:
+    """One subsystem built once by ``factory``: on first use or by ``warm()``
+
+    Concurrent first uses wait for a single build. A failed build is
+    retried by the next use. ``get()`` blocks its thread while a build runs,
+    so code on the event loop uses ``await aget()`` instead.
+    """
+
+    def __init__(self, name: str, factory):
+        self.name = name
+        self.factory = factory
+        self.ready = False
+        self.build_seconds = None
+        self.built_by = None
+        self.error = None
+        self.failures = 0
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self, built_by: str = "first_use"):
+        if self.ready:
+            return self._value
+        with self._lock:
+            if not self.ready:
+                started = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = repr(e)
+                    self.failures += 1
+                    raise
+                self.build_seconds = time.perf_counter() - started
+                self.built_by = built_by
+                self.error = None
+                self.ready = True
+        return self._value
+
+    async def aget(self, built_by: str = "first_use"):
+        """``get()`` for the event loop: a build, or a wait for one, happens in a worker thread"""
+        if self.ready:
+            return self._value
+        return await asyncio.to_thread(self.get, built_by)
+
+    def peek(self):
+        """The subsystem if already built, else None (never builds)"""
+        return self._value if self.ready else None
+
+    async def warm(self):
+        """Build in a worker thread so the event loop keeps serving meanwhile"""
+        if not self.ready:
+            await asyncio.to_thread(self.get, "warm_up")
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "built_by": self.built_by,
+            "build_seconds": round(self.build_seconds, 4) if self.build_seconds is not None else None,
+            "error": self.error,
+            "failures": self.failures
+        }
+
+
+class Startup:
+    """Seconds from the start of a cold start to the end of each of its phases
+
+    ``started`` should be taken by the first statement of the main module,
+    before its heavy imports. Without ``warm`` subsystems are only built on
+    first use, so readiness does not wait for them.
+    """
+
+    def __init__(self, started: float, warm: bool = True):
+        self.started = started
+        self.warm = warm
+        self.phases = {}
+        self.subsystems = []
+
+    def mark(self, phase: str) -> float:
+        """Record ``phase`` as done now; returns seconds since ``started``"""
+        elapsed = time.perf_counter() - self.started
+        self.phases[phase] = elapsed
+        return elapsed
+
+    def register(self, subsystem: Lazy) -> Lazy:
+        """Include a subsystem in the warm-up and readiness"""
+        self.subsystems.append(subsystem)
+        return subsystem
+
+    def lazy(self, name: str, factory) -> Lazy:
+        return self.register(Lazy(name, factory))
+
+    @property
+    def ready(self) -> bool:
+        return not self.warm or all(subsystem.ready for subsystem in self.subsystems)
+
+    async def warm_up(self, after_each=None, retry_seconds: float = 1.0, max_retry_seconds: float = 60.0):
+        """Build every subsystem not built yet, one after another, in a worker thread
+
+        ``after_each(subsystem)`` runs on the event loop after each build,
+        e.g. to catch up with data that changed while it was being built.
+        Failed builds are retried after ``retry_seconds``, doubling up to
+        ``max_retry_seconds``, until every subsystem is built.
+        """
+        pending = list(self.subsystems)
+        delay = retry_seconds
+        while True:
+            failed = []
+            for subsystem in pending:
+                if subsystem.ready:
+                    continue
+                try:
+                    await subsystem.warm()
+                except Exception as e:
+                    print(f"Warm-up of {subsystem.name} failed, retrying in {delay:g}s: {e!r}")
+                    failed.append(subsystem)
+                    continue
+                if after_each:
+                    after_each(subsystem)
+            if not failed:
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_retry_seconds)
+            pending = failed
+        self.mark("warm")
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warm_up": self.warm,
+            "phases": {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+            "subsystems": {subsystem.name: subsystem.stats() for subsystem in self.subsystems}
+        }
@@ -0,0 +1,158 @@
+"""
+Live odds push channel for the Horse Racing Dashboard
+Sequenced deltas of changed races, runners and movers, with resync from a sequence
+"""
+
+import asyncio
+from collections import deque
+
+
+def diff_runner(old: dict, new: dict) -> dict:
+    """Fields of a runner whose value changed"""
+    return {field: value for field, value in new.items() if old.get(field) != value}
+
+
+def diff_race(old: dict, new: dict) -> dict:
+    """Patch describing what changed in a race, or None if nothing did
+
+    Race-level fields are sent only when changed; runners are matched by
+    saddlecloth number and only their changed fields are sent. Numbers of
+    runners no longer in the race (scratchings) are listed in ``removed``.
+    """
+    patch = {"id": new["id"]}
+    changes = {
+        field: value for field, value in new.items()
+        if field != "horses" and old.get(field) != value
+    }
+    if changes:
+        patch["changes"] = changes
+
+    old_horses = {h.get("number"): h for h in old.get("horses", [])}
+    horses = []
+    for horse in new.get("horses", []):
+        previous = old_horses.get(horse.get("number"))
+        if previous is None:
+            horses.append({"number": horse.get("number"), "changes": horse})
+            continue
+        horse_changes = diff_runner(previous, horse)
+        if horse_changes:
+            horses.append({"number": horse.get("number"), "changes": horse_changes})
+    if horses:
+        patch["horses"] = horses
+    numbers = {horse.get("number") for horse in new.get("horses", [])}
+    removed = [number for number in old_horses if number not in numbers]
+    if removed:
+        patch["removed"] = removed
+
+    return patch if len(patch) > 1 else None
+
+
+def apply_patch(race: dict, patch: dict) -> dict:
+    """New race dict with a ``diff_race`` patch applied (``race`` is not mutated)"""
+    updated = dict(race)
+    updated.update(patch.get("changes", {}))
+    horse_patches = patch.get("horses")
+    if horse_patches:
+        horses = list(race.get("horses", []))
+        index = {horse.get("number"): pos for pos, horse in enumerate(horses)}
+        for horse_patch in horse_patches:
+            pos = index.get(horse_patch["number"])
+            if pos is None:
+                horses.append(dict(horse_patch["changes"]))
+            else:
+                horses[pos] = {**horses[pos], **horse_patch["changes"]}
+        updated["horses"] = horses
+    removed = patch.get("removed")
+    if removed:
+        removed = set(removed)
+        updated["horses"] = [horse for horse in updated.get("horses", []) if horse.get("number") not in removed]
+    return updated
+
+
+class Subscriber:
+    """One connected client: a bounded queue of (seq, payload) events
+
+    A ``None`` entry means the client overflowed and must be resynced; while
+    ``lagged`` is set further events are dropped. The consumer clears it.
+    """
+
+    def __init__(self, max_pending: int):
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.lagged = False
+
+    def offer(self, event: tuple):
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog and queue a resync marker (None)
+            # so it gets a fresh snapshot instead of an unbounded backlog
+            self.lagged = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class LiveFeed:
+    """Fan-out hub for live deltas
+
+    Every published delta gets the next sequence number and is kept in a
+    ring buffer of ``history`` deltas so reconnecting clients can resume
+    from the last sequence they saw. Clients that fall further behind, or
+    whose queue overflows, are sent a full snapshot instead.
+    """
+
+    def __init__(self, history: int = 1000, max_pending: int = 256):
+        self.seq = 0
+        self.max_pending = max_pending
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, payload: dict, seq: int = None) -> int:
+        """Record a delta and push it to every subscriber; returns its sequence
+
+        ``seq`` replays a delta under the sequence another worker gave it.
+        """
+        self.seq = self.seq + 1 if seq is None else seq
+        event = (self.seq, payload)
+        self._history.append(event)
+        for subscriber in self._subscribers:
+            subscriber.offer(event)
+        return self.seq
+
+    def since(self, seq: int) -> list:
+        """Deltas after ``seq``, or None if they are no longer buffered"""
+        if seq == self.seq:
+            return []
+        if seq > self.seq:
+            # Ahead of us (e.g. the server restarted) - needs a snapshot
+            return None
+        if not self._history or self._history[0][0] > seq + 1:
+            return None
+        return [event for event in self._history if event[0] > seq]
+
+    def reset(self, seq: int):
+        """Continue from ``seq`` with an empty buffer, resyncing every subscriber"""
+        self.seq = seq
+        self._history.clear()
+        for subscriber in self._subscribers:
+            subscriber.offer(None)
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.max_pending)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "seq": self.seq,
+            "subscribers": len(self._subscribers),
+            "buffered": len(self._history)
+        }
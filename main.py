@@ -3,18 +3,48 @@ Australian Horse Racing Betting Dashboard - FastAPI Backend v4.0
 Enhanced with all Australian racetracks, AI predictions, and Roughies Tips
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+# Cold start timing begins before the heavy imports
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
+import asyncio
+import heapq
 import json
 import os
-import re
-from openai import OpenAI
+import zlib
+import ai_service
+from admission import ClientLimiter, Overloaded
+from assets import REVALIDATE, AssetPipeline, FingerprintedStaticFiles
+from ai_service import busy_insights, cancel_on_disconnect, generate_ai_insights, generate_ai_prediction, generate_ai_prediction_batch, stream_ai_insights
+from prediction_cache import Flight, PredictionCache, prediction_fingerprint
+from ingestion import OddsIngestor, apply_ticks, source_from_spec
+from lazy import Startup
+from exotics import BET_PLACES, ExoticPricer
+from live_feed import LiveFeed, apply_patch, diff_race
+from market_analytics import MarketAnalytics
+from market_movers import DEFAULT_WINDOWS, MarketMoversTracker, parse_windows
+from metrics import MetricsMiddleware, registry
+from odds_history import OddsHistory
+from pagination import Projection, paginate
+from race_store import RaceStore, parse_time_to_minutes
+from response_cache import ResponseCache
+from runner_index import KINDS as SEARCH_KINDS, RunnerIndex
+from scheduler import PredictionScheduler
+from shared_state import backend_from_spec
+from tracks import AUSTRALIAN_TRACKS
+from versioning import DatasetVersion
 
 app = FastAPI(title="Horse Racing Dashboard API", version="4.0.0")
 
+# Import/startup/warm-up timings and the subsystems built lazily, reported by /ready
+# WARM_UP=0 builds each subsystem on first use instead of in the background after startup
+WARM_UP = os.getenv('WARM_UP', '1') != '0'
+startup = Startup(IMPORT_STARTED, warm=WARM_UP)
+
 # Add CORS middleware to allow cross-origin requests from documentation site
 app.add_middleware(
     CORSMiddleware,
@@ -24,35 +54,20 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Per-route request counts and latency, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
+def build_asset_pipeline() -> AssetPipeline:
+    pipeline = AssetPipeline("static", enabled=os.getenv('ASSET_PIPELINE', '1') != '0')
+    pipeline.build()
+    return pipeline
+
+
+# Minified, fingerprinted and precompressed CSS/JS; ASSET_PIPELINE=0 serves the files as they are
+asset_pipeline = startup.lazy("static_assets", build_asset_pipeline)
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# Initialize OpenAI client (optional - only if API key is available)
-try:
-    api_key = os.getenv('OPENAI_API_KEY')
-    if api_key:
-        client = OpenAI(api_key=api_key)
-        ai_enabled = True
-        print(f"OpenAI client initialized successfully")
-    else:
-        print("Warning: OPENAI_API_KEY environment variable not set")
-        client = None
-        ai_enabled = False
-except Exception as e:
-    print(f"Warning: OpenAI client not initialized: {e}")
-    client = None
-    ai_enabled = False
-
-# All Australian Racetracks with comprehensive race data
-AUSTRALIAN_TRACKS = {
-    "NSW": ["Randwick", "Rosehill", "Canterbury", "Warwick Farm", "Goulburn", "Canberra"],
-    "VIC": ["Flemington", "Caulfield", "Moonee Valley", "Sandown", "Bendigo", "Ballarat"],
-    "QLD": ["Eagle Farm", "Doomben", "Gold Coast", "Sunshine Coast", "Townsville", "Rockhampton"],
-    "WA": ["Ascot", "Belmont", "Northam"],
-    "SA": ["Morphettville", "Cheltenham", "Barossa Park"],
-    "TAS": ["Hobart", "Launceston"],
-    "ACT": ["Canberra Racecourse"]
-}
+app.mount("/static", FingerprintedStaticFiles("static", asset_pipeline.aget), name="static")
 
 # Comprehensive race data across all Australian tracks
 SAMPLE_RACES = [
@@ -216,71 +231,101 @@ SAMPLE_RACES = [
     }
 ]
 
-# Roughies Tips - Outsider recommendations with higher odds
-ROUGHIES_TIPS = [
-    {
-        "rank": 1,
-        "horse": "Golden Phoenix",
-        "track": "Moonee Valley",
-        "odds": 5.50,
-        "confidence": 65,
-        "analysis": "Strong form in recent races. Good track record at Moonee Valley. Outsider value pick.",
-        "tip": "EACH WAY",
-        "reason": "Improving form with solid jockey"
-    },
-    {
-        "rank": 2,
-        "horse": "Lightning Storm",
-        "track": "Caulfield",
-        "odds": 4.20,
-        "confidence": 72,
-        "analysis": "Consistent performer with improving odds. Favorable track conditions.",
-        "tip": "WIN",
-        "reason": "Value play at current odds"
-    },
-    {
-        "rank": 3,
-        "horse": "Bush Fire",
-        "track": "Doomben",
-        "odds": 4.80,
-        "confidence": 68,
-        "analysis": "Good form at Doomben. Outsider with potential.",
-        "tip": "PLACE",
-        "reason": "Track specialist"
-    },
-    {
-        "rank": 4,
-        "horse": "Coral Reef",
-        "track": "Doomben",
-        "odds": 6.50,
-        "confidence": 55,
-        "analysis": "Long shot with improving trend. Could surprise.",
-        "tip": "EACH WAY",
-        "reason": "High odds outsider"
-    },
-    {
-        "rank": 5,
-        "horse": "Wildflower",
-        "track": "Ascot",
-        "odds": 5.50,
-        "confidence": 70,
-        "analysis": "Consistent performer at Ascot. Good value at current odds.",
-        "tip": "WIN",
-        "reason": "Track form specialist"
-    },
-    {
-        "rank": 6,
-        "horse": "South Coast",
-        "track": "Morphettville",
-        "odds": 4.50,
-        "confidence": 62,
-        "analysis": "Outsider with potential. Favorable conditions expected.",
-        "tip": "PLACE",
-        "reason": "Value pick for place betting"
-    }
-]
 
-# Market Movers
+def load_race_card(path: str) -> tuple:
+    """(races, identity) from a JSON file in the SAMPLE_RACES format (e.g. a generated benchmark card)
+
+    The identity is the file name and a checksum of its contents, so state
+    saved for another card is never restored over this one.
+    """
+    with open(path, "rb") as card:
+        data = card.read()
+    return json.loads(data), f"{os.path.basename(path)}:{zlib.crc32(data):08x}"
+
+
+race_card, RACE_CARD_ID = load_race_card(os.environ['RACE_CARD']) if os.getenv('RACE_CARD') else (SAMPLE_RACES, "sample")
+# Indexed view of the race card - all endpoints read races through this
+race_store = RaceStore(race_card)
+
+# Card each lazy subsystem was built from, so the warm-up can catch up with later updates
+built_from = {}
+
+
+def build_runner_index() -> RunnerIndex:
+    built_from["search_index"] = race_store
+    return RunnerIndex(race_store.all())
+
+
+# Horse, jockey and trainer name prefixes -> runners across the card, for /api/search
+runner_index = startup.lazy("search_index", build_runner_index)
+SEARCH_MAX_RESULTS = 50
+SEARCH_MAX_RACES = 20
+EXOTICS_MAX_TOP = 50
+
+# Runner price windows and ranked movers, updated on every odds tick
+market_movers = MarketMoversTracker(
+    parse_windows(os.getenv('MOVER_WINDOWS', DEFAULT_WINDOWS)),
+    trend_window=os.getenv('TREND_WINDOW', 'open')
+)
+market_movers.seed(race_store.all())
+MOVERS_DEFAULT_WINDOW = os.getenv('MOVERS_DEFAULT_WINDOW', '15m')
+MOVERS_TOP_K = int(os.getenv('MOVERS_TOP_K', '10'))
+last_movers = {}
+
+# Shared state between workers, e.g. SHARED_STATE=file:/tmp/racing-state (see shared_state.backend_from_spec)
+# On a persistent disk the same snapshot + log restores the card after a restart or crash
+# The leader runs the odds feed and precompute; followers replay its updates
+shared_state = backend_from_spec(
+    os.getenv('SHARED_STATE', 'local'),
+    poll_interval=float(os.getenv('SHARED_POLL_SECONDS', '0.05')),
+    snapshot_every=int(os.getenv('SHARED_SNAPSHOT_EVERY', '1000')),
+    fsync=os.getenv('SHARED_FSYNC', '1') != '0'
+)
+
+# Columnar per-runner price history, memory-mapped within a fixed file size
+odds_history = OddsHistory(
+    os.getenv('HISTORY_PATH', 'data/odds_history.bin'),
+    max_bytes=int(float(os.getenv('HISTORY_MAX_MB', '64')) * 1024 * 1024),
+    readonly=not shared_state.leader,
+    card=RACE_CARD_ID
+)
+HISTORY_MAX_POINTS = 200
+
+# Data version per dataset - drives ETags and ?since= queries
+data_versions = {name: DatasetVersion(name) for name in ("races", "movers", "predictions", "roughies")}
+
+# Encoded (and compressed) bytes of hot payloads, rebuilt per data version
+response_cache = ResponseCache(max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256')))
+
+# Push channel for live race and mover deltas (replaces client polling)
+live_feed = LiveFeed(
+    history=int(os.getenv('LIVE_HISTORY', '1000')),
+    max_pending=int(os.getenv('LIVE_MAX_PENDING', '256'))
+)
+LIVE_HEARTBEAT_SECONDS = 15
+
+# Upper bound on races per /api/ai-predictions call
+AI_BATCH_MAX_RACES = int(os.getenv('AI_BATCH_MAX_RACES', '24'))
+
+# Reverse proxies in front of the app that append to X-Forwarded-For (0 = trust none)
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+
+# Per-client budget for requests that would call the LLM (cached answers are free)
+client_limiter = ClientLimiter(
+    per_minute=float(os.getenv('AI_CLIENT_RATE_PER_MINUTE', '20')),
+    burst=float(os.getenv('AI_CLIENT_BURST', '5'))
+)
+rate_limited = registry.counter("rate_limited_total", "AI requests rejected by the per-client limit", ("route",))
+
+# AI predictions keyed by race id + prompt fingerprint, shared by all users
+prediction_cache = PredictionCache(
+    ttl_seconds=float(os.getenv('AI_CACHE_TTL_SECONDS', '120')),
+    max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '1024'))
+)
+
+# Market Movers - sample list shown until the odds feed produces real movement
+sample_fallbacks = registry.counter("sample_fallbacks_total", "Responses served from sample data", ("dataset",))
+
 MARKET_MOVERS = [
     {"rank": 1, "horse": "Thunder Strike", "track": "Randwick", "movement": "+0.40", "direction": "up", "current_odds": 3.20, "previous_odds": 2.80, "volume": "High"},
     {"rank": 2, "horse": "Starlight Express", "track": "Flemington", "movement": "+1.20", "direction": "up", "current_odds": 1.95, "previous_odds": 1.50, "volume": "Very High"},
@@ -288,142 +333,492 @@ MARKET_MOVERS = [
     {"rank": 4, "horse": "Lightning Storm", "track": "Caulfield", "movement": "-0.50", "direction": "down", "current_odds": 4.20, "previous_odds": 4.70, "volume": "Medium"}
 ]
 
-# Expert Predictions
-PREDICTIONS = [
-    {"rank": 1, "horse": "Thunder Strike", "track": "Randwick", "confidence": 87, "prediction": "Strong Recent Form", "analysis": "Excellent track record at Randwick with consistent wins.", "tip": "WIN"},
-    {"rank": 2, "horse": "Silver Bullet", "track": "Moonee Valley", "confidence": 82, "prediction": "Consistent Performer", "analysis": "Reliable performer with 1-1-2 form.", "tip": "PLACE"},
-    {"rank": 3, "horse": "Starlight Express", "track": "Flemington", "confidence": 91, "prediction": "Strong Favorite", "analysis": "Exceptional form with 1-1-1 record.", "tip": "WIN"},
-    {"rank": 4, "horse": "Royal Ascot", "track": "Caulfield", "confidence": 78, "prediction": "Good Value Bet", "analysis": "Solid performer with improving form.", "tip": "EACH WAY"}
-]
+def build_market_analytics() -> MarketAnalytics:
+    built_from["market_analytics"] = race_store
+    analytics = MarketAnalytics(
+        race_store.all(),
+        min_roughie_odds=float(os.getenv('ROUGHIE_MIN_ODDS', '4.0')),
+        top_k=int(os.getenv('ANALYTICS_TOP_K', '10'))
+    )
+    analytics_views.update(analytics.refresh())
+    return analytics
+
+
+# Predictions and roughies generated from one vectorised scoring pass over the card
+market_analytics = startup.lazy("market_analytics", build_market_analytics)
+analytics_views = {"predictions": [], "roughies": []}
+
+
+async def analytics_view(name: str) -> list:
+    """Predictions or roughies, scoring the card first (off the event loop) if the warm-up has not yet"""
+    await market_analytics.aget()
+    return analytics_views[name]
 
 
 # ========================================
-# AI Functions
+# Race Updates
 # ========================================
 
-def generate_ai_prediction(race_data: dict) -> dict:
-    """Generate AI-powered prediction for a race using OpenAI"""
-    if not client or not ai_enabled:
-        # Generate intelligent sample prediction based on race data
-        horses = race_data.get('horses', [])
-        if horses:
-            # Pick the horse with best odds as primary pick
-            top_pick = min(horses, key=lambda h: h.get('odds', 999))
-            second_pick = sorted(horses, key=lambda h: h.get('odds', 999))[1] if len(horses) > 1 else horses[0]
-            confidence = 65 + (hash(race_data.get('id', '')) % 20)  # 65-85% confidence
-            
-            return {
-                "top_pick": top_pick['name'],
-                "second_pick": second_pick['name'],
-                "confidence": confidence,
-                "analysis": f"{top_pick['name']} shows strong form with {top_pick['jockey']} in the saddle. Trainer {top_pick['trainer']} has excellent track record at {race_data.get('track', 'this track')}.",
-                "bet_type": "WIN",
-                "model": "sample_intelligent"
-            }
-        
-        return {
-            "analysis": "AI predictions are not available. Using sample data instead.",
-            "confidence": 0,
-            "model": "sample"
-        }
-    
-    try:
-        horses_info = "\n".join([
-            f"- {h['name']}: Odds {h['odds']}, Jockey: {h['jockey']}, Trainer: {h['trainer']}, Form: {h['form']}, Trend: {h['trend']}"
-            for h in race_data.get('horses', [])[:4]
-        ])
-        
-        prompt = f"""Analyze this horse racing race and provide a brief, confident prediction:
-
-Race: {race_data.get('race', 'Unknown')}
-Track: {race_data.get('track', 'Unknown')}
-Distance: {race_data.get('distance', 'Unknown')}
-Class: {race_data.get('class', 'Unknown')}
-Going: {race_data.get('going', 'Unknown')}
-
-Horses:
-{horses_info}
-
-Provide:
-1. Top 2 horse predictions (horse name and confidence %)
-2. Brief analysis (1-2 sentences)
-3. Recommended bet type (WIN/PLACE/EACH WAY)
-
-Format as JSON with keys: top_pick, second_pick, confidence, analysis, bet_type"""
-
-        response = client.chat.completions.create(
-            model="gpt-4-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert horse racing analyst. Provide confident, data-driven predictions based on form, odds, and track conditions."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=300
-        )
-        
-        ai_response = response.choices[0].message.content
-        
-        try:
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-        except:
-            pass
-        
-        return {
-            "analysis": ai_response,
-            "confidence": 75,
-            "model": "gpt-4.1-mini"
-        }
-    except Exception as e:
-        print(f"Error generating AI prediction: {e}")
-        return {
-            "error": str(e),
-            "analysis": "AI analysis temporarily unavailable"
-        }
+def publish_races(updated: list, extra: dict = None) -> RaceStore:
+    """Swap in a new race snapshot containing the updated races
 
+    Cached AI predictions are dropped for any race whose prompt inputs
+    (odds, form, going, trend, ...) changed, and the changed fields are
+    pushed to live subscribers as one sequenced delta (merged with ``extra``,
+    e.g. updated movers), which is also fanned out to the other workers.
+    """
+    patches, added = swap_races(updated) if updated else ([], [])
+    if patches or added:
+        data_versions["races"].bump([patch["id"] for patch in patches] + [race["id"] for race in added])
+        extra = {**(extra or {}), **refresh_analytics(updated)}
+    if patches or added or extra:
+        payload = {"races": patches, "added": added, **(extra or {})}
+        share_delta(live_feed.publish(payload), payload)
+    return race_store
 
-def generate_ai_insights(query: str) -> dict:
-    """Generate AI insights for user queries about horse racing"""
-    if not client or not ai_enabled:
-        return {
-            "response": "AI insights are not available at this time. Please try again later.",
-            "model": "sample"
-        }
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert Australian horse racing analyst and betting advisor. Provide helpful, accurate insights about horse racing, betting strategies, and race analysis."
-                },
-                {
-                    "role": "user",
-                    "content": query
-                }
-            ],
-            temperature=0.7,
-            max_tokens=500
+
+def swap_races(updated: list) -> tuple:
+    """Replace races in the store; returns (patches, added) against the previous card"""
+    global race_store
+    previous = race_store
+    race_store = previous.replace(updated)
+
+    patches = []
+    added = []
+    for race in updated:
+        old = previous.get(race['id'])
+        if old is None:
+            added.append(race)
+            prediction_cache.invalidate_race(race['id'])
+            continue
+        if prediction_fingerprint(old) != prediction_fingerprint(race):
+            prediction_cache.invalidate_race(race['id'])
+        patch = diff_race(old, race)
+        if patch:
+            patches.append(patch)
+
+    if added:
+        market_movers.seed(added)
+    # Lazy subsystems not built yet will index the card as it is when they are
+    index = runner_index.peek()
+    if index is not None:
+        index.update(updated)
+    return patches, added
+
+
+def refresh_analytics(updated: list) -> dict:
+    """Re-score the card after a race update; returns the views that changed"""
+    analytics = market_analytics.peek()
+    if analytics is None:
+        return {}
+    analytics.update(updated, race_store.all())
+    changed = {}
+    for name, items in analytics.refresh().items():
+        if items != analytics_views[name]:
+            analytics_views[name] = items
+            data_versions[name].bump()
+            changed[name] = items
+    return changed
+
+
+def movers_limit(limit: int = None) -> int:
+    """A requested number of movers clamped to the ranked top-k"""
+    return max(1, min(limit or MOVERS_TOP_K, MOVERS_TOP_K))
+
+
+def current_movers(window: str = None, limit: int = None) -> list:
+    """Top market movers for a window (at most MOVERS_TOP_K), or the sample list before any ticks"""
+    window = window or MOVERS_DEFAULT_WINDOW
+    limit = movers_limit(limit)
+    if not market_movers.active:
+        # Followers only see the leader's published top movers
+        if window in last_movers:
+            return last_movers[window][:limit]
+        sample_fallbacks.inc("movers")
+        return MARKET_MOVERS[:limit]
+    if window in last_movers:
+        return last_movers[window][:limit]
+    return market_movers.top(window, limit)
+
+
+def refresh_movers() -> bool:
+    """Re-read the top movers of every window; bump the movers version if any changed"""
+    changed = False
+    for window in market_movers.windows:
+        top = market_movers.top(window, MOVERS_TOP_K)
+        if top != last_movers.get(window):
+            last_movers[window] = top
+            changed = True
+    if changed:
+        data_versions["movers"].bump()
+    return changed
+
+
+async def expire_movers():
+    """Leader: re-rank and republish movers as the rolling windows slide, ticks or not"""
+    while True:
+        due = market_movers.next_expiry()
+        now = time.time()
+        await asyncio.sleep(1.0 if due is None else min(1.0, max(0.05, due - now)))
+        if market_movers.active and refresh_movers():
+            publish_races([], {"movers": current_movers()})
+
+
+def ingest_ticks(ticks: list) -> tuple:
+    """Apply a batch of odds feed ticks as one atomic race snapshot
+
+    Touched races and runners are copied, never mutated, so readers holding
+    the previous snapshot are unaffected. Returns the numbers of skipped and
+    malformed ticks.
+    """
+    updated, applied, skipped, invalid = apply_ticks(race_store.get, ticks)
+
+    # Price history, movers and runner trends follow every accepted odds tick
+    ticked = set()
+    now = time.time()
+    for tick in applied:
+        if tick.get('number') is None:
+            continue
+        if 'odds' in tick or 'place_odds' in tick:
+            odds_history.append(tick['race_id'], tick['number'], tick.get('ts', now), tick.get('odds'), tick.get('place_odds'))
+        if 'odds' in tick:
+            if market_movers.record(tick['race_id'], tick['number'], tick['odds'], tick.get('ts')):
+                ticked.add((tick['race_id'], tick['number']))
+    odds_history.commit()
+    for race in updated:
+        for horse in race['horses']:
+            if (race['id'], horse.get('number')) in ticked:
+                # Runners with ticks are already fresh copies from apply_ticks
+                horse['trend'], horse['trendValue'] = market_movers.trend(race['id'], horse['number'])
+
+    extra = {"movers": current_movers()} if ticked and refresh_movers() else None
+    if updated or extra:
+        publish_races(updated, extra)
+    return skipped, invalid
+
+
+# ========================================
+# Shared State
+# ========================================
+
+def share_delta(seq: int, payload: dict):
+    """Fan a published delta out to the other workers with the versions it produced"""
+    datasets = [name for name in ("movers", "predictions", "roughies") if name in payload]
+    if payload["races"] or payload["added"]:
+        datasets.append("races")
+    shared_state.append({
+        "kind": "delta",
+        "seq": seq,
+        "versions": {name: data_versions[name].version for name in datasets},
+        "payload": payload,
+        "movers": last_movers if "movers" in payload else None
+    })
+
+
+def share_prediction(key: tuple, prediction: dict):
+    """Let every worker serve an AI prediction computed by this one"""
+    shared_state.append({"kind": "prediction", "race_id": key[0], "fingerprint": key[1], "prediction": prediction})
+
+
+def shared_snapshot() -> dict:
+    """Full state a worker needs to catch up, checkpointed by the leader"""
+    return {
+        "races": race_store.all(),
+        # Copied: the snapshot may be encoded on another thread while movers refresh
+        "movers": dict(last_movers),
+        # None until analytics are built; readers then score the card themselves
+        "predictions": analytics_views["predictions"] if market_analytics.ready else None,
+        "roughies": analytics_views["roughies"] if market_analytics.ready else None,
+        "versions": {name: version.version for name, version in data_versions.items()},
+        "seq": live_feed.seq
+    }
+
+
+def install_state(state: dict):
+    """Replace this worker's state with a checkpoint from the leader"""
+    global race_store
+    race_store = RaceStore(state["races"])
+    market_movers.seed(race_store.all())
+    if runner_index.ready:
+        runner_index.get().load(race_store.all())
+    if market_analytics.ready:
+        market_analytics.get().load(race_store.all())
+    last_movers.clear()
+    last_movers.update(state["movers"])
+    if state["predictions"] is not None:
+        analytics_views["predictions"] = state["predictions"]
+        analytics_views["roughies"] = state["roughies"]
+    elif market_analytics.ready:
+        analytics_views.update(market_analytics.get().refresh())
+    for name, version in state["versions"].items():
+        data_versions[name].reset(version)
+    response_cache.clear()
+    live_feed.reset(state["seq"])
+    odds_history.refresh()
+
+
+def apply_shared(entry: dict):
+    """Apply an update fanned out by another worker"""
+    kind = entry.get("kind")
+    if kind == "prediction":
+        prediction_cache.put((entry["race_id"], entry["fingerprint"]), entry["prediction"])
+    elif kind == "snapshot":
+        install_state(entry["state"])
+    elif kind == "delta":
+        payload = entry["payload"]
+        updated = [
+            apply_patch(race_store.get(patch["id"]), patch)
+            for patch in payload["races"] if patch["id"] in race_store
+        ] + payload["added"]
+        swap_races(updated)
+        if market_analytics.ready:
+            market_analytics.get().update(updated, race_store.all())
+        for name, version in entry["versions"].items():
+            keys = [race["id"] for race in updated] if name == "races" else None
+            data_versions[name].bump(keys, version=version)
+        for name in ("predictions", "roughies"):
+            if name in payload:
+                analytics_views[name] = payload[name]
+        if entry.get("movers") is not None:
+            last_movers.clear()
+            last_movers.update(entry["movers"])
+        odds_history.refresh()
+        live_feed.publish(payload, seq=entry["seq"])
+
+
+def live_snapshot() -> dict:
+    """Full state sent to live subscribers on connect or resync"""
+    return {
+        "races": race_store.all(),
+        "movers": current_movers()
+    }
+
+
+async def predict_races(races: list) -> list:
+    """AI predictions for several races, served from the cache where possible
+
+    Races that are neither cached nor already being computed are packed into
+    model requests of up to AI_BATCH_SIZE races, which run concurrently.
+    Returns one prediction (or exception) per race, in order.
+    """
+    misses = [race for race in races if not prediction_cache.has(race)]
+    size = max(1, ai_service.AI_BATCH_SIZE)
+    chunks = [misses[start:start + size] for start in range(0, len(misses), size)]
+    chunk_of = {race['id']: index for index, chunk in enumerate(chunks) for race in chunk}
+    batches = {}
+
+    async def compute(race: dict) -> dict:
+        index = chunk_of.get(race['id'])
+        if index is None:
+            # Cached entry expired or was invalidated since the check above
+            return await generate_ai_prediction(race)
+        # Started by the first race of the chunk that needs it. Each race's cache flight
+        # (which other requests may share) waits on it, and it is cancelled only when
+        # the last of them is.
+        batch = batches.get(index)
+        if batch is None:
+            batch = batches[index] = Flight(asyncio.ensure_future(generate_ai_prediction_batch(chunks[index])))
+        return (await batch.wait())[race['id']]
+
+    return await asyncio.gather(
+        *[prediction_cache.get_or_compute(race, lambda race=race: compute(race)) for race in races],
+        return_exceptions=True
+    )
+
+
+# Precomputes predictions for races about to jump so users rarely wait on the LLM
+prediction_scheduler = PredictionScheduler(
+    get_store=lambda: race_store,
+    predict=predict_races,
+    cache=prediction_cache,
+    lookahead_minutes=int(os.getenv('AI_PRECOMPUTE_LOOKAHEAD_MINUTES', '30')),
+    interval_seconds=float(os.getenv('AI_PRECOMPUTE_INTERVAL_SECONDS', '15')),
+    per_minute=float(os.getenv('AI_PRECOMPUTE_PER_MINUTE', '30')),
+    timezone=os.getenv('RACE_TIMEZONE', 'Australia/Sydney')
+)
+
+
+# Odds feed, e.g. ODDS_FEED=replay:ticks.jsonl,speed=10 (see ingestion.source_from_spec)
+odds_ingestor = None
+if os.getenv('ODDS_FEED'):
+    odds_ingestor = OddsIngestor(
+        source_from_spec(os.getenv('ODDS_FEED')),
+        ingest_ticks,
+        batch_size=int(os.getenv('ODDS_BATCH_SIZE', '500')),
+        batch_interval=float(os.getenv('ODDS_BATCH_INTERVAL_SECONDS', '0.25'))
+    )
+
+
+# Predictions computed by any worker are shared with the others
+prediction_cache.on_fill = share_prediction
+
+# Catch up with the state the leader (or a previous leader) left behind
+shared_checkpoint, shared_entries = shared_state.load(RACE_CARD_ID)
+if shared_checkpoint:
+    install_state(shared_checkpoint)
+for shared_entry in shared_entries:
+    apply_shared(shared_entry)
+
+
+# Background build of lazy subsystems after startup (see WARM_UP)
+warm_up_task = None
+if ai_service.ai_enabled:
+    startup.register(ai_service.ai_client)
+
+
+movers_expiry_task = None
+
+
+def restore_movers():
+    """Rebuild the movers' price windows from the odds history before the feed resumes
+
+    The shared state restores the published movers but not the windows
+    behind them, so without this the first tick after a restart or failover
+    would rank movers from opening prices alone.
+    """
+    if market_movers.active:
+        return
+    started = time.perf_counter()
+    replayed = market_movers.restore(odds_history)
+    if replayed:
+        print(f"Restored movers from {replayed} odds history ticks in {time.perf_counter() - started:.2f}s")
+
+
+def start_leader_tasks():
+    """Start the odds feed with its movers expiry, and the prediction scheduler when AI is available"""
+    global movers_expiry_task
+    restore_movers()
+    if odds_ingestor:
+        odds_ingestor.start()
+        if movers_expiry_task is None:
+            movers_expiry_task = asyncio.create_task(expire_movers())
+    if ai_service.ai_enabled and os.getenv('AI_PRECOMPUTE', '1') != '0':
+        prediction_scheduler.start()
+
+
+def promote_to_leader():
+    """Take over the odds feed and precompute after the leader worker exits"""
+    print(f"Worker {os.getpid()} is now the shared state leader")
+    odds_history.promote()
+    start_leader_tasks()
+
+
+def catch_up(subsystem):
+    """Bring a subsystem built off the event loop up to date with races published meanwhile"""
+    if built_from.get(subsystem.name, race_store) is race_store:
+        return
+    if subsystem is runner_index:
+        runner_index.get().update(race_store.all())
+    elif subsystem is market_analytics:
+        refresh_analytics(race_store.all())
+
+
+async def warm_up():
+    """Build the lazy subsystems in the background so first requests find them ready"""
+    await startup.warm_up(catch_up)
+    built = ", ".join(
+        f"{subsystem.name} {subsystem.build_seconds:.2f}s" for subsystem in startup.subsystems if subsystem.build_seconds is not None
+    )
+    print(f"Warm {startup.phases['warm']:.2f}s after launch ({built or 'nothing to build'})")
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """Follow shared state, run the leader's background tasks on one worker and start the warm-up"""
+    global warm_up_task
+    await shared_state.start(apply_shared, shared_snapshot, promote_to_leader)
+    if shared_state.leader:
+        start_leader_tasks()
+    print(f"Taking traffic {startup.mark('startup'):.2f}s after launch (imports and setup {startup.phases['import']:.2f}s)")
+    if WARM_UP:
+        warm_up_task = asyncio.create_task(warm_up())
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    if warm_up_task:
+        warm_up_task.cancel()
+    if movers_expiry_task:
+        movers_expiry_task.cancel()
+    if odds_ingestor:
+        await odds_ingestor.stop()
+    await prediction_scheduler.stop()
+    await shared_state.stop()
+    odds_history.close()
+
+
+# ========================================
+# Conditional Responses
+# ========================================
+
+def not_modified(http_request: Request, dataset: str) -> Response:
+    """A 304 response if the client already holds the current version, else None"""
+    version = data_versions[dataset]
+    if version.matches(http_request.headers.get("if-none-match")):
+        return Response(status_code=304, headers={"ETag": version.etag, "Cache-Control": "no-cache"})
+    return None
+
+
+def stamp_version(response: Response, dataset: str):
+    """Tag a response with its dataset version so clients can revalidate cheaply"""
+    response.headers["ETag"] = data_versions[dataset].etag
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def cached_response(http_request: Request, key: str, datasets: list, build, etag: str = None) -> Response:
+    """Serve a payload from the encoded response cache
+
+    The payload is serialised and compressed once per version of its
+    datasets, then served as raw bytes in the client's preferred encoding.
+    """
+    version = tuple(data_versions[name].version for name in datasets)
+    encoded = response_cache.get(key, version, build)
+    return encoded.respond(
+        http_request.headers.get("accept-encoding"),
+        headers={"ETag": etag or data_versions[datasets[0]].etag, "Cache-Control": "no-cache"}
+    )
+
+
+def list_since(items: list, dataset: str, since: int) -> tuple:
+    """(items, partial) for a small list dataset: empty if unchanged since ``since``"""
+    if since is not None and data_versions[dataset].changed_since(since) == set():
+        return [], True
+    return items, False
+
+
+# ========================================
+# Admission Control
+# ========================================
+
+def client_key(http_request: Request) -> str:
+    """Client identity for rate limiting
+
+    Behind ``TRUSTED_PROXIES`` proxies this is the address the outermost of
+    them appended to X-Forwarded-For. Entries to the left of it come from
+    the client and are ignored, so rotating them does not reset the budget.
+    Without trusted proxies it is the connection address.
+    """
+    forwarded = http_request.headers.get("x-forwarded-for") if TRUSTED_PROXIES else None
+    if forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXIES, len(hops))]
+    return http_request.client.host if http_request.client else "unknown"
+
+
+def admit(http_request: Request, route: str):
+    """Spend one of the client's AI tokens; 429 with Retry-After when they have none"""
+    if not ai_service.ai_enabled:
+        # Sample answers cost nothing upstream
+        return
+    retry_after = client_limiter.acquire(client_key(http_request))
+    if retry_after:
+        rate_limited.inc(route)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many AI requests, please slow down",
+            headers={"Retry-After": str(max(1, round(retry_after)))}
         )
-        
-        return {
-            "response": response.choices[0].message.content,
-            "model": "gpt-4.1-mini"
-        }
-    except Exception as e:
-        print(f"Error generating AI insights: {e}")
-        return {
-            "error": str(e),
-            "response": "AI insights temporarily unavailable"
-        }
 
 
 # ========================================
@@ -431,98 +826,229 @@ def generate_ai_insights(query: str) -> dict:
 # ========================================
 
 @app.get("/")
-async def serve_index():
-    """Serve the main dashboard HTML"""
-    return FileResponse("static/index.html", media_type="text/html")
+async def serve_index(http_request: Request):
+    """Serve the main dashboard HTML, revalidated by ETag; its assets are cached for good"""
+    index = (await asset_pipeline.aget()).index
+    if index is None:
+        return FileResponse("static/index.html", media_type="text/html")
+    return index.respond(http_request.headers, REVALIDATE)
 
 
 @app.get("/api/odds")
-async def get_odds():
-    """Get current racing odds and events with detailed horse information"""
+async def get_odds(http_request: Request, response: Response, since: int = None, limit: int = None, cursor: str = None, fields: str = None, compact: bool = False):
+    """Get current racing odds and events with detailed horse information
+
+    With ``?since=<data_version>`` only races changed after that version are
+    returned (``partial: true``); the full card is returned if it is too old.
+    ``limit``/``cursor`` page through the card and ``fields``/``compact``
+    trim each race (see ``pagination.Projection``).
+    """
+    cached = not_modified(http_request, "races")
+    if cached:
+        return cached
+    stamp_version(response, "races")
+    
+    paged = limit is not None or cursor or fields or compact
+    if since is None and not paged:
+        return cached_response(http_request, "odds", ["races"], lambda: odds_payload(race_store.all(), False))
+    
+    events = race_store.all()
+    partial = False
+    changed = data_versions["races"].changed_since(since) if since is not None else None
+    if changed is not None:
+        events = [race_store.get(race_id) for race_id in sorted((race_id for race_id in changed if race_id in race_store), key=race_store.position)]
+        partial = True
+    if not paged:
+        return odds_payload(events, partial)
+    
+    page, next_cursor = race_page(events, limit, cursor)
+    payload = odds_payload(Projection(fields, compact).project(page), partial)
+    payload.update({"total": len(events), "next_cursor": next_cursor})
+    return payload
+
+
+def odds_payload(events: list, partial: bool) -> dict:
+    version = data_versions["races"]
     return {
-        "events": SAMPLE_RACES,
-        "timestamp": datetime.now().isoformat(),
+        "events": events,
+        "timestamp": version.updated_at,
         "status": "live",
-        "version": "4.0"
+        "version": "4.0",
+        "data_version": version.version,
+        "partial": partial
     }
 
 
+def race_page(events: list, limit: int, cursor: str) -> tuple:
+    """(page, next_cursor) of card-ordered races; 400 on a malformed cursor"""
+    try:
+        return paginate(events, race_store.position, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/api/filter")
-async def filter_races(track: str = None, time_from: str = None, time_to: str = None, featured: bool = False):
-    """Filter races by track, time range, and featured status"""
-    filtered = SAMPLE_RACES.copy()
-    
-    # Filter by track
-    if track and track.lower() != 'all':
-        filtered = [r for r in filtered if r['track'].lower() == track.lower()]
-    
-    # Filter by featured
-    if featured:
-        filtered = [r for r in filtered if r.get('featured', False)]
-    
-    # Filter by time range
-    if time_from or time_to:
-        filtered_by_time = []
-        for race in filtered:
-            race_time = extract_time(race['race'])
-            if race_time:
-                if time_from and time_to:
-                    if is_time_in_range(race_time, time_from, time_to):
-                        filtered_by_time.append(race)
-                elif time_from:
-                    if is_time_after(race_time, time_from):
-                        filtered_by_time.append(race)
-                elif time_to:
-                    if is_time_before(race_time, time_to):
-                        filtered_by_time.append(race)
-            else:
-                filtered_by_time.append(race)
-        filtered = filtered_by_time
+async def filter_races(http_request: Request, response: Response, track: str = None, time_from: str = None, time_to: str = None, featured: bool = False,
+                       limit: int = None, cursor: str = None, fields: str = None, compact: bool = False):
+    """Filter races by track, time range, and featured status
+
+    Supports the same ``limit``/``cursor`` paging and ``fields``/``compact``
+    projection as /api/odds; ``total`` counts every matching race.
+    """
+    cached = not_modified(http_request, "races")
+    if cached:
+        return cached
+    stamp_version(response, "races")
     
+    # Jump times are pre-parsed in the store, so a time window is a range scan
+    filtered = race_store.filter(
+        track=track,
+        featured=featured,
+        time_from=parse_time_to_minutes(time_from) if time_from else None,
+        time_to=parse_time_to_minutes(time_to) if time_to else None,
+    )
+    filters = {"track": track, "time_from": time_from, "time_to": time_to, "featured": featured}
+    if filtered and limit is None and not (cursor or fields or compact):
+        # A whole meeting is a large payload: encode it once per card version
+        key = f"filter:{track}:{time_from}:{time_to}:{featured}"
+        return cached_response(http_request, key, ["races"], lambda: filter_payload(filtered, len(filtered), None, filters))
+    page, next_cursor = race_page(filtered, limit, cursor)
+    return filter_payload(Projection(fields, compact).project(page), len(filtered), next_cursor, filters)
+
+
+def filter_payload(events: list, total: int, next_cursor: str, filters: dict) -> dict:
     return {
-        "events": filtered,
-        "total": len(filtered),
-        "filters": {
-            "track": track,
-            "time_from": time_from,
-            "time_to": time_to,
-            "featured": featured
-        },
-        "timestamp": datetime.now().isoformat()
+        "events": events,
+        "total": total,
+        "next_cursor": next_cursor,
+        "filters": filters,
+        "timestamp": data_versions["races"].updated_at,
+        "data_version": data_versions["races"].version
     }
 
 
 @app.get("/api/market-movers")
-async def get_market_movers():
-    """Get top market movers - horses with significant odds changes"""
+async def get_market_movers(http_request: Request, response: Response, since: int = None, window: str = None, limit: int = None):
+    """Get top market movers - horses with significant odds changes
+
+    ``window`` is one of the configured movement windows (e.g. 5m, 15m, open).
+    """
+    if window and window not in market_movers.windows:
+        raise HTTPException(status_code=400, detail=f"Unknown window: {window}")
+    cached = not_modified(http_request, "movers")
+    if cached:
+        return cached
+    stamp_version(response, "movers")
+    
+    window = window or MOVERS_DEFAULT_WINDOW
+    limit = movers_limit(limit)
+    if since is None:
+        return cached_response(http_request, f"movers:{window}:{limit}", ["movers"], lambda: movers_payload(current_movers(window, limit), False))
+    return movers_payload(*list_since(current_movers(window, limit), "movers", since))
+
+
+def movers_payload(items: list, partial: bool) -> dict:
     return {
-        "movers": MARKET_MOVERS,
-        "timestamp": datetime.now().isoformat(),
-        "total": len(MARKET_MOVERS)
+        "movers": items,
+        "timestamp": data_versions["movers"].updated_at,
+        "total": len(items),
+        "data_version": data_versions["movers"].version,
+        "partial": partial
     }
 
 
 @app.get("/api/predictions")
-async def get_predictions():
+async def get_predictions(http_request: Request, response: Response, since: int = None):
     """Get expert predictions and tips for upcoming races"""
+    cached = not_modified(http_request, "predictions")
+    if cached:
+        return cached
+    stamp_version(response, "predictions")
+    
+    items = await analytics_view("predictions")
+    if since is None:
+        return cached_response(http_request, "predictions", ["predictions"], lambda: predictions_payload(items, False))
+    return predictions_payload(*list_since(items, "predictions", since))
+
+
+def predictions_payload(items: list, partial: bool) -> dict:
     return {
-        "predictions": PREDICTIONS,
-        "timestamp": datetime.now().isoformat(),
-        "total": len(PREDICTIONS)
+        "predictions": items,
+        "timestamp": data_versions["predictions"].updated_at,
+        "total": len(items),
+        "data_version": data_versions["predictions"].version,
+        "partial": partial
     }
 
 
 @app.get("/api/roughies")
-async def get_roughies_tips():
+async def get_roughies_tips(http_request: Request, response: Response, since: int = None):
     """Get roughies tips - outsider recommendations with higher odds"""
+    cached = not_modified(http_request, "roughies")
+    if cached:
+        return cached
+    stamp_version(response, "roughies")
+    
+    items = await analytics_view("roughies")
+    if since is None:
+        return cached_response(http_request, "roughies", ["roughies"], lambda: roughies_payload(items, False))
+    return roughies_payload(*list_since(items, "roughies", since))
+
+
+def roughies_payload(items: list, partial: bool) -> dict:
     return {
-        "roughies": ROUGHIES_TIPS,
-        "timestamp": datetime.now().isoformat(),
-        "total": len(ROUGHIES_TIPS),
-        "description": "Outsider picks with value odds"
+        "roughies": items,
+        "timestamp": data_versions["roughies"].updated_at,
+        "total": len(items),
+        "description": "Outsider picks with value odds",
+        "data_version": data_versions["roughies"].version,
+        "partial": partial
     }
 
 
+DASHBOARD_SECTIONS = ("races", "movers", "predictions", "roughies")
+
+
+@app.get("/api/dashboard")
+async def get_dashboard(http_request: Request, sections: str = None):
+    """Get races, market movers, predictions and roughies in one consistent snapshot
+
+    ``?sections=races,movers`` limits the payload to the named sections.
+    The ETag combines the versions of the selected datasets.
+    """
+    requested = {name.strip() for name in (sections or "").split(',') if name.strip()}
+    unknown = sorted(requested.difference(DASHBOARD_SECTIONS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    # Canonical order, once each: one cache entry and ETag per distinct selection
+    selected = [name for name in DASHBOARD_SECTIONS if not requested or name in requested]
+    
+    if "predictions" in selected or "roughies" in selected:
+        await market_analytics.aget()
+    # Everything below is read without awaiting, so all sections come from the same state
+    versions = {name: data_versions[name].version for name in selected}
+    etag = 'W/"dashboard-' + "-".join(f"{name}.{version}" for name, version in versions.items()) + '"'
+    if_none_match = http_request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    
+    def build() -> dict:
+        snapshot = {
+            "races": race_store.all(),
+            "movers": current_movers(),
+            "predictions": analytics_views["predictions"],
+            "roughies": analytics_views["roughies"]
+        }
+        return {
+            **{name: snapshot[name] for name in selected},
+            "versions": versions,
+            "timestamp": max(data_versions[name].updated_at for name in selected),
+            "status": "live"
+        }
+    
+    return cached_response(http_request, "dashboard:" + ",".join(selected), selected, build, etag)
+
+
 @app.get("/api/tracks")
 async def get_all_tracks():
     """Get all Australian racetracks organized by state"""
@@ -533,14 +1059,150 @@ async def get_all_tracks():
     }
 
 
+@app.get("/api/search")
+async def search_runners(q: str = "", types: str = Query(None, alias="type"), limit: int = 10):
+    """Search-as-you-type over horse, jockey and trainer names across the card
+
+    Every word of ``q`` must prefix a word of the name; matching ignores case,
+    accents and punctuation. ``type`` narrows the search (comma-separated
+    horse, jockey, trainer). Each result lists the races it appears in.
+    """
+    kinds = SEARCH_KINDS
+    if types:
+        wanted = {name.strip().lower() for name in types.split(',')}
+        kinds = tuple(kind for kind in SEARCH_KINDS if kind in wanted)
+        if not kinds:
+            raise HTTPException(status_code=400, detail=f"type must be one of: {', '.join(SEARCH_KINDS)}")
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+    
+    store = race_store
+    results = []
+    for kind, name, runners in (await runner_index.aget()).search(q, kinds, limit):
+        on_card = [runner for runner in runners if runner[0] in store]
+        races = []
+        # Earliest races on the card first
+        for race_id, number in heapq.nsmallest(SEARCH_MAX_RACES, on_card, key=lambda runner: store.position(runner[0])):
+            race = store.get(race_id)
+            horse = next((h for h in race.get('horses', []) if h.get('number') == number), {})
+            races.append({
+                "race_id": race_id,
+                "race": race['race'],
+                "track": race['track'],
+                "number": number,
+                "horse": horse.get('name'),
+                "odds": horse.get('odds')
+            })
+        results.append({"type": kind, "name": name, "races": races, "total_races": len(on_card)})
+    
+    return {
+        "query": q,
+        "results": results,
+        "total": len(results),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/history/{race_id}")
+async def get_race_history(race_id: str, start: float = None, end: float = None, points: int = HISTORY_MAX_POINTS):
+    """Get the odds history of every runner in a race, downsampled for charting
+
+    ``start``/``end`` bound the range in epoch seconds; each runner's series
+    is reduced to at most ``points`` [ts, odds, place_odds] points.
+    """
+    race = race_store.get(race_id)
+    if not race and not odds_history.has_race(race_id):
+        raise HTTPException(status_code=404, detail="Race not found")
+    
+    series = odds_history.race_series(race_id, start, end, max(1, min(points, 5000)))
+    names = {horse.get('number'): horse.get('name') for horse in race['horses']} if race else {}
+    return {
+        "race_id": race_id,
+        "runners": [
+            {"number": number, "horse": names.get(number), "points": series[number]}
+            for number in sorted(series)
+        ],
+        "fields": ["ts", "odds", "place_odds"],
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def parse_numbers(text: str) -> list:
+    """Saddlecloth numbers from "1,3,5"; raises 400 on anything else"""
+    try:
+        return [int(part) for part in text.split(',') if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Expected comma-separated runner numbers, got {text!r}")
+
+
+@app.get("/api/races/{race_id}/exotics")
+async def get_exotics(
+    race_id: str,
+    bets: str = ",".join(BET_PLACES),
+    top: int = 10,
+    bet: str = None,
+    legs: str = None,
+    dutch: str = None,
+    stake: float = 100.0
+):
+    """Harville-model exotic prices and dutching stakes from the current win odds
+
+    ``bets`` picks the exotics to list (quinella, exacta, trifecta, first4),
+    each with its ``top`` likeliest combinations. ``bet`` with ``legs``
+    prices one selection: legs are "/"-separated places of comma-separated
+    numbers ("1/2,3/2,3,4"), or a single group for a box. ``dutch`` splits
+    ``stake`` across win runners ("1,3,5") so each returns the same.
+    """
+    race = race_store.get(race_id)
+    if not race:
+        raise HTTPException(status_code=404, detail="Race not found")
+    selected = [name.strip().lower() for name in bets.split(',') if name.strip()]
+    bet = bet.strip().lower() if bet else None
+    unknown = [name for name in selected + ([bet] if bet else []) if name not in BET_PLACES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Bet types must be among: {', '.join(BET_PLACES)}")
+    if bool(bet) != bool(legs):
+        raise HTTPException(status_code=400, detail="bet and legs must be given together")
+    if stake <= 0:
+        raise HTTPException(status_code=400, detail="stake must be positive")
+    top = max(1, min(top, EXOTICS_MAX_TOP))
+
+    # Price the selection and dutch first: a bad one is rejected before any listing is computed
+    pricer = ExoticPricer(race)
+    result = {
+        "race_id": race_id,
+        "race": race['race'],
+        "model": "harville"
+    }
+    try:
+        if bet:
+            result["selection"] = pricer.price_selection(
+                bet, [parse_numbers(leg) for leg in legs.split('/')], stake
+            )
+        if dutch is not None:
+            result["dutch"] = pricer.dutch(parse_numbers(dutch), stake)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result["exotics"] = {name: pricer.top(name, top) for name in selected}
+    result["timestamp"] = datetime.now().isoformat()
+    return result
+
+
 @app.get("/api/ai-prediction/{race_id}")
-async def get_ai_prediction(race_id: str):
+async def get_ai_prediction(race_id: str, http_request: Request):
     """Get AI-powered prediction for a specific race"""
-    race = next((r for r in SAMPLE_RACES if r['id'] == race_id), None)
+    race = race_store.get(race_id)
     if not race:
         raise HTTPException(status_code=404, detail="Race not found")
+    if not prediction_cache.has(race):
+        admit(http_request, "ai-prediction")
     
-    prediction = generate_ai_prediction(race)
+    prediction = await cancel_on_disconnect(
+        http_request,
+        prediction_cache.get_or_compute(race, lambda: generate_ai_prediction(race))
+    )
+    if prediction is None:
+        # Client went away - the upstream call has been cancelled
+        return Response(status_code=499)
     return {
         "race_id": race_id,
         "race": race['race'],
@@ -549,14 +1211,63 @@ async def get_ai_prediction(race_id: str):
     }
 
 
+@app.get("/api/ai-predictions")
+async def get_ai_predictions(http_request: Request, race_ids: str = None, track: str = None):
+    """Get AI-powered predictions for several races (comma-separated ids) or a whole meeting"""
+    not_found = []
+    if race_ids:
+        races = []
+        for race_id in dict.fromkeys(r.strip() for r in race_ids.split(',') if r.strip()):
+            race = race_store.get(race_id)
+            if race:
+                races.append(race)
+            else:
+                not_found.append(race_id)
+    elif track:
+        races = race_store.by_track(track)
+    else:
+        raise HTTPException(status_code=400, detail="race_ids or track is required")
+    
+    if len(races) > AI_BATCH_MAX_RACES:
+        raise HTTPException(status_code=400, detail=f"At most {AI_BATCH_MAX_RACES} races per request")
+    if not all(prediction_cache.has(race) for race in races):
+        admit(http_request, "ai-predictions")
+    
+    results = await cancel_on_disconnect(http_request, predict_races(races))
+    if results is None:
+        return Response(status_code=499)
+    
+    predictions = []
+    for race, prediction in zip(races, results):
+        if not isinstance(prediction, dict):
+            # One race failing must not fail the whole meeting
+            prediction = {"error": str(prediction) or type(prediction).__name__, "analysis": "AI analysis temporarily unavailable"}
+        predictions.append({
+            "race_id": race['id'],
+            "race": race['race'],
+            "ai_prediction": prediction
+        })
+    
+    return {
+        "predictions": predictions,
+        "total": len(predictions),
+        "failed": sum(1 for p in predictions if "error" in p["ai_prediction"]),
+        "not_found": not_found,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @app.post("/api/ai-insights")
-async def get_ai_insights(request: dict):
+async def get_ai_insights(request: dict, http_request: Request):
     """Get AI insights for user queries"""
     query = request.get("query", "")
     if not query:
         raise HTTPException(status_code=400, detail="Query is required")
+    admit(http_request, "ai-insights")
     
-    insights = generate_ai_insights(query)
+    insights = await cancel_on_disconnect(http_request, generate_ai_insights(query))
+    if insights is None:
+        return Response(status_code=499)
     return {
         "query": query,
         "insights": insights,
@@ -564,6 +1275,105 @@ async def get_ai_insights(request: dict):
     }
 
 
+def sse_event(event: str, data: dict, event_id: int = None) -> str:
+    """Format one Server-Sent Event"""
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/api/live")
+async def live_updates(http_request: Request, since: int = None):
+    """Push live race, runner and mover changes as Server-Sent Events
+
+    Sends a ``snapshot`` event, then ``delta`` events carrying only what
+    changed, each with a sequence number as the event id. Reconnecting with
+    ``?since=<seq>`` (or the browser's automatic ``Last-Event-ID``) replays
+    the missed deltas, or sends a fresh snapshot if they are gone.
+    """
+    last_event_id = http_request.headers.get("last-event-id")
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    async def events():
+        subscriber = live_feed.subscribe()
+        try:
+            backlog = live_feed.since(since) if since is not None else None
+            last_seq = live_feed.seq
+            if backlog is None:
+                yield sse_event("snapshot", {"seq": last_seq, **live_snapshot()}, last_seq)
+            else:
+                for seq, payload in backlog:
+                    yield sse_event("delta", {"seq": seq, **payload}, seq)
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                
+                if event is None:
+                    # Client fell behind - resync with a fresh snapshot
+                    subscriber.lagged = False
+                    last_seq = live_feed.seq
+                    yield sse_event("snapshot", {"seq": last_seq, **live_snapshot()}, last_seq)
+                    continue
+                
+                seq, payload = event
+                if seq > last_seq:
+                    last_seq = seq
+                    yield sse_event("delta", {"seq": seq, **payload}, seq)
+        finally:
+            live_feed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/ai-insights/stream")
+async def stream_insights(request: dict, http_request: Request):
+    """Stream AI insights for user queries as Server-Sent Events
+
+    Emits ``token`` events with text deltas as the model produces them, then
+    ``done`` (or ``error``). Disconnecting cancels the upstream completion.
+    When the upstream is overloaded the busy message is sent as one token.
+    """
+    query = request.get("query", "")
+    if not query:
+        raise HTTPException(status_code=400, detail="Query is required")
+    admit(http_request, "ai-insights-stream")
+    
+    async def events():
+        try:
+            async for delta in stream_ai_insights(query):
+                yield sse_event("token", {"delta": delta})
+        except asyncio.CancelledError:
+            raise
+        except Overloaded as e:
+            ai_service.ai_fallbacks.inc("insights", e.reason)
+            busy = busy_insights(e)
+            yield sse_event("token", {"delta": busy.pop("response")})
+            yield sse_event("done", {**busy, "timestamp": datetime.now().isoformat()})
+            return
+        except Exception as e:
+            print(f"Error streaming AI insights: {e!r}")
+            yield sse_event("error", {"error": str(e) or type(e).__name__, "response": "AI insights temporarily unavailable"})
+            return
+        yield sse_event("done", {
+            "model": "gpt-4.1-mini" if ai_service.ai_enabled else "sample",
+            "timestamp": datetime.now().isoformat()
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for deployment monitoring"""
@@ -572,61 +1382,93 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "service": "Horse Racing Dashboard API",
         "version": "4.0",
-        "ai_enabled": ai_enabled,
-        "total_races": len(SAMPLE_RACES),
+        "ai_enabled": ai_service.ai_enabled,
+        "ai_cache": prediction_cache.stats(),
+        "ai_admission": {
+            "clients": client_limiter.stats(),
+            "queue": ai_service.upstream_queue.stats(),
+            "circuit": ai_service.upstream_breaker.stats()
+        },
+        "ai_precompute": prediction_scheduler.stats(),
+        "live": live_feed.stats(),
+        "response_cache": response_cache.stats(),
+        "odds_feed": odds_ingestor.stats() if odds_ingestor else None,
+        "odds_history": odds_history.stats(),
+        "shared_state": shared_state.stats(),
+        "analytics": market_analytics.peek().stats() if market_analytics.ready else None,
+        "search": runner_index.peek().stats() if runner_index.ready else None,
+        "assets": asset_pipeline.peek().stats() if asset_pipeline.ready else None,
+        "startup": startup.stats(),
+        "total_races": len(race_store),
         "total_tracks": sum(len(tracks) for tracks in AUSTRALIAN_TRACKS.values())
     }
 
 
-# ========================================
-# Helper Functions
-# ========================================
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the search index, analytics and AI client are built (at once with WARM_UP=0), 503 before"""
+    return JSONResponse(
+        {"timestamp": datetime.now().isoformat(), **startup.stats()},
+        status_code=200 if startup.ready else 503
+    )
 
-def extract_time(race_name: str) -> str:
-    """Extract time from race name (e.g., '2:15 PM' from 'Royal Randwick - 2:15 PM')"""
-    match = re.search(r'(\d{1,2}:\d{2}\s*(?:AM|PM|am|pm))', race_name)
-    return match.group(1) if match else None
 
+# ========================================
+# Metrics
+# ========================================
 
-def parse_time_to_minutes(time_str: str) -> int:
-    """Convert time string to minutes since midnight"""
-    match = re.match(r'(\d{1,2}):(\d{2})\s*(AM|PM|am|pm)', time_str)
-    if not match:
-        return 0
-    
-    hours, minutes, period = match.groups()
-    hours = int(hours)
-    minutes = int(minutes)
-    
-    if period.upper() == 'PM' and hours != 12:
-        hours += 12
-    elif period.upper() == 'AM' and hours == 12:
-        hours = 0
-    
-    return hours * 60 + minutes
+cache_hits = registry.counter("cache_hits_total", "Cache lookups answered from the cache", ("cache",))
+cache_misses = registry.counter("cache_misses_total", "Cache lookups that had to build or compute", ("cache",))
+cache_hit_ratio = registry.gauge("cache_hit_ratio", "Share of cache lookups answered from the cache", ("cache",))
+live_subscribers = registry.gauge("live_subscribers", "Clients connected to /api/live")
+odds_ticks = registry.counter("odds_ticks_total", "Odds ticks ingested")
+analytics_pass = registry.gauge("analytics_last_pass_seconds", "Duration of the last market analytics pass")
+races_total = registry.gauge("races", "Races on the card")
+ai_queue_waiting = registry.gauge("ai_queue_waiting", "AI calls queued for an upstream slot")
+ai_queue_in_flight = registry.gauge("ai_queue_in_flight", "AI calls holding an upstream slot")
+ai_shed = registry.counter("ai_shed_total", "AI calls refused by the upstream queue", ("reason",))
+ai_circuit_open = registry.gauge("ai_circuit_open", "1 while the upstream circuit breaker is open")
+startup_seconds = registry.gauge("startup_phase_seconds", "Seconds from process start until each startup phase finished", ("phase",))
+subsystems_ready = registry.gauge("lazy_subsystems_ready", "Lazily built subsystems that are built")
 
 
-def is_time_in_range(time_str: str, time_from: str, time_to: str) -> bool:
-    """Check if time is within range"""
-    time_minutes = parse_time_to_minutes(time_str)
-    from_minutes = parse_time_to_minutes(time_from)
-    to_minutes = parse_time_to_minutes(time_to)
-    
-    return from_minutes <= time_minutes <= to_minutes
+@registry.collector
+def collect_metrics():
+    """Mirror component counters into the registry before each scrape"""
+    ai_cache = prediction_cache.stats()
+    caches = {
+        # Coalesced lookups waited on another request's call instead of making their own
+        "ai_prediction": (ai_cache["hits"] + ai_cache["coalesced"], ai_cache["misses"]),
+        "response": (response_cache.hits, response_cache.builds)
+    }
+    for cache, (hits, misses) in caches.items():
+        cache_hits.set(hits, cache)
+        cache_misses.set(misses, cache)
+        cache_hit_ratio.set(round(hits / (hits + misses), 4) if hits + misses else 0.0, cache)
+    live_subscribers.set(live_feed.stats()["subscribers"])
+    odds_ticks.set(odds_ingestor.ticks if odds_ingestor else 0)
+    if market_analytics.ready:
+        analytics_pass.set(market_analytics.peek().last_pass_ms / 1000)
+    for phase, seconds in startup.phases.items():
+        startup_seconds.set(round(seconds, 4), phase)
+    subsystems_ready.set(sum(subsystem.ready for subsystem in startup.subsystems))
+    races_total.set(len(race_store))
+    queue = ai_service.upstream_queue
+    ai_queue_waiting.set(queue.waiting)
+    ai_queue_in_flight.set(queue.in_flight)
+    ai_shed.set(queue.rejected, "queue_full")
+    ai_shed.set(queue.timed_out, "queue_timeout")
+    ai_shed.set(ai_service.upstream_breaker.short_circuited, "circuit_open")
+    ai_circuit_open.set(int(ai_service.upstream_breaker.state == "open"))
 
 
-def is_time_after(time_str: str, time_from: str) -> bool:
-    """Check if time is after given time"""
-    time_minutes = parse_time_to_minutes(time_str)
-    from_minutes = parse_time_to_minutes(time_from)
-    return time_minutes >= from_minutes
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics for this worker"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 
-def is_time_before(time_str: str, time_to: str) -> bool:
-    """Check if time is before given time"""
-    time_minutes = parse_time_to_minutes(time_str)
-    to_minutes = parse_time_to_minutes(time_to)
-    return time_minutes <= to_minutes
+startup.mark("import")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,310 @@
+"""
+Market analytics for the Horse Racing Dashboard
+Scores every runner on the card in one vectorised NumPy pass: implied
+probabilities, overround, form features and value/edge
+"""
+
+import time
+
+import numpy as np
+
+# Form strings read oldest to newest ("4-2-1" won last start); depth kept per runner
+FORM_DEPTH = 6
+# Weight of each start, most recent first
+FORM_WEIGHTS = np.array([1.0, 0.8, 0.65, 0.5, 0.4, 0.3])
+# Rating points for a finishing position (index = position, 0 = no start)
+FINISH_POINTS = np.array([0.0, 1.0, 0.6, 0.4, 0.2, 0.1, 0.0, 0.0, 0.0, 0.0, 0.0])
+UNPLACED = 10
+# How strongly form tilts the market's fair probabilities
+FORM_STRENGTH = 1.5
+
+
+def parse_form(form: str) -> list:
+    """Finishing positions from a form string, most recent first
+
+    Accepts "2-1-3" or "213"; "0" is unplaced (10th or worse) and spell
+    markers such as "x" are skipped.
+    """
+    parts = form.split("-") if "-" in form else list(form)
+    positions = []
+    for part in reversed(parts):
+        part = part.strip()
+        if part.isdigit():
+            positions.append(int(part) or UNPLACED)
+        if len(positions) == FORM_DEPTH:
+            break
+    return positions
+
+
+def form_features(form: str) -> tuple:
+    """(rating, wins, placings, starts) from a form string
+
+    The rating is the recency-weighted average of FINISH_POINTS over the
+    last FORM_DEPTH starts, from 0 (never placed) to 1 (won every start).
+    """
+    positions = parse_form(form)
+    if not positions:
+        return 0.0, 0, 0, 0
+    weights = FORM_WEIGHTS[:len(positions)]
+    points = FINISH_POINTS[np.minimum(positions, UNPLACED)]
+    rating = float((points * weights).sum() / weights.sum())
+    wins = sum(1 for position in positions if position == 1)
+    placings = sum(1 for position in positions if position <= 3)
+    return rating, wins, placings, len(positions)
+
+
+class AnalyticsFrame:
+    """Runner columns for the whole card, laid out race by race
+
+    Odds and form are updated in place for races whose runner count is
+    unchanged, so an odds update touches only the rows of the ticked races.
+    Form features are computed once per distinct form string.
+    """
+
+    def __init__(self, races: list):
+        self.races = list(races)
+        self.position = {race["id"]: index for index, race in enumerate(self.races)}
+        self.counts = np.array([len(race.get("horses", [])) for race in self.races], dtype=np.int64)
+        self.starts = np.zeros(len(self.races), dtype=np.int64)
+        if len(self.races):
+            self.starts[1:] = np.cumsum(self.counts)[:-1]
+        size = int(self.counts.sum())
+        self.race_index = np.repeat(np.arange(len(self.races)), self.counts)
+        self.odds = np.full(size, np.nan)
+        self.place_odds = np.full(size, np.nan)
+        self.form_rating = np.zeros(size)
+        self.wins = np.zeros(size, dtype=np.int64)
+        self.placings = np.zeros(size, dtype=np.int64)
+        self.starts_run = np.zeros(size, dtype=np.int64)
+        self.forms = [None] * size
+        self._features = {}
+        for race in self.races:
+            self._write(race)
+
+    def __len__(self) -> int:
+        return len(self.odds)
+
+    def _write(self, race: dict):
+        row = int(self.starts[self.position[race["id"]]])
+        for horse in race.get("horses", []):
+            self.odds[row] = horse.get("odds") or np.nan
+            self.place_odds[row] = horse.get("place_odds") or np.nan
+            form = horse.get("form") or ""
+            if form != self.forms[row]:
+                features = self._features.get(form)
+                if features is None:
+                    features = self._features[form] = form_features(form)
+                self.form_rating[row], self.wins[row], self.placings[row], self.starts_run[row] = features
+                self.forms[row] = form
+            row += 1
+
+    def update(self, races: list) -> bool:
+        """Write the updated races in place; False if the layout changed"""
+        for race in races:
+            index = self.position.get(race["id"])
+            if index is None or self.counts[index] != len(race.get("horses", [])):
+                return False
+        for race in races:
+            self.races[self.position[race["id"]]] = race
+            self._write(race)
+        return True
+
+
+class MarketAnalytics:
+    """Vectorised runner scores and the predictions/roughies derived from them
+
+    ``market`` is the win probability implied by the odds with the
+    overround removed; ``model`` tilts it by recent form relative to the
+    rest of the field; ``edge`` is the expected return of a $1 win bet at
+    the current odds under the model.
+    """
+
+    def __init__(self, races: list, min_roughie_odds: float = 4.0, top_k: int = 10):
+        self.min_roughie_odds = min_roughie_odds
+        self.top_k = top_k
+        self.frame = AnalyticsFrame(races)
+        self.scores = None
+        self.passes = 0
+        self.last_pass_ms = 0.0
+
+    def load(self, races: list):
+        """Lay out a new card"""
+        self.frame = AnalyticsFrame(races)
+
+    def update(self, updated: list, races: list):
+        """Apply updated races, rebuilding the frame if races or runners were added"""
+        if not self.frame.update(updated):
+            self.load(races)
+
+    def score(self) -> dict:
+        """One pass over every runner; returns the column arrays"""
+        frame = self.frame
+        race_count = len(frame.races)
+        race_index = frame.race_index
+        odds = frame.odds
+
+        valid = odds > 1.0
+        implied = np.where(valid, 1.0 / np.where(valid, odds, 1.0), 0.0)
+        overround = np.bincount(race_index, implied, minlength=race_count)
+        market = implied / np.maximum(overround, 1e-9)[race_index]
+
+        place_valid = frame.place_odds > 1.0
+        place_implied = np.where(place_valid, 1.0 / np.where(place_valid, frame.place_odds, 1.0), 0.0)
+        places = np.where(frame.counts >= 8, 3, 2)
+        place_overround = np.bincount(race_index, place_implied, minlength=race_count) / places
+        place = np.minimum(place_implied / np.maximum(place_overround, 1e-9)[race_index], 1.0)
+
+        form_rating = frame.form_rating
+        runners = np.bincount(race_index, valid, minlength=race_count)
+        field_form = np.bincount(race_index, form_rating * valid, minlength=race_count) / np.maximum(runners, 1)
+        strength = market * np.exp(FORM_STRENGTH * (form_rating - field_form[race_index]))
+        model = strength / np.maximum(np.bincount(race_index, strength, minlength=race_count), 1e-9)[race_index]
+
+        self.scores = {
+            "valid": valid,
+            "implied": implied,
+            "overround": overround,
+            "market": market,
+            "place": place,
+            "form_rating": form_rating,
+            "wins": frame.wins,
+            "placings": frame.placings,
+            "starts": frame.starts_run,
+            "model": model,
+            "edge": np.where(valid, model * np.where(valid, odds, 0.0) - 1.0, -1.0)
+        }
+        self.passes += 1
+        return self.scores
+
+    def runner(self, row: int) -> tuple:
+        """(race, horse) for a frame row"""
+        frame = self.frame
+        race = frame.races[frame.race_index[row]]
+        return race, race["horses"][row - frame.starts[frame.race_index[row]]]
+
+    def predictions(self) -> list:
+        """Top pick of each race, strongest first, in the /api/predictions format"""
+        scores = self.scores
+        frame = self.frame
+        counts = frame.counts
+        model = np.where(scores["valid"], scores["model"], -1.0)
+        # Best and second-best runner per race via segmented max, no sort of the card
+        races = np.flatnonzero(counts > 0)
+        if len(races) == 0:
+            return []
+        top = np.maximum.reduceat(model, frame.starts[races])
+        is_top = model == np.repeat(top, counts[races])
+        # First row of each race holding its maximum
+        first = np.minimum.reduceat(np.where(is_top, np.arange(len(model)), len(model)), frame.starts[races])
+        masked = model.copy()
+        masked[first] = -1.0
+        runner_up = np.maximum(np.maximum.reduceat(masked, frame.starts[races]), 0.0)
+        picked = top > 0
+        first, top, runner_up = first[picked], top[picked], runner_up[picked]
+        confidence = np.clip(np.rint(100 * top / np.maximum(top + runner_up, 1e-9)), 50, 95).astype(int)
+
+        predictions = []
+        picks = np.arange(len(confidence))
+        if len(picks) > self.top_k:
+            picks = np.argpartition(-confidence, self.top_k)[:self.top_k]
+        # Highest confidence first, card order between equals
+        picks = picks[np.lexsort((picks, -confidence[picks]))]
+        for rank, pick in enumerate(picks, start=1):
+            row = int(first[pick])
+            race, horse = self.runner(row)
+            probability = scores["model"][row]
+            edge = scores["edge"][row]
+            if confidence[pick] >= 70:
+                tip = "WIN"
+            elif scores["place"][row] >= 0.6:
+                tip = "PLACE"
+            else:
+                tip = "EACH WAY"
+            if edge > 0.05:
+                label = "Good Value Bet"
+            elif scores["market"][row] >= 0.4:
+                label = "Strong Favorite"
+            elif scores["form_rating"][row] >= 0.6:
+                label = "Strong Recent Form"
+            else:
+                label = "Consistent Performer"
+            predictions.append({
+                "rank": rank,
+                "horse": horse.get("name"),
+                "track": race.get("track"),
+                "race_id": race["id"],
+                "number": horse.get("number"),
+                "confidence": int(confidence[pick]),
+                "prediction": label,
+                "analysis": self.describe(row),
+                "tip": tip,
+                "win_probability": round(float(probability), 3),
+                "edge": round(float(edge), 3)
+            })
+        return predictions
+
+    def roughies(self) -> list:
+        """Best-value outsiders across the card, in the /api/roughies format"""
+        scores = self.scores
+        odds = self.frame.odds
+        candidates = np.flatnonzero(scores["valid"] & (odds >= self.min_roughie_odds))
+        edges = scores["edge"][candidates]
+        if len(candidates) > self.top_k:
+            keep = np.argpartition(-edges, self.top_k)[:self.top_k]
+            candidates, edges = candidates[keep], edges[keep]
+        ranked = candidates[np.lexsort((candidates, -edges))]
+
+        roughies = []
+        for rank, row in enumerate(ranked, start=1):
+            row = int(row)
+            race, horse = self.runner(row)
+            edge = scores["edge"][row]
+            place = scores["place"][row]
+            if edge > 0.15:
+                tip, reason = "WIN", "Value play at current odds"
+            elif place >= 0.4:
+                tip, reason = "PLACE", "Value pick for place betting"
+            else:
+                tip, reason = "EACH WAY", "High odds outsider"
+            roughies.append({
+                "rank": rank,
+                "horse": horse.get("name"),
+                "track": race.get("track"),
+                "race_id": race["id"],
+                "number": horse.get("number"),
+                "odds": float(odds[row]),
+                "confidence": int(np.clip(np.rint(50 + 100 * edge), 35, 85)),
+                "analysis": self.describe(row),
+                "tip": tip,
+                "reason": reason,
+                "edge": round(float(edge), 3)
+            })
+        return roughies
+
+    def describe(self, row: int) -> str:
+        """One-line analysis of a runner from its scores"""
+        scores = self.scores
+        _, horse = self.runner(row)
+        text = (
+            f"Rated {scores['model'][row]:.0%} to win against {scores['market'][row]:.0%} implied by the market. "
+            f"{int(scores['placings'][row])} placings from the last {int(scores['starts'][row])} starts"
+        )
+        if horse.get("jockey"):
+            text += f", ridden by {horse['jockey']}"
+        return text + "."
+
+    def refresh(self) -> dict:
+        """Score the card and build both views"""
+        started = time.perf_counter()
+        self.score()
+        views = {"predictions": self.predictions(), "roughies": self.roughies()}
+        self.last_pass_ms = round((time.perf_counter() - started) * 1000, 3)
+        return views
+
+    def stats(self) -> dict:
+        return {
+            "runners": len(self.frame),
+            "races": len(self.frame.races),
+            "passes": self.passes,
+            "last_pass_ms": self.last_pass_ms
+        }
@@ -0,0 +1,290 @@
+"""
+Market movers for the Horse Racing Dashboard
+Per-runner rolling price windows and incrementally ranked movers, updated per tick
+"""
+
+from bisect import bisect_left, insort
+from collections import deque
+import heapq
+import time
+
+DEFAULT_WINDOWS = "5m,15m,open"
+STABLE_EPSILON = 0.005
+
+
+def parse_windows(spec: str) -> dict:
+    """Parse a window list like '5m,15m,open' into {name: seconds or None}"""
+    windows = {}
+    for name in (part.strip() for part in spec.split(",")):
+        if not name:
+            continue
+        if name == "open":
+            windows[name] = None
+        elif name.endswith("m"):
+            windows[name] = int(name[:-1]) * 60
+        elif name.endswith("h"):
+            windows[name] = int(name[:-1]) * 3600
+        else:
+            windows[name] = int(name)
+    return windows
+
+
+def volume_label(ticks: int) -> str:
+    """Qualitative trading volume from the number of price ticks in the window"""
+    if ticks >= 20:
+        return "Very High"
+    if ticks >= 10:
+        return "High"
+    if ticks >= 3:
+        return "Medium"
+    return "Low"
+
+
+class RunnerHistory:
+    """Opening price plus a bounded rolling window of (ts, odds) for one runner"""
+
+    __slots__ = ("race_id", "number", "horse", "track", "open_odds", "prices", "floor", "max_prices")
+
+    def __init__(self, race_id: str, number: int, horse: str, track: str,
+                 open_odds: float, ts: float, max_prices: int):
+        self.race_id = race_id
+        self.number = number
+        self.horse = horse
+        self.track = track
+        self.open_odds = open_odds
+        self.prices = deque([(ts, open_odds)])
+        # Last price dropped from the window - the reference for windows reaching past it
+        self.floor = None
+        self.max_prices = max_prices
+
+    @property
+    def current(self) -> float:
+        return self.prices[-1][1]
+
+    def record(self, ts: float, odds: float, keep_seconds: float):
+        self.prices.append((ts, odds))
+        # Keep one price at or before the longest window so it has a reference
+        horizon = ts - keep_seconds
+        while len(self.prices) > 2 and self.prices[1][0] <= horizon:
+            self.floor = self.prices.popleft()
+        while len(self.prices) > self.max_prices:
+            self.floor = self.prices.popleft()
+
+    def reference(self, window_seconds: float, now: float) -> float:
+        """Price as of ``window_seconds`` ago (opening price for 'since open')"""
+        if window_seconds is None:
+            return self.open_odds
+        start = now - window_seconds
+        reference = self.floor[1] if self.floor is not None else self.prices[0][1]
+        for ts, odds in self.prices:
+            if ts > start:
+                break
+            reference = odds
+        return reference
+
+    def next_change(self, window_seconds: float, now: float) -> float:
+        """When the window's reference next moves: as its oldest price inside slides out
+
+        None when no price is inside the window - the movement is then 0
+        until the next tick.
+        """
+        start = now - window_seconds
+        for ts, _ in self.prices:
+            if ts > start:
+                return ts + window_seconds
+        return None
+
+    def ticks_since(self, start: float) -> int:
+        return sum(1 for ts, _ in self.prices if ts > start)
+
+
+class MoverRanking:
+    """Runners of one window kept sorted by absolute movement
+
+    Updating a runner is a bisect remove + insert, so the top-k is always a
+    slice of the sorted list and never needs a rescan of all runners.
+    """
+
+    def __init__(self):
+        self._sorted = []
+        self._entry = {}
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def update(self, key: tuple, movement: float):
+        old = self._entry.pop(key, None)
+        if old is not None:
+            del self._sorted[bisect_left(self._sorted, old)]
+        if abs(movement) > STABLE_EPSILON:
+            entry = (-abs(movement), key)
+            insort(self._sorted, entry)
+            self._entry[key] = entry
+
+    def top(self, k: int) -> list:
+        return [key for _, key in self._sorted[:k]]
+
+
+class MarketMoversTracker:
+    """Tracks runner prices and ranks market movers per window
+
+    ``windows`` maps a window name to its length in seconds (None = since
+    open). ``trend_window`` is the window driving runners' trend fields.
+    Movements are re-ranked whenever a runner ticks, and for rolling windows
+    again as the window slides past its prices: a per-window heap holds when
+    each runner's reference next moves, and ``expire`` re-scores the runners
+    that are due.
+    """
+
+    def __init__(self, windows: dict, trend_window: str = "open", max_prices: int = 256):
+        self.windows = windows
+        self.trend_window = trend_window if trend_window in windows else next(iter(windows))
+        self.max_prices = max_prices
+        finite = [seconds for seconds in windows.values() if seconds is not None]
+        self.keep_seconds = max(finite) if finite else 0
+        self._runners = {}
+        # Opening prices of runners that have not ticked yet; their history is built on the first tick
+        self._openings = {}
+        self._rankings = {name: MoverRanking() for name in windows}
+        # Per rolling window: heap of (due, key) and each runner's current due time
+        self._expiries = {name: [] for name, seconds in windows.items() if seconds is not None}
+        self._due = {name: {} for name in self._expiries}
+        self.ticks = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._runners) + len(self._openings)
+
+    @property
+    def active(self) -> bool:
+        """True once any price tick has been recorded"""
+        return self.ticks > 0
+
+    def seed(self, races: list, ts: float = None):
+        """Record opening prices for runners not tracked yet
+
+        Only a tuple per runner is kept here - most runners on a big card
+        never tick, so their price windows are not worth building up front.
+        """
+        ts = time.time() if ts is None else ts
+        runners = self._runners
+        openings = self._openings
+        for race in races:
+            race_id = race["id"]
+            track = race.get("track")
+            for horse in race.get("horses", []):
+                key = (race_id, horse.get("number"))
+                if horse.get("odds") is not None and key not in runners and key not in openings:
+                    openings[key] = (race_id, key[1], horse.get("name"), track, horse["odds"], ts)
+
+    def record(self, race_id: str, number: int, odds: float, ts: float = None) -> bool:
+        """Record one price tick and re-rank that runner; False if unknown"""
+        runner = self._runners.get((race_id, number))
+        if runner is None:
+            opening = self._openings.pop((race_id, number), None)
+            if opening is None:
+                return False
+            runner = self._runners[(race_id, number)] = RunnerHistory(*opening, self.max_prices)
+        ts = time.time() if ts is None else ts
+        runner.record(ts, odds, self.keep_seconds)
+        self.ticks += 1
+        for name, seconds in self.windows.items():
+            self._rankings[name].update((race_id, number), odds - runner.reference(seconds, ts))
+            if seconds is not None:
+                self._schedule(name, (race_id, number), runner.next_change(seconds, ts))
+        return True
+
+    def restore(self, history) -> int:
+        """Rebuild price windows from an ``OddsHistory``, e.g. after a restart or failover
+
+        Replays just the ticks each runner's windows still hold, oldest
+        first; returns how many were replayed.
+        """
+        replayed = 0
+        for race_id, number in history.runners():
+            prices = history.recent_odds(race_id, number, self.keep_seconds, self.max_prices + 1)
+            opening = self._openings.get((race_id, number))
+            if prices and opening is not None:
+                # Seeded at startup: date the opening price back before the replayed ticks
+                self._openings[(race_id, number)] = opening[:5] + (min(opening[5], prices[0][0]),)
+            for ts, odds in prices:
+                replayed += self.record(race_id, number, odds, ts)
+        return replayed
+
+    def _schedule(self, window: str, key: tuple, due: float):
+        if due is None:
+            self._due[window].pop(key, None)
+            return
+        self._due[window][key] = due
+        heapq.heappush(self._expiries[window], (due, key))
+
+    def next_expiry(self) -> float:
+        """Earliest time a rolling window needs re-ranking, or None"""
+        due = [heap[0][0] for heap in self._expiries.values() if heap]
+        return min(due) if due else None
+
+    def expire(self, now: float = None) -> int:
+        """Re-score runners whose window reference has moved by ``now``; returns how many"""
+        now = time.time() if now is None else now
+        rescored = 0
+        for name, heap in self._expiries.items():
+            seconds = self.windows[name]
+            due = self._due[name]
+            ranking = self._rankings[name]
+            while heap and heap[0][0] <= now:
+                at, key = heapq.heappop(heap)
+                # Superseded by a later tick of the same runner
+                if due.get(key) != at:
+                    continue
+                runner = self._runners[key]
+                ranking.update(key, runner.current - runner.reference(seconds, now))
+                self._schedule(name, key, runner.next_change(seconds, now))
+                rescored += 1
+        self.expired += rescored
+        return rescored
+
+    def trend(self, race_id: str, number: int, now: float = None) -> tuple:
+        """(trend, trendValue) for a runner over the trend window"""
+        runner = self._runners.get((race_id, number))
+        if runner is None:
+            # Unknown, or has not moved from its opening price
+            return "stable", "0.0"
+        now = time.time() if now is None else now
+        movement = runner.current - runner.reference(self.windows[self.trend_window], now)
+        if movement > STABLE_EPSILON:
+            return "up", f"{movement:+.1f}"
+        if movement < -STABLE_EPSILON:
+            return "down", f"{movement:+.1f}"
+        return "stable", "0.0"
+
+    def top(self, window: str, k: int, now: float = None) -> list:
+        """Top-k movers for a window, in the /api/market-movers format
+
+        Runners whose movement has left the window are re-scored first, so
+        only runners that moved within it are listed.
+        """
+        now = time.time() if now is None else now
+        self.expire(now)
+        seconds = self.windows[window]
+        start = now - seconds if seconds is not None else float("-inf")
+        movers = []
+        for key in self._rankings[window].top(k):
+            runner = self._runners[key]
+            previous = runner.reference(seconds, now)
+            movement = runner.current - previous
+            if abs(movement) <= STABLE_EPSILON:
+                continue
+            movers.append({
+                "rank": len(movers) + 1,
+                "horse": runner.horse,
+                "track": runner.track,
+                "race_id": runner.race_id,
+                "number": runner.number,
+                "movement": f"{movement:+.2f}",
+                "direction": "up" if movement > 0 else "down",
+                "current_odds": runner.current,
+                "previous_odds": previous,
+                "volume": volume_label(runner.ticks_since(start)),
+                "window": window
+            })
+        return movers
@@ -0,0 +1,337 @@
+"""
+Odds history store for the Horse Racing Dashboard
+Columnar, append-only price ticks in a fixed-size memory-mapped file
+"""
+
+import math
+import mmap
+import os
+import struct
+import zlib
+
+MAGIC = b"ODDSHIST"
+FORMAT_VERSION = 2
+# magic, format version, capacity (rows), total rows ever appended, crc32 of the race card id
+HEADER = struct.Struct("<8sIQQI")
+HEADER_SIZE = 64
+
+# Column name, typecode and width in bytes - one contiguous typed array each
+COLUMNS = (
+    ("ts", "d", 8),       # epoch seconds
+    ("prev", "q", 8),     # sequence of the runner's previous tick, -1 for none
+    ("odds", "f", 4),     # win odds, NaN if the tick did not carry them
+    ("place", "f", 4),    # place odds, NaN if the tick did not carry them
+    ("runner", "I", 4),   # index into the runner table
+)
+ROW_SIZE = sum(width for _, _, width in COLUMNS)
+
+
+def downsample(points: list, max_points: int) -> list:
+    """Reduce time-ordered [ts, odds, place] points to at most ``max_points``
+
+    The range is split into equal time buckets and the last price in each is
+    kept (the price a chart would show at the end of that bucket), plus the
+    very first point so the series still starts at the opening price.
+    """
+    if max_points <= 0 or len(points) <= max_points:
+        return points
+    if max_points == 1:
+        return [points[-1]]
+    first_ts = points[0][0]
+    buckets = max_points - 1
+    width = (points[-1][0] - first_ts) / buckets or 1.0
+    last_in_bucket = {}
+    for point in points[1:]:
+        last_in_bucket[min(int((point[0] - first_ts) / width), buckets - 1)] = point
+    return [points[0]] + list(last_in_bucket.values())
+
+
+class OddsHistory:
+    """Per-runner price history in typed columns over one memory-mapped file
+
+    The file holds ``capacity`` rows, so its size is fixed by the memory
+    budget and never grows: once full, the oldest ticks (races that jumped
+    long ago) are overwritten ring-buffer style. Each row links to its
+    runner's previous row, so one runner's series is read by walking its
+    chain without scanning other runners. Runner keys live in a small
+    sidecar file next to the data file.
+
+    Race ids are reused from one race day to the next, so the file is tied
+    to the race card it was written for: opened for a different ``card``
+    (or an older format) the writer starts it afresh, and readers wait
+    until it has.
+    """
+
+    def __init__(self, path: str, max_bytes: int, readonly: bool = False, card: str = ""):
+        self.path = path
+        self.card = zlib.crc32(card.encode())
+        # Readers map the file written by another process and follow it with refresh()
+        self.readonly = readonly
+        self.capacity = max(1, (max_bytes - HEADER_SIZE) // ROW_SIZE)
+        self.total = 0
+        self._mmap = None
+        self._view = None
+        self._columns = {}
+        self._runners = []
+        self._runner_index = {}
+        self._runners_by_race = {}
+        self._last = []
+        self._runner_file = None
+        self._runner_offset = 0
+        if os.path.exists(path):
+            self._open()
+
+    # ----------------------------------------
+    # File layout
+    # ----------------------------------------
+
+    def _open(self):
+        """Map the data file (creating it if needed) and load the runner table"""
+        size = HEADER_SIZE + self.capacity * ROW_SIZE
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER_SIZE
+        if exists:
+            with open(self.path, "rb") as data:
+                magic, version, capacity, total, card = HEADER.unpack(data.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not an odds history file")
+            if version != FORMAT_VERSION or card != self.card:
+                if self.readonly:
+                    # Left for the writer to start afresh; refresh() retries
+                    return
+                print(f"Odds history {self.path} is from another race card, starting afresh")
+                exists = False
+            else:
+                # The file keeps the capacity it was created with
+                self.capacity = capacity
+                self.total = total
+                size = HEADER_SIZE + capacity * ROW_SIZE
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "r+b" if exists else "w+b") as data:
+            data.truncate(size)
+            self._mmap = mmap.mmap(data.fileno(), size)
+
+        self._view = memoryview(self._mmap)
+        offset = HEADER_SIZE
+        for name, typecode, width in COLUMNS:
+            self._columns[name] = self._view[offset:offset + self.capacity * width].cast(typecode)
+            offset += self.capacity * width
+
+        if exists:
+            self._read_runners()
+            self._rebuild_chains(self.oldest)
+        else:
+            self._write_header()
+        if not self.readonly:
+            self._runner_file = open(self.path + ".runners", "a" if exists else "w")
+
+    def _read_runners(self):
+        """Load runner table entries added since the last read"""
+        runners_path = self.path + ".runners"
+        if not os.path.exists(runners_path):
+            return
+        with open(runners_path) as table:
+            table.seek(self._runner_offset)
+            for line in iter(table.readline, ""):
+                if not line.endswith("\n"):
+                    break
+                race_id, _, number = line.rstrip("\n").partition("\t")
+                self._add_runner(race_id, int(number))
+                self._runner_offset = table.tell()
+
+    def _rebuild_chains(self, start: int):
+        """Find each runner's latest row among rows ``start`` onwards"""
+        runner_column = self._columns["runner"]
+        for seq in range(max(start, self.oldest), self.total):
+            runner = runner_column[seq % self.capacity]
+            if runner < len(self._last):
+                self._last[runner] = seq
+
+    def refresh(self):
+        """Pick up rows appended by the writing process (readers only)"""
+        if self._mmap is None:
+            if not os.path.exists(self.path):
+                return
+            self._open()
+            return
+        previous = self.total
+        self.total = HEADER.unpack_from(self._mmap, 0)[3]
+        self._read_runners()
+        self._rebuild_chains(previous)
+
+    def _write_header(self):
+        HEADER.pack_into(self._mmap, 0, MAGIC, FORMAT_VERSION, self.capacity, self.total, self.card)
+
+    def _add_runner(self, race_id: str, number: int) -> int:
+        index = len(self._runners)
+        self._runners.append((race_id, number))
+        self._runner_index[(race_id, number)] = index
+        self._runners_by_race.setdefault(race_id, []).append(index)
+        self._last.append(-1)
+        return index
+
+    def promote(self):
+        """Take over writing from a process that has stopped (readers only)"""
+        if not self.readonly:
+            return
+        self.refresh()
+        self.readonly = False
+        if self._mmap is not None:
+            self._runner_file = open(self.path + ".runners", "a")
+
+    @property
+    def oldest(self) -> int:
+        """Sequence of the oldest row still held"""
+        return max(0, self.total - self.capacity)
+
+    # ----------------------------------------
+    # Writing
+    # ----------------------------------------
+
+    def append(self, race_id: str, number: int, ts: float, odds: float = None, place_odds: float = None):
+        """Append one runner tick; missing prices are stored as NaN"""
+        if self.readonly:
+            raise ValueError("Odds history is open read-only")
+        if self._mmap is None:
+            self._open()
+        runner = self._runner_index.get((race_id, number))
+        if runner is None:
+            runner = self._add_runner(race_id, number)
+            self._runner_file.write(f"{race_id}\t{number}\n")
+            self._runner_file.flush()
+
+        seq = self.total
+        slot = seq % self.capacity
+        columns = self._columns
+        columns["ts"][slot] = ts
+        columns["prev"][slot] = self._last[runner]
+        columns["odds"][slot] = math.nan if odds is None else odds
+        columns["place"][slot] = math.nan if place_odds is None else place_odds
+        columns["runner"][slot] = runner
+        self._last[runner] = seq
+        self.total = seq + 1
+
+    def commit(self):
+        """Publish the row count for a batch of appends to the file header"""
+        if self._mmap is not None and not self.readonly:
+            self._write_header()
+
+    def close(self):
+        if self._mmap is None:
+            return
+        if not self.readonly:
+            self.commit()
+            self._mmap.flush()
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        self._view.release()
+        self._view = None
+        self._mmap.close()
+        self._mmap = None
+        if self._runner_file is not None:
+            self._runner_file.close()
+            self._runner_file = None
+
+    # ----------------------------------------
+    # Reading
+    # ----------------------------------------
+
+    def runner_series(self, race_id: str, number: int, start: float = None, end: float = None) -> list:
+        """[ts, odds, place] points for one runner, oldest first
+
+        Prices missing from a tick are carried forward from the previous one.
+        """
+        runner = self._runner_index.get((race_id, number))
+        if runner is None or self._mmap is None:
+            return []
+        ts_column = self._columns["ts"]
+        prev_column = self._columns["prev"]
+        odds_column = self._columns["odds"]
+        place_column = self._columns["place"]
+        oldest = self.oldest
+
+        rows = []
+        seq = self._last[runner]
+        while seq >= oldest:
+            slot = seq % self.capacity
+            ts = ts_column[slot]
+            if start is not None and ts < start:
+                break
+            if end is None or ts <= end:
+                rows.append(slot)
+            seq = prev_column[slot]
+        rows.reverse()
+
+        points = []
+        odds = place = None
+        for slot in rows:
+            value = odds_column[slot]
+            if value == value:
+                odds = round(value, 2)
+            value = place_column[slot]
+            if value == value:
+                place = round(value, 2)
+            points.append([ts_column[slot], odds, place])
+        return points
+
+    def race_series(self, race_id: str, start: float = None, end: float = None, max_points: int = 0) -> dict:
+        """{saddlecloth number: downsampled points} for every runner with history"""
+        series = {}
+        for runner in self._runners_by_race.get(race_id, []):
+            number = self._runners[runner][1]
+            points = self.runner_series(race_id, number, start, end)
+            if points:
+                series[number] = downsample(points, max_points)
+        return series
+
+    def recent_odds(self, race_id: str, number: int, seconds: float, limit: int) -> list:
+        """(ts, odds) of a runner's win price ticks, oldest first
+
+        Covers the ``seconds`` before its latest tick plus the last tick
+        before that span, at most ``limit`` ticks. Place-only ticks are left
+        out.
+        """
+        runner = self._runner_index.get((race_id, number))
+        if runner is None or self._mmap is None:
+            return []
+        ts_column = self._columns["ts"]
+        prev_column = self._columns["prev"]
+        odds_column = self._columns["odds"]
+        oldest = self.oldest
+
+        points = []
+        horizon = None
+        seq = self._last[runner]
+        while seq >= oldest and len(points) < limit:
+            slot = seq % self.capacity
+            odds = odds_column[slot]
+            if odds == odds:
+                ts = ts_column[slot]
+                points.append((ts, round(odds, 2)))
+                if horizon is None:
+                    horizon = ts - seconds
+                elif ts <= horizon:
+                    break
+            seq = prev_column[slot]
+        points.reverse()
+        return points
+
+    def runners(self) -> list:
+        """(race_id, number) of every runner with history"""
+        return list(self._runners)
+
+    def has_race(self, race_id: str) -> bool:
+        return race_id in self._runners_by_race
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "rows": min(self.total, self.capacity),
+            "capacity": self.capacity,
+            "appended": self.total,
+            "overwritten": self.oldest,
+            "runners": len(self._runners),
+            "file_bytes": HEADER_SIZE + self.capacity * ROW_SIZE
+        }
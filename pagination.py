@@ -0,0 +1,127 @@
+"""
+Pagination and field projection for the Horse Racing Dashboard
+Opaque cursors over the race card and race/runner-level field selection
+"""
+
+import base64
+from bisect import bisect_right
+import json
+
+MAX_PAGE_SIZE = 500
+
+# Race fields kept by the compact list mode (runners are replaced by a count)
+COMPACT_FIELDS = ("id", "race", "track", "state", "distance", "class", "prize", "going", "featured")
+
+
+# ========================================
+# Cursors
+# ========================================
+
+def encode_cursor(race_id: str, position: int) -> str:
+    """Opaque cursor pointing just after a race"""
+    raw = json.dumps([race_id, position], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(race_id, position) from a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        race_id, position = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(race_id, str) or not isinstance(position, int):
+        raise ValueError("Invalid cursor")
+    return race_id, position
+
+
+def paginate(items: list, position_of, cursor: str = None, limit: int = None) -> tuple:
+    """One page of card-ordered races: (page, next_cursor or None)
+
+    ``position_of`` maps a race id to its card position (None if gone). The
+    cursor resumes after the race it names, wherever that race now sits, or
+    after its old position if it has left the card, so pages stay stable
+    while odds change underneath them.
+    """
+    start = 0
+    if cursor:
+        race_id, position = decode_cursor(cursor)
+        current = position_of(race_id)
+        after = current if current is not None else position
+        start = bisect_right(items, after, key=lambda race: position_of(race["id"]))
+
+    if limit is None:
+        return items[start:], None
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = items[start:start + limit]
+    if start + limit >= len(items):
+        return page, None
+    last = page[-1]["id"]
+    return page, encode_cursor(last, position_of(last))
+
+
+# ========================================
+# Field Projection
+# ========================================
+
+class Projection:
+    """Selects race and runner fields, e.g. ``id,race,horses.name,horses.odds``
+
+    Plain names select race fields, ``horses`` keeps whole runners and
+    ``horses.<field>`` selects runner fields. ``id`` is always kept. In
+    compact mode runners are dropped for a ``runners`` count and race fields
+    default to COMPACT_FIELDS.
+    """
+
+    def __init__(self, fields: str = None, compact: bool = False):
+        self.compact = compact
+        self.race_fields = None
+        self.runner_fields = None
+        self.all_runner_fields = not compact
+
+        if fields:
+            names = [name.strip() for name in fields.split(",") if name.strip()]
+            # Dicts as ordered sets, so fields come back in the order asked for
+            self.race_fields = {"id": None}
+            self.runner_fields = {}
+            self.all_runner_fields = False
+            for name in names:
+                if name == "horses":
+                    self.all_runner_fields = not compact
+                elif name.startswith("horses."):
+                    self.runner_fields[name[len("horses."):]] = None
+                else:
+                    self.race_fields[name] = None
+        elif compact:
+            self.race_fields = dict.fromkeys(COMPACT_FIELDS)
+
+    @property
+    def identity(self) -> bool:
+        """True if races are returned as stored"""
+        return self.race_fields is None and not self.compact
+
+    def apply(self, race: dict) -> dict:
+        if self.identity:
+            return race
+        if self.race_fields is None:
+            projected = {field: value for field, value in race.items() if field != "horses"}
+        else:
+            projected = {field: race[field] for field in self.race_fields if field in race}
+
+        horses = race.get("horses", [])
+        if self.compact:
+            projected["runners"] = len(horses)
+        elif self.all_runner_fields:
+            projected["horses"] = horses
+        elif self.runner_fields:
+            runner_fields = self.runner_fields
+            projected["horses"] = [
+                {field: horse[field] for field in runner_fields if field in horse}
+                for horse in horses
+            ]
+        return projected
+
+    def project(self, races: list) -> list:
+        if self.identity:
+            return races
+        return [self.apply(race) for race in races]
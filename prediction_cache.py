@@ -0,0 +1,179 @@
+"""
+AI prediction cache for the Horse Racing Dashboard
+TTL + LRU bounded cache with single-flight deduplication of concurrent misses
+"""
+
+import asyncio
+from collections import OrderedDict
+import hashlib
+import time
+
+# Race fields that feed the prediction prompt; a change in any of them changes the key
+PROMPT_RACE_FIELDS = ("race", "track", "distance", "class", "going")
+PROMPT_HORSE_FIELDS = ("name", "odds", "jockey", "trainer", "form", "trend")
+
+
+def prediction_fingerprint(race: dict) -> str:
+    """Fingerprint of the race fields that go into the prediction prompt"""
+    parts = [str(race.get(field, "")) for field in PROMPT_RACE_FIELDS]
+    for horse in race.get("horses", []):
+        parts.extend(str(horse.get(field, "")) for field in PROMPT_HORSE_FIELDS)
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=12).hexdigest()
+
+
+class Flight:
+    """One in-flight upstream computation shared by every concurrent miss
+
+    Waiters join with ``wait``; a waiter being cancelled cancels the task
+    only when it is the last one still waiting.
+    """
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+    async def wait(self):
+        self.waiters += 1
+        try:
+            return await asyncio.shield(self.task)
+        except asyncio.CancelledError:
+            if self.waiters == 1 and not self.task.done():
+                self.task.cancel()
+            raise
+        finally:
+            self.waiters -= 1
+
+
+class PredictionCache:
+    """Cache of AI predictions keyed by race id plus prompt fingerprint
+
+    Entries expire after ``ttl_seconds`` and the least recently used entry is
+    evicted beyond ``max_entries``. Concurrent misses for the same key await a
+    single upstream call; it is only cancelled once every waiter has gone.
+    Results carrying an ``error`` or ``degraded`` key are returned but never
+    cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 120, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._keys_by_race = {}
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Called with (key, value) for every computed prediction, e.g. to share it
+        self.on_fill = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key_for(self, race: dict) -> tuple:
+        """Cache key for a race in its current state"""
+        return race["id"], prediction_fingerprint(race)
+
+    def has(self, race: dict) -> bool:
+        """True if a fresh prediction for ``race`` is cached or being computed"""
+        key = self.key_for(race)
+        return key in self._inflight or self.get(key) is not None
+
+    def expires_in(self, race: dict) -> float:
+        """Seconds until the cached prediction for ``race`` expires, or None if absent"""
+        entry = self._entries.get(self.key_for(race))
+        if entry is None:
+            return None
+        return max(0.0, entry[0] - time.monotonic())
+
+    def get(self, key: tuple):
+        """Cached value for ``key``, or None on a miss or expired entry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._discard(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: dict):
+        """Store a value, evicting least recently used entries beyond the bound"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        self._keys_by_race.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    async def get_or_compute(self, race: dict, compute) -> dict:
+        """Return the cached prediction for ``race`` or compute it once
+
+        ``compute`` is a zero-argument coroutine function producing the value.
+        """
+        key = self.key_for(race)
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.misses += 1
+            flight = Flight(asyncio.ensure_future(self._fill(key, compute)))
+            self._inflight[key] = flight
+        else:
+            self.coalesced += 1
+
+        return await flight.wait()
+
+    def invalidate_race(self, race_id: str) -> int:
+        """Drop every cached prediction for a race; returns how many were dropped"""
+        keys = self._keys_by_race.pop(race_id, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        """Drop every cached prediction"""
+        self._entries.clear()
+        self._keys_by_race.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for tuning the TTL and size bound"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "in_flight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0
+        }
+
+    async def _fill(self, key: tuple, compute) -> dict:
+        try:
+            value = await compute()
+            if "error" not in value and "degraded" not in value:
+                self.put(key, value)
+                if self.on_fill is not None:
+                    self.on_fill(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _discard(self, key: tuple):
+        self._entries.pop(key, None)
+        keys = self._keys_by_race.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_race[key[0]]
@@ -0,0 +1,208 @@
+"""
+Indexed in-memory race store for the Horse Racing Dashboard
+Hash indexes on race id, track, state and featured so lookups cost O(matches),
+plus a pre-parsed jump-time index for binary-search time-window filters
+"""
+
+from bisect import bisect_left, bisect_right
+import re
+
+TIME_PATTERN = re.compile(r'(\d{1,2}:\d{2}\s*(?:AM|PM|am|pm))')
+TIME_PARTS_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*(AM|PM|am|pm)')
+
+
+def extract_time(race_name: str) -> str:
+    """Extract time from race name (e.g., '2:15 PM' from 'Royal Randwick - 2:15 PM')"""
+    match = TIME_PATTERN.search(race_name)
+    return match.group(1) if match else None
+
+
+def parse_time_to_minutes(time_str: str) -> int:
+    """Convert time string to minutes since midnight"""
+    match = TIME_PARTS_PATTERN.match(time_str)
+    if not match:
+        return 0
+
+    hours, minutes, period = match.groups()
+    hours = int(hours)
+    minutes = int(minutes)
+
+    if period.upper() == 'PM' and hours != 12:
+        hours += 12
+    elif period.upper() == 'AM' and hours == 12:
+        hours = 0
+
+    return hours * 60 + minutes
+
+
+def jump_minutes(race: dict) -> int:
+    """Jump time of a race in minutes since midnight, or None if it has no time"""
+    race_time = extract_time(race['race'])
+    return parse_time_to_minutes(race_time) if race_time else None
+
+
+class _TimeIndex:
+    """Positions of one index bucket sorted by jump time"""
+
+    def __init__(self, positions: list, minutes: list):
+        timed = sorted((minutes[pos], pos) for pos in positions if minutes[pos] is not None)
+        self.minutes = [jump for jump, _ in timed]
+        self.positions = [pos for _, pos in timed]
+        self.untimed = [pos for pos in positions if minutes[pos] is None]
+
+    def between(self, start: int = None, end: int = None) -> list:
+        """Positions with start <= jump time <= end (either bound optional)"""
+        lo = bisect_left(self.minutes, start) if start is not None else 0
+        hi = bisect_right(self.minutes, end) if end is not None else len(self.minutes)
+        return self.positions[lo:hi]
+
+
+class RaceStore:
+    """Read-only snapshot of the race card with hash and jump-time indexes
+
+    A store is never mutated after construction. Updates build a new store
+    via ``replace`` so readers holding a reference always see a consistent card.
+    Index buckets hold card positions rather than race dicts.
+    """
+
+    def __init__(self, races: list):
+        self._races = list(races)
+        self._minutes = [jump_minutes(race) for race in self._races]
+        self._position = {}
+        self._by_track = {}
+        self._by_state = {}
+        self._featured = []
+
+        for pos, race in enumerate(self._races):
+            self._position[race['id']] = pos
+            self._by_track.setdefault(race['track'].lower(), []).append(pos)
+            if race.get('state'):
+                self._by_state.setdefault(race['state'].upper(), []).append(pos)
+            if race.get('featured', False):
+                self._featured.append(pos)
+
+        self._all = list(range(len(self._races)))
+        self._time_indexes = {('all', None): _TimeIndex(self._all, self._minutes)}
+
+    def __len__(self) -> int:
+        return len(self._races)
+
+    def __contains__(self, race_id: str) -> bool:
+        return race_id in self._position
+
+    def all(self) -> list:
+        """All races in card order"""
+        return self._races
+
+    def get(self, race_id: str) -> dict:
+        """Look up a race by id, or None if it is not on the card"""
+        pos = self._position.get(race_id)
+        return self._races[pos] if pos is not None else None
+
+    def position(self, race_id: str) -> int:
+        """Card position of a race, or None if it is not on the card"""
+        return self._position.get(race_id)
+
+    def jump_minutes(self, race_id: str) -> int:
+        """Pre-parsed jump time of a race in minutes since midnight (None if unknown)"""
+        pos = self._position.get(race_id)
+        return self._minutes[pos] if pos is not None else None
+
+    def by_track(self, track: str) -> list:
+        """Races at a track (case-insensitive)"""
+        return self._materialise(self._by_track.get(track.lower(), []))
+
+    def by_state(self, state: str) -> list:
+        """Races in a state (e.g. 'NSW')"""
+        return self._materialise(self._by_state.get(state.upper(), []))
+
+    def featured(self) -> list:
+        """Featured races in card order"""
+        return self._materialise(self._featured)
+
+    def filter(self, track: str = None, state: str = None, featured: bool = False,
+               time_from: int = None, time_to: int = None) -> list:
+        """Races matching every given filter, in card order
+
+        ``time_from``/``time_to`` are minutes since midnight. Races without a
+        jump time are kept when a time window is given, as before. The smallest
+        matching bucket is range-scanned and the other predicates are checked
+        only against that slice.
+        """
+        buckets = []
+        checks = []
+        if track and track.lower() != 'all':
+            track_key = track.lower()
+            buckets.append(('track', track_key, self._by_track.get(track_key, [])))
+            checks.append(lambda race: race['track'].lower() == track_key)
+        if state and state.lower() != 'all':
+            state_key = state.upper()
+            buckets.append(('state', state_key, self._by_state.get(state_key, [])))
+            checks.append(lambda race: (race.get('state') or '').upper() == state_key)
+        if featured:
+            buckets.append(('featured', None, self._featured))
+            checks.append(lambda race: race.get('featured', False))
+
+        if not buckets:
+            buckets.append(('all', None, self._all))
+
+        name, key, positions = min(buckets, key=lambda bucket: len(bucket[2]))
+        if not positions:
+            # Unknown track or state: nothing to scan, and no time index is cached for it
+            return []
+        if time_from is not None or time_to is not None:
+            index = self._time_index(name, key, positions)
+            positions = sorted(index.between(time_from, time_to) + index.untimed)
+        elif name == 'all':
+            return self._races
+
+        races = self._races
+        return [races[pos] for pos in positions if all(check(races[pos]) for check in checks)]
+
+    def replace(self, updated: list) -> "RaceStore":
+        """Build a new store with the given races swapped in (or appended) by id
+
+        When only non-indexed fields changed (odds, going, runners...), the
+        new store shares this store's indexes and just swaps the race dicts,
+        so applying a batch of odds ticks costs O(N) pointer copies rather
+        than a full re-index.
+        """
+        positions = []
+        for race in updated:
+            pos = self._position.get(race['id'])
+            if pos is None or self._index_key(self._races[pos]) != self._index_key(race):
+                break
+            positions.append(pos)
+        else:
+            races = list(self._races)
+            for pos, race in zip(positions, updated):
+                races[pos] = race
+            return self._with_races(races)
+
+        updated_by_id = {race['id']: race for race in updated}
+        races = [updated_by_id.pop(race['id'], race) for race in self._races]
+        races.extend(updated_by_id.values())
+        return RaceStore(races)
+
+    @staticmethod
+    def _index_key(race: dict) -> tuple:
+        return race['track'].lower(), race.get('state'), bool(race.get('featured', False)), race['race']
+
+    def _with_races(self, races: list) -> "RaceStore":
+        store = object.__new__(RaceStore)
+        store.__dict__.update(self.__dict__)
+        store._races = races
+        return store
+
+    def _materialise(self, positions: list) -> list:
+        races = self._races
+        return [races[pos] for pos in positions]
+
+    def _time_index(self, name: str, key: str, positions: list) -> _TimeIndex:
+        # Built on first use per non-empty bucket, so there are at most as many as
+        # tracks and states; a store is immutable so this never goes stale
+        index = self._time_indexes.get((name, key))
+        if index is None:
+            index = _TimeIndex(positions, self._minutes)
+            self._time_indexes[(name, key)] = index
+        return index
@@ -0,0 +1,139 @@
+"""
+Pre-serialised, pre-compressed response cache for the Horse Racing Dashboard
+Hot payloads are encoded once per data version and served as raw bytes
+"""
+
+from collections import OrderedDict
+import gzip
+import json
+from fastapi.responses import Response
+
+# Optional fast JSON encoder - falls back to the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional brotli support - gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def encode_json(payload) -> bytes:
+    """Serialise a payload to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(data):
+    """Parse JSON from bytes or a memoryview (e.g. a slice of a memory-mapped file)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Content codings the client accepts (ignoring those with q=0)"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding)
+    return accepted
+
+
+class EncodedPayload:
+    """One payload serialised once, with compressed variants built on first use"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._variants = {}
+
+    def variant(self, coding: str) -> bytes:
+        encoded = self._variants.get(coding)
+        if encoded is None:
+            if coding == "br":
+                encoded = brotli.compress(self.body, quality=BROTLI_QUALITY)
+            else:
+                encoded = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+            self._variants[coding] = encoded
+        return encoded
+
+    def precompress(self, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        """Build every compressed variant now, e.g. at maximum levels for static assets"""
+        self._variants["gzip"] = gzip.compress(self.body, compresslevel=gzip_level, mtime=0)
+        if brotli is not None:
+            self._variants["br"] = brotli.compress(self.body, quality=brotli_quality)
+
+    def respond(self, accept_encoding: str, headers: dict = None, media_type: str = "application/json") -> Response:
+        """Raw-bytes response in the best encoding the client accepts"""
+        headers = dict(headers or {})
+        headers["Vary"] = "Accept-Encoding"
+        body = self.body
+        if len(body) >= MIN_COMPRESS_BYTES:
+            accepted = accepted_encodings(accept_encoding)
+            coding = None
+            if brotli is not None and "br" in accepted:
+                coding = "br"
+            elif "gzip" in accepted or "*" in accepted:
+                coding = "gzip"
+            if coding:
+                body = self.variant(coding)
+                headers["Content-Encoding"] = coding
+        return Response(content=body, media_type=media_type, headers=headers)
+
+
+class ResponseCache:
+    """Encoded payloads keyed by endpoint, rebuilt only when their version changes
+
+    Keys can carry query parameters, so at most ``max_entries`` payloads are
+    kept; the least recently used is evicted first.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.builds = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def get(self, key: str, version, build) -> EncodedPayload:
+        """Encoded payload for ``key`` at ``version``; ``build`` makes the payload dict"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+        encoded = EncodedPayload(encode_json(build()))
+        self._entries[key] = (version, encoded)
+        self._entries.move_to_end(key)
+        self.builds += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return encoded
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "builds": self.builds,
+            "hits": self.hits,
+            "evictions": self.evictions,
+            "json_encoder": "orjson" if orjson is not None else "json",
+            "brotli": brotli is not None
+        }
@@ -0,0 +1,239 @@
+"""
+Runner search index for the Horse Racing Dashboard
+Inverted index over runner, jockey and trainer names across the card, with
+prefix matching for search-as-you-type
+"""
+
+from bisect import bisect_left, insort
+from functools import lru_cache
+import re
+import unicodedata
+
+KINDS = ("horse", "jockey", "trainer")
+NON_WORD = re.compile(r"[^0-9a-z\s]+")
+# Highest code point, so term + TOKEN_END bounds every token starting with term
+TOKEN_END = "\U0010ffff"
+
+
+@lru_cache(maxsize=65536)
+def normalize(text: str) -> str:
+    """Lower-case, accent-free, punctuation-free text: "O'Shea-Smith" -> "oshea smith"
+
+    Apostrophes vanish so "O'Shea" matches "oshea"; other punctuation
+    separates words. Cached, as the same names recur across the card.
+    """
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    text = text.replace("'", "").replace("`", "")
+    return " ".join(NON_WORD.sub(" ", text).split())
+
+
+class _Entity:
+    """One distinct horse, jockey or trainer and the runners it appears in"""
+
+    __slots__ = ("kind", "key", "name", "spellings", "words", "text", "runners")
+
+    def __init__(self, kind: str, key: str, name: str):
+        self.kind = kind
+        self.key = key
+        self.name = name
+        # Raw names that normalise to this entity, e.g. "O'Shea" and "OShea"
+        self.spellings = set()
+        # Parts of elided words are searchable too: "O'Shea" also matches "shea"
+        self.words = list(dict.fromkeys(key.split() + normalize(name.replace("'", " ")).split()))
+        # " " + term in text  <=>  some word starts with term
+        self.text = " " + " ".join(self.words)
+        self.runners = set()
+
+
+class RunnerIndex:
+    """Word-prefix index from normalised names to (race id, saddlecloth number)
+
+    Every word of every runner, jockey and trainer name is kept once in a
+    sorted token list, so the tokens starting with a prefix are one bisect
+    range (a flattened trie). Each token maps to the entities containing it.
+    Races are re-indexed only when their runner line-up changes (names,
+    numbers, riders, trainers); odds updates leave the index untouched.
+    """
+
+    def __init__(self, races: list = ()):
+        self._tokens = []
+        self._postings = {}
+        self._entities = {}
+        self._spellings = {}
+        self._race_signatures = {}
+        self._race_entries = {}
+        self._counts = dict.fromkeys(KINDS, 0)
+        self._new_tokens = []
+        self.load(races)
+
+    def load(self, races: list):
+        """Index a whole card from scratch"""
+        self._tokens = []
+        self._postings = {}
+        self._entities = {}
+        self._spellings = {}
+        self._race_signatures = {}
+        self._race_entries = {}
+        self._counts = dict.fromkeys(KINDS, 0)
+        self._new_tokens = []
+        self.update(races)
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    # ----------------------------------------
+    # Maintenance
+    # ----------------------------------------
+
+    @staticmethod
+    def _signature(race: dict) -> tuple:
+        return tuple(
+            (horse.get("number"), horse.get("name"), horse.get("jockey"), horse.get("trainer"))
+            for horse in race.get("horses", [])
+        )
+
+    def update(self, races: list) -> int:
+        """Re-index races whose line-up changed; returns how many were re-indexed"""
+        reindexed = 0
+        spellings = self._spellings
+        for race in races:
+            race_id = race["id"]
+            signature = self._signature(race)
+            if self._race_signatures.get(race_id) == signature:
+                continue
+            self.remove_race(race_id)
+            entries = []
+            for number, *names in signature:
+                runner = (race_id, number)
+                for kind, name in zip(KINDS, names):
+                    entity = spellings.get((kind, name))
+                    if entity is None:
+                        entity = self._entity(kind, name)
+                        if entity is None:
+                            continue
+                    entity.runners.add(runner)
+                    entries.append((entity, runner))
+            self._race_signatures[race_id] = signature
+            self._race_entries[race_id] = entries
+            reindexed += 1
+        self._merge_tokens()
+        return reindexed
+
+    def remove_race(self, race_id: str):
+        """Drop a race's runners from the index"""
+        for entity, runner in self._race_entries.pop(race_id, []):
+            entity.runners.discard(runner)
+            if not entity.runners and (entity.kind, entity.key) in self._entities:
+                self._drop(entity)
+        self._race_signatures.pop(race_id, None)
+
+    def _entity(self, kind: str, name: str) -> _Entity:
+        """The entity a raw name belongs to, created if new; None for blank names"""
+        key = normalize(name) if isinstance(name, str) else ""
+        if not key:
+            return None
+        entity = self._entities.get((kind, key))
+        if entity is None:
+            entity = self._entities[(kind, key)] = _Entity(kind, key, name)
+            self._counts[kind] += 1
+            for word in entity.words:
+                postings = self._postings.get(word)
+                if postings is None:
+                    postings = self._postings[word] = set()
+                    self._new_tokens.append(word)
+                postings.add(entity)
+        entity.spellings.add(name)
+        self._spellings[(kind, name)] = entity
+        return entity
+
+    def _merge_tokens(self):
+        """Insert tokens added by an update into the sorted token list"""
+        if len(self._new_tokens) > 64:
+            # Bulk loads: one sort beats many O(n) inserts
+            self._tokens.extend(self._new_tokens)
+            self._tokens.sort()
+        else:
+            for token in self._new_tokens:
+                insort(self._tokens, token)
+        self._new_tokens = []
+
+    def _drop(self, entity: _Entity):
+        del self._entities[(entity.kind, entity.key)]
+        self._counts[entity.kind] -= 1
+        for name in entity.spellings:
+            del self._spellings[(entity.kind, name)]
+        for word in entity.words:
+            postings = self._postings[word]
+            postings.discard(entity)
+            if not postings:
+                del self._postings[word]
+                del self._tokens[bisect_left(self._tokens, word)]
+
+    # ----------------------------------------
+    # Search
+    # ----------------------------------------
+
+    def _token_range(self, term: str) -> tuple:
+        return bisect_left(self._tokens, term), bisect_left(self._tokens, term + TOKEN_END)
+
+    def _range_size(self, lo: int, hi: int, cap: int = 256) -> int:
+        """Entities behind a token range; wide ranges are not counted exactly"""
+        if hi - lo > cap:
+            return len(self._entities) + hi - lo
+        postings = self._postings
+        return sum(len(postings[token]) for token in self._tokens[lo:hi])
+
+    def _collect(self, lo: int, hi: int, others: list, kinds: tuple, scan_limit: int) -> list:
+        """Entities behind tokens lo:hi whose text contains every other term"""
+        seen = set()
+        candidates = []
+        any_kind = set(kinds) >= set(KINDS)
+        for token in self._tokens[lo:hi]:
+            for entity in self._postings[token]:
+                if not any_kind and entity.kind not in kinds:
+                    continue
+                text = entity.text
+                for term in others:
+                    if term not in text:
+                        break
+                else:
+                    # An entity with several matching words is reached once per word
+                    if entity not in seen:
+                        seen.add(entity)
+                        candidates.append(entity)
+                        if len(candidates) >= scan_limit:
+                            return candidates
+        return candidates
+
+    def search(self, query: str, kinds: tuple = KINDS, limit: int = 10, scan_limit: int = 1000) -> list:
+        """Entities whose name has a word starting with every query term
+
+        Returns (kind, name, runners) tuples, best first: exact names, then
+        whole-name prefix matches, then names whose first word matches, then
+        by number of runners and name. Runners are (race id, number) pairs.
+        Candidates come from the most selective term; at most ``scan_limit``
+        are ranked, so one-letter queries stay fast.
+        """
+        terms = normalize(query).split()
+        if not terms:
+            return []
+        ranges = [self._token_range(term) for term in terms]
+        if any(lo == hi for lo, hi in ranges):
+            return []
+        # Drive from the term matching the fewest entities, verify the others per entity
+        driver = min(range(len(terms)), key=lambda index: self._range_size(*ranges[index]))
+        others = [" " + term for index, term in enumerate(terms) if index != driver]
+        phrase = " ".join(terms)
+
+        candidates = self._collect(*ranges[driver], others, kinds, scan_limit)
+        candidates.sort(key=lambda entity: (
+            entity.key != phrase,
+            not entity.key.startswith(phrase),
+            not entity.words[0].startswith(terms[0]),
+            -len(entity.runners),
+            entity.key
+        ))
+        return [(entity.kind, entity.name, list(entity.runners)) for entity in candidates[:limit]]
+
+    def stats(self) -> dict:
+        return {"tokens": len(self._tokens), "races": len(self._race_entries), **self._counts}
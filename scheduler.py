@@ -0,0 +1,169 @@
+"""
+Background AI prediction scheduler for the Horse Racing Dashboard
+Precomputes and refreshes predictions for races about to jump, under a rate budget
+"""
+
+import asyncio
+from datetime import datetime
+import heapq
+import time
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+
+class RateBudget:
+    """Token bucket allowing ``per_minute`` upstream predictions on average
+
+    Up to ``burst`` tokens (default: a minute's worth) can be spent at once.
+    """
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.capacity = max(1.0, per_minute if burst is None else burst)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def available(self) -> int:
+        """Whole tokens available right now"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return int(self.tokens)
+
+    def spend(self, count: int):
+        self.tokens -= count
+
+    def seconds_until(self, count: int = 1) -> float:
+        """Seconds until ``count`` tokens will be available"""
+        missing = count - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+
+class PredictionScheduler:
+    """Keeps AI predictions warm for races about to jump
+
+    Every ``interval_seconds`` the scheduler looks for races jumping within
+    ``lookahead_minutes`` whose prediction is missing or expires within
+    ``refresh_margin_seconds``. It orders them by time-to-jump (featured races
+    get ``featured_bonus_minutes`` head start) and precomputes as many as the
+    rate budget allows through ``predict``.
+
+    ``get_store`` returns the current RaceStore, ``predict`` is a coroutine
+    function taking a list of races (it fills ``cache``).
+    """
+
+    def __init__(self, get_store, predict, cache, lookahead_minutes: int = 30,
+                 interval_seconds: float = 15, per_minute: float = 30,
+                 refresh_margin_seconds: float = 30, featured_bonus_minutes: int = 10,
+                 timezone: str = None):
+        self.get_store = get_store
+        self.predict = predict
+        self.cache = cache
+        self.lookahead_minutes = lookahead_minutes
+        self.interval_seconds = interval_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.featured_bonus_minutes = featured_bonus_minutes
+        self.budget = RateBudget(per_minute)
+        self.timezone = timezone
+        self._task = None
+        self.runs = 0
+        self.precomputed = 0
+        self.deferred = 0
+        self.last_run = None
+
+    def start(self):
+        """Start the background loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        """Stop the background loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def now_minutes(self) -> int:
+        """Current time in the race timezone, in minutes since midnight"""
+        now = datetime.now()
+        if self.timezone and ZoneInfo is not None:
+            try:
+                now = datetime.now(ZoneInfo(self.timezone))
+            except Exception:
+                pass
+        return now.hour * 60 + now.minute
+
+    def due_races(self, now_minutes: int = None) -> list:
+        """Races needing a prediction, most urgent first"""
+        if now_minutes is None:
+            now_minutes = self.now_minutes()
+        store = self.get_store()
+
+        queue = []
+        for race in store.filter(time_from=now_minutes, time_to=now_minutes + self.lookahead_minutes):
+            jump = store.jump_minutes(race['id'])
+            if jump is None:
+                continue
+            expires_in = self.cache.expires_in(race)
+            if expires_in is not None and expires_in > self.refresh_margin_seconds:
+                continue
+            priority = jump - now_minutes
+            if race.get('featured', False):
+                priority -= self.featured_bonus_minutes
+            heapq.heappush(queue, (priority, jump, race['id'], race))
+
+        return [heapq.heappop(queue)[3] for _ in range(len(queue))]
+
+    async def run_once(self, now_minutes: int = None) -> int:
+        """Precompute the most urgent due races the budget allows; returns how many"""
+        due = self.due_races(now_minutes)
+        allowed = min(len(due), self.budget.available())
+        selected = due[:allowed]
+        self.deferred += len(due) - allowed
+        self.runs += 1
+        self.last_run = datetime.now().isoformat()
+        if not selected:
+            return 0
+
+        for race in selected:
+            # Drop entries about to expire so the refresh goes upstream
+            if self.cache.expires_in(race) is not None:
+                self.cache.invalidate_race(race['id'])
+
+        self.budget.spend(len(selected))
+        await self.predict(selected)
+        self.precomputed += len(selected)
+        return len(selected)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "precomputed": self.precomputed,
+            "deferred": self.deferred,
+            "budget_tokens": self.budget.available(),
+            "lookahead_minutes": self.lookahead_minutes,
+            "last_run": self.last_run
+        }
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error precomputing AI predictions: {e!r}")
+            await asyncio.sleep(self.interval_seconds)
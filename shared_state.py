@@ -0,0 +1,489 @@
+"""
+Shared race state for multi-worker deployments of the Horse Racing Dashboard
+One leader worker applies updates and fans them out through a pluggable
+backend; follower workers replay them so every worker serves the same data
+"""
+
+import asyncio
+import fcntl
+import importlib
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from response_cache import decode_json, encode_json
+
+
+class LocalBackend:
+    """Single-process stand-in: this worker leads and there is no one to notify"""
+
+    leader = True
+
+    def load(self, card: str = None) -> tuple:
+        """(snapshot, entries) left by a previous leader - never any locally"""
+        return None, []
+
+    def append(self, entry: dict):
+        pass
+
+    async def checkpoint(self):
+        pass
+
+    async def start(self, apply, snapshot, promote):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "local", "leader": True}
+
+
+SNAPSHOT_MAGIC = b"RDSNAP01"
+SNAPSHOT_HEADER = struct.Struct("<8sI")
+
+
+def write_snapshot(path: str, gen: int, state: dict, card: str = None):
+    """Write ``state`` as a compact binary snapshot, atomically replacing ``path``
+
+    Layout: magic, header length, a JSON header with the race ``card`` the
+    state belongs to and each section's offset, length and CRC-32, then the
+    sections - one compact JSON blob per top-level state key, so readers can
+    map the file and parse in place.
+    """
+    sections = [(name, encode_json(value)) for name, value in state.items()]
+    index = []
+    offset = 0
+    for name, blob in sections:
+        index.append([name, offset, len(blob), zlib.crc32(blob)])
+        offset += len(blob)
+    header = encode_json({"gen": gen, "card": card, "sections": index})
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as snapshot:
+        snapshot.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(header)))
+        snapshot.write(header)
+        for _, blob in sections:
+            snapshot.write(blob)
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    os.replace(temporary, path)
+
+
+def read_snapshot(path: str) -> tuple:
+    """(gen, state, card) from a snapshot file, or None if there is none
+
+    The file is memory-mapped and each section parsed straight from the
+    mapping, so a large card is never copied into an intermediate buffer.
+    Raises ValueError if the file is not a snapshot or a section is corrupt.
+    """
+    try:
+        with open(path, "rb") as snapshot:
+            mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    try:
+        view = memoryview(mapped)
+        try:
+            magic, header_length = SNAPSHOT_HEADER.unpack_from(view)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"Not a state snapshot: {path}")
+            body = SNAPSHOT_HEADER.size + header_length
+            header = decode_json(view[SNAPSHOT_HEADER.size:body])
+            state = {}
+            for name, offset, length, crc in header["sections"]:
+                section = view[body + offset:body + offset + length]
+                if zlib.crc32(section) != crc:
+                    raise ValueError(f"Corrupt snapshot section {name!r}: {path}")
+                state[name] = decode_json(section)
+                section.release()
+            return header["gen"], state, header.get("card")
+        finally:
+            view.release()
+    finally:
+        mapped.close()
+
+
+class FileBackend:
+    """Shared, durable state in a directory that every worker on the box can reach
+
+    The worker holding ``leader.lock`` applies odds updates and appends each
+    resulting delta to ``updates-<gen>.log`` (JSON lines) - a write-ahead
+    log of every change to races, runners and odds. Every worker tails the
+    log and applies entries written by other workers, in log order, so all
+    of them serve the same card, data versions and live sequence numbers.
+    Any worker may append cache fills (e.g. AI predictions).
+
+    Appends only buffer the entry; the buffer is written (and fsynced with
+    ``fsync``) as one batch every ``poll_interval`` or once it reaches
+    ``flush_bytes``, so the update path never waits on the disk.
+
+    Every ``snapshot_every`` entries the leader starts the next generation
+    of the log and writes ``snapshot.bin`` (see write_snapshot) in a
+    background thread; the generation before it is kept for slow readers,
+    older ones are deleted. A worker that falls further behind, or starts
+    up after a deploy or crash, maps the snapshot and replays only the log
+    written since. When the leader exits its lock is released and a
+    follower takes over.
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 0.05, snapshot_every: int = 1000,
+                 fsync: bool = True, flush_bytes: int = 1 << 20):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.flush_bytes = flush_bytes
+        self.origin = os.getpid()
+        self.card = None
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, "leader.lock"), "a")
+        self.leader = self._try_lock()
+        self.gen = 0
+        self._offset = 0
+        self._written = 0
+        self._log = None
+        self._pending = []
+        self._pending_bytes = 0
+        self._unsynced = False
+        self._snapshot_task = None
+        self._retiring = set()
+        self._snapshot = None
+        self._apply = None
+        self._promote = None
+        self._task = None
+        self.applied = 0
+        self.appended = 0
+        self.flushes = 0
+        self.resyncs = 0
+        self.snapshots = 0
+        self.last_snapshot = None
+        self.last_load = None
+
+    # ----------------------------------------
+    # Files
+    # ----------------------------------------
+
+    def _try_lock(self) -> bool:
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _log_path(self, gen: int) -> str:
+        return os.path.join(self.directory, f"updates-{gen}.log")
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, "snapshot.bin")
+
+    def _read_snapshot(self) -> tuple:
+        """(gen, state, card) of the latest snapshot, or None"""
+        return read_snapshot(self._snapshot_path())
+
+    def _read_entries(self) -> list:
+        """Complete log lines after the current offset of the current generation"""
+        try:
+            with open(self._log_path(self.gen), "rb") as log:
+                log.seek(self._offset)
+                data = log.read()
+        except FileNotFoundError:
+            return None
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        return [decode_json(line) for line in data[:end].splitlines() if line]
+
+    def _truncate_torn_tail(self):
+        """Leader at startup: drop a partial last line left by a crash mid-write"""
+        path = self._log_path(self.gen)
+        try:
+            with open(path, "rb+") as log:
+                data = log.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    print(f"Dropping {len(data) - end} bytes of a torn write at the end of {path}")
+                    log.truncate(end)
+        except FileNotFoundError:
+            pass
+
+    def _flush(self):
+        """Write buffered entries to the current generation as one locked append"""
+        if not self._pending:
+            return
+        data = b"".join(self._pending)
+        self._pending = []
+        self._pending_bytes = 0
+        if self._log is None:
+            self._log = open(self._log_path(self.gen), "ab")
+        fcntl.flock(self._log, fcntl.LOCK_EX)
+        try:
+            self._log.write(data)
+            self._log.flush()
+        finally:
+            fcntl.flock(self._log, fcntl.LOCK_UN)
+        self.flushes += 1
+        self._unsynced = True
+
+    async def _sync(self):
+        """fsync what was flushed, off the event loop
+
+        A duplicate descriptor is synced, so a generation switch closing the
+        log meanwhile is harmless.
+        """
+        if not (self.fsync and self._unsynced and self._log is not None):
+            return
+        self._unsynced = False
+        fd = os.dup(self._log.fileno())
+        try:
+            await asyncio.to_thread(os.fsync, fd)
+        finally:
+            os.close(fd)
+
+    def _close_log(self, flush: bool = True):
+        """Close the current generation's log; unflushed entries stay buffered unless ``flush``
+
+        With an event loop running, the final fsync and close happen in a
+        worker thread (awaited by ``stop``), so switching generations never
+        waits on the disk.
+        """
+        if flush:
+            self._flush()
+        log = self._log
+        if log is None:
+            return
+        unsynced = self.fsync and self._unsynced
+        self._log = None
+        self._unsynced = False
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._finish_log(log, unsynced)
+            return
+        retiring = loop.run_in_executor(None, self._finish_log, log, unsynced)
+        self._retiring.add(retiring)
+        retiring.add_done_callback(self._retiring.discard)
+
+    @staticmethod
+    def _finish_log(log, unsynced: bool):
+        try:
+            if unsynced:
+                os.fsync(log.fileno())
+        finally:
+            log.close()
+
+    # ----------------------------------------
+    # Interface
+    # ----------------------------------------
+
+    def load(self, card: str = None) -> tuple:
+        """(snapshot state or None, entries logged since that snapshot)
+
+        Follows every log generation after the snapshot, which covers a crash
+        between starting a generation and finishing its snapshot. State saved
+        for a different race ``card`` is skipped, not restored; the next
+        checkpoint replaces it.
+        """
+        started = time.perf_counter()
+        self.card = card
+        snapshot = self._read_snapshot()
+        stale = snapshot is not None and snapshot[2] != card
+        if stale:
+            print(f"Ignoring shared state saved for race card {snapshot[2]!r}; this card is {card!r}")
+        self.gen = snapshot[0] if snapshot else 0
+        self._offset = 0
+        entries = []
+        while True:
+            if self.leader:
+                self._truncate_torn_tail()
+            # Stale entries are still read, to move past them
+            entries.extend(self._read_entries() or [])
+            if not os.path.exists(self._log_path(self.gen + 1)):
+                break
+            self.gen += 1
+            self._offset = 0
+        if stale:
+            snapshot = None
+            entries = []
+        self.last_load = {
+            "seconds": round(time.perf_counter() - started, 4),
+            "snapshot_gen": snapshot[0] if snapshot else None,
+            "entries": len(entries)
+        }
+        return (snapshot[1] if snapshot else None), entries
+
+    def append(self, entry: dict):
+        """Log an entry and fan it out to every other worker (buffered; see flush)"""
+        line = encode_json({**entry, "origin": self.origin}) + b"\n"
+        self._pending.append(line)
+        self._pending_bytes += len(line)
+        if self._pending_bytes >= self.flush_bytes:
+            self._flush()
+        self.appended += 1
+        if self.leader:
+            # Counted here, checkpointed by the follow loop - never inline with an update
+            self._written += 1
+
+    async def checkpoint(self):
+        """Leader: start a new log generation and snapshot the state it starts from
+
+        The state is captured on the event loop, between updates; syncing the
+        finished log and encoding and writing the snapshot happen in worker
+        threads. Skipped while a previous snapshot is still being written.
+        """
+        if not self.leader or self._snapshot is None:
+            return
+        if self._snapshot_task is not None and not self._snapshot_task.done():
+            return
+        # Entries other workers appended to this generation are applied first
+        self._drain()
+        state = self._snapshot()
+        self._close_log()
+        gen = self.gen + 1
+        open(self._log_path(gen), "ab").close()
+        self.gen = gen
+        self._offset = 0
+        self._written = 0
+        self._snapshot_task = asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, gen, state)
+
+    def _write_snapshot(self, gen: int, state: dict):
+        started = time.perf_counter()
+        try:
+            write_snapshot(self._snapshot_path(), gen, state, self.card)
+        except Exception as e:
+            print(f"Error writing state snapshot: {e!r}")
+            return
+        # Older logs are covered by the new snapshot and no follower should still be reading them
+        for name in os.listdir(self.directory):
+            stem, _, ext = name.partition(".")
+            if ext == "log" and stem.startswith("updates-") and stem[8:].isdigit() and int(stem[8:]) < gen - 1:
+                os.remove(os.path.join(self.directory, name))
+        self.snapshots += 1
+        self.last_snapshot = {
+            "gen": gen,
+            "seconds": round(time.perf_counter() - started, 4),
+            "bytes": os.path.getsize(self._snapshot_path())
+        }
+
+    async def start(self, apply, snapshot, promote):
+        """Begin tailing the log
+
+        ``apply(entry)`` handles an entry from another worker (``{"kind":
+        "snapshot", "state": ...}`` after a resync), ``snapshot()`` returns
+        the state to checkpoint and ``promote()`` is called if this worker
+        takes over as leader.
+        """
+        self._apply = apply
+        self._snapshot = snapshot
+        self._promote = promote
+        if self.leader:
+            await self.checkpoint()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._snapshot_task is not None:
+            await self._snapshot_task
+            self._snapshot_task = None
+        self._close_log()
+        if self._retiring:
+            await asyncio.gather(*self._retiring)
+        if self.leader:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self.leader = False
+
+    def _drain(self):
+        """Apply every complete entry from other workers, following generations"""
+        while True:
+            entries = self._read_entries()
+            if entries is None:
+                # No log yet, or our generation was deleted because we fell behind
+                if not self._resync():
+                    return
+                continue
+            for entry in entries:
+                if entry.get("origin") != self.origin:
+                    self._apply(entry)
+                    self.applied += 1
+            if self.leader or not os.path.exists(self._log_path(self.gen + 1)):
+                return
+            # The leader has moved on; finish this generation, then switch
+            for entry in self._read_entries() or []:
+                if entry.get("origin") != self.origin:
+                    self._apply(entry)
+                    self.applied += 1
+            # Entries still buffered belong to the new generation
+            self._close_log(flush=False)
+            self.gen += 1
+            self._offset = 0
+
+    def _resync(self) -> bool:
+        """Reload from the latest snapshot; False if there is nothing newer"""
+        snapshot = self._read_snapshot()
+        if snapshot is None or snapshot[0] == self.gen or snapshot[2] != self.card:
+            return False
+        self._close_log(flush=False)
+        self.gen = snapshot[0]
+        self._offset = 0
+        self._apply({"kind": "snapshot", "state": snapshot[1]})
+        self.resyncs += 1
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                self._flush()
+                await self._sync()
+                self._drain()
+                if not self.leader and self._try_lock():
+                    self.leader = True
+                    self._promote()
+                    await self.checkpoint()
+                elif self.leader and self._written >= self.snapshot_every:
+                    await self.checkpoint()
+            except Exception as e:
+                print(f"Error following shared state: {e!r}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "file",
+            "directory": self.directory,
+            "leader": self.leader,
+            "pid": self.origin,
+            "generation": self.gen,
+            "appended": self.appended,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "fsync": self.fsync,
+            "applied": self.applied,
+            "resyncs": self.resyncs,
+            "snapshots": self.snapshots,
+            "last_snapshot": self.last_snapshot,
+            "last_load": self.last_load
+        }
+
+
+def backend_from_spec(spec: str, poll_interval: float = 0.05, snapshot_every: int = 1000, fsync: bool = True):
+    """Build a state backend from a spec string
+
+    ``local`` keeps state in this process, ``file:<directory>`` shares it
+    between workers on one box and ``python:<module>:<callable>`` calls a
+    factory returning a backend (e.g. one backed by Redis).
+    """
+    kind, _, target = spec.partition(":")
+    if kind == "local":
+        return LocalBackend()
+    if kind == "file":
+        return FileBackend(target, poll_interval=poll_interval, snapshot_every=snapshot_every, fsync=fsync)
+    if kind == "python":
+        module_name, _, factory = target.partition(":")
+        return getattr(importlib.import_module(module_name), factory)()
+    raise ValueError(f"Unknown shared state backend: {spec}")
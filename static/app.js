@@ -9,7 +9,7 @@
 
 const CONFIG = {
     API_BASE: '/api',
-    REFRESH_INTERVAL: 10000, // 10 seconds
+    REFRESH_INTERVAL: 10000, // 10 seconds - polling fallback when live updates are unavailable
     ANIMATION_DURATION: 300,
 };
 
@@ -25,6 +25,9 @@ const state = {
     currentFilter: 'all',
     lastUpdate: null,
     aiChatOpen: false,
+    aiChatAbort: null,
+    liveSeq: null,
+    liveSource: null,
 };
 
 // ========================================
@@ -55,67 +58,22 @@ const elements = {
 // ========================================
 
 /**
- * Fetch racing odds from backend
+ * Fetch races, market movers, predictions and roughies in one request
  */
-async function fetchOdds() {
+async function fetchDashboard() {
     try {
-        const response = await fetch(`${CONFIG.API_BASE}/odds`);
-        if (!response.ok) throw new Error('Failed to fetch odds');
-        const data = await response.json();
-        state.races = data.events || [];
-        state.lastUpdate = new Date();
-        return state.races;
-    } catch (error) {
-        console.error('Error fetching odds:', error);
-        return [];
-    }
-}
-
-/**
- * Fetch market movers from backend
- */
-async function fetchMarketMovers() {
-    try {
-        const response = await fetch(`${CONFIG.API_BASE}/market-movers`);
-        if (!response.ok) throw new Error('Failed to fetch movers');
+        const response = await fetch(`${CONFIG.API_BASE}/dashboard`);
+        if (!response.ok) throw new Error('Failed to fetch dashboard');
         const data = await response.json();
+        state.races = data.races || [];
         state.movers = data.movers || [];
-        return state.movers;
-    } catch (error) {
-        console.error('Error fetching movers:', error);
-        return [];
-    }
-}
-
-/**
- * Fetch expert predictions from backend
- */
-async function fetchPredictions() {
-    try {
-        const response = await fetch(`${CONFIG.API_BASE}/predictions`);
-        if (!response.ok) throw new Error('Failed to fetch predictions');
-        const data = await response.json();
         state.predictions = data.predictions || [];
-        return state.predictions;
-    } catch (error) {
-        console.error('Error fetching predictions:', error);
-        return [];
-    }
-}
-
-/**
- * Fetch roughies tips from backend
- */
-async function fetchRoughies() {
-    try {
-        const response = await fetch(`${CONFIG.API_BASE}/roughies`);
-        if (!response.ok) throw new Error('Failed to fetch roughies');
-        const data = await response.json();
         state.roughies = data.roughies || [];
-        return state.roughies;
+        state.lastUpdate = new Date();
+        return data;
     } catch (error) {
-        console.error('Error fetching roughies:', error);
-        return [];
+        console.error('Error fetching dashboard:', error);
+        return null;
     }
 }
 
@@ -134,6 +92,21 @@ async function getAIPrediction(raceId) {
     }
 }
 
+/**
+ * Get Harville exotic prices for a race, optionally dutching some runners
+ */
+async function getExotics(raceId, params = {}) {
+    try {
+        const query = new URLSearchParams({ bets: 'quinella,exacta,trifecta', top: 3, ...params });
+        const response = await fetch(`${CONFIG.API_BASE}/races/${raceId}/exotics?${query}`);
+        if (!response.ok) throw new Error('Failed to get exotic prices');
+        return await response.json();
+    } catch (error) {
+        console.error('Error getting exotic prices:', error);
+        return null;
+    }
+}
+
 /**
  * Get AI insights for user query
  */
@@ -153,6 +126,49 @@ async function getAIInsights(query) {
     }
 }
 
+/**
+ * Stream AI insights for user query over Server-Sent Events.
+ * Calls onDelta with each text chunk as it arrives; resolves with the
+ * final event ({ model } on success, { error } on failure).
+ */
+async function streamAIInsights(query, onDelta, signal) {
+    const response = await fetch(`${CONFIG.API_BASE}/ai-insights/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        body: JSON.stringify({ query }),
+        signal
+    });
+    if (!response.ok || !response.body) throw new Error('Failed to stream AI insights');
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) return { error: 'Stream ended unexpectedly' };
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const raw = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            raw.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            const payload = data ? JSON.parse(data) : {};
+
+            if (event === 'token') onDelta(payload.delta || '');
+            else if (event === 'done' || event === 'error') return payload;
+        }
+    }
+}
+
 // ========================================
 // Rendering Functions
 // ========================================
@@ -399,8 +415,23 @@ function updateTimestamp() {
 /**
  * Show bet slip modal
  */
-function showBetSlip(race, horse) {
-    alert(`Bet placed on ${horse.name} in ${race.race}\n\nNote: This is a demo. Real betting integration coming soon!`);
+async function showBetSlip(race, horse) {
+    // Exotics led by the selected runner, plus a dutch of the two market leaders
+    const favourites = race.horses.filter(h => h.odds > 1).sort((a, b) => a.odds - b.odds).slice(0, 2).map(h => h.number);
+    const exotics = await getExotics(race.id, favourites.length ? { dutch: favourites.join(','), stake: 100 } : {});
+    const labels = { quinella: 'Quinella', exacta: 'Exacta', trifecta: 'Trifecta' };
+    let slip = `WIN ${horse.name} @ ${horse.odds.toFixed(2)}`;
+    if (exotics) {
+        for (const [bet, combos] of Object.entries(exotics.exotics)) {
+            const lines = combos.map(c => `  ${c.runners.join('-')}  ~$${c.estimated_dividend}`);
+            slip += `\n\n${labels[bet] || bet} (est. dividends):\n${lines.join('\n')}`;
+        }
+        if (exotics.dutch) {
+            const stakes = exotics.dutch.runners.map(r => `#${r.number} $${r.stake.toFixed(2)}`).join(', ');
+            slip += `\n\nDutch $100 on ${stakes}: returns $${exotics.dutch.return.toFixed(2)}`;
+        }
+    }
+    alert(`Bet slip - ${race.race}\n\n${slip}\n\nNote: This is a demo. Real betting integration coming soon!`);
 }
 
 /**
@@ -448,6 +479,11 @@ function toggleAIChat() {
         elements.aiChatInput.focus();
     } else {
         elements.aiChatPanel.classList.add('hidden');
+        // Closing the panel cancels any answer still streaming
+        if (state.aiChatAbort) {
+            state.aiChatAbort.abort();
+            state.aiChatAbort = null;
+        }
     }
 }
 
@@ -464,6 +500,7 @@ function addChatMessage(text, isUser = false) {
     
     elements.aiChatMessages.appendChild(messageDiv);
     elements.aiChatMessages.scrollTop = elements.aiChatMessages.scrollHeight;
+    return p;
 }
 
 /**
@@ -477,12 +514,37 @@ async function handleAIChatMessage() {
     addChatMessage(query, true);
     elements.aiChatInput.value = '';
     
-    // Get AI response
-    const insights = await getAIInsights(query);
-    if (insights.error) {
-        addChatMessage('Sorry, I encountered an error. Please try again.');
-    } else {
-        addChatMessage(insights.response || 'No response available');
+    // Stream AI response into a single message as tokens arrive
+    if (state.aiChatAbort) state.aiChatAbort.abort();
+    const controller = new AbortController();
+    state.aiChatAbort = controller;
+    const messageText = addChatMessage('...');
+    let received = '';
+
+    try {
+        const result = await streamAIInsights(query, delta => {
+            received += delta;
+            messageText.textContent = received;
+            elements.aiChatMessages.scrollTop = elements.aiChatMessages.scrollHeight;
+        }, controller.signal);
+        if (result.error) {
+            messageText.textContent = received || 'Sorry, I encountered an error. Please try again.';
+        } else if (!received) {
+            messageText.textContent = 'No response available';
+        }
+    } catch (error) {
+        if (error.name === 'AbortError') return;
+        console.error('Error streaming AI insights:', error);
+
+        // Fall back to the non-streaming endpoint
+        const insights = await getAIInsights(query);
+        if (insights.error) {
+            messageText.textContent = 'Sorry, I encountered an error. Please try again.';
+        } else {
+            messageText.textContent = insights.response || 'No response available';
+        }
+    } finally {
+        if (state.aiChatAbort === controller) state.aiChatAbort = null;
     }
 }
 
@@ -507,12 +569,7 @@ function setupAIChat() {
  */
 async function refreshData() {
     try {
-        await Promise.all([
-            fetchOdds(),
-            fetchMarketMovers(),
-            fetchPredictions(),
-            fetchRoughies()
-        ]);
+        await fetchDashboard();
         
         renderRaces();
         renderMarketMovers();
@@ -525,14 +582,91 @@ async function refreshData() {
 }
 
 /**
- * Setup auto-refresh interval
+ * Apply a live delta (changed races and runners) to local state
+ */
+function applyLiveDelta(delta) {
+    const racesById = new Map(state.races.map(race => [race.id, race]));
+
+    (delta.races || []).forEach(patch => {
+        const race = racesById.get(patch.id);
+        if (!race) return;
+        Object.assign(race, patch.changes || {});
+        (patch.horses || []).forEach(horsePatch => {
+            const horse = (race.horses || []).find(h => h.number === horsePatch.number);
+            if (horse) {
+                Object.assign(horse, horsePatch.changes);
+            } else {
+                race.horses = [...(race.horses || []), horsePatch.changes];
+            }
+        });
+        if (patch.removed) {
+            race.horses = (race.horses || []).filter(h => !patch.removed.includes(h.number));
+        }
+    });
+
+    (delta.added || []).forEach(race => {
+        if (racesById.has(race.id)) {
+            Object.assign(racesById.get(race.id), race);
+        } else {
+            state.races.push(race);
+        }
+    });
+
+    if (delta.movers) state.movers = delta.movers;
+    if (delta.predictions) state.predictions = delta.predictions;
+    if (delta.roughies) state.roughies = delta.roughies;
+}
+
+/**
+ * Subscribe to server-pushed live updates.
+ * The browser reconnects automatically and resumes from the last event id.
+ */
+function setupLiveUpdates() {
+    const source = new EventSource(`${CONFIG.API_BASE}/live`);
+    state.liveSource = source;
+
+    source.addEventListener('snapshot', (e) => {
+        const snapshot = JSON.parse(e.data);
+        state.liveSeq = snapshot.seq;
+        state.races = snapshot.races || [];
+        state.movers = snapshot.movers || [];
+        state.lastUpdate = new Date();
+        renderRaces();
+        renderMarketMovers();
+        updateTimestamp();
+    });
+
+    source.addEventListener('delta', (e) => {
+        const delta = JSON.parse(e.data);
+        if (state.liveSeq !== null && delta.seq <= state.liveSeq) return;
+        state.liveSeq = delta.seq;
+        applyLiveDelta(delta);
+        state.lastUpdate = new Date();
+        renderRaces();
+        if (delta.movers) renderMarketMovers();
+        if (delta.predictions) renderPredictions();
+        if (delta.roughies) renderRoughies();
+        updateTimestamp();
+    });
+
+    source.addEventListener('error', () => {
+        console.warn('Live updates disconnected, reconnecting...');
+    });
+}
+
+/**
+ * Setup data updates: one initial load, then live push
+ * (polling only when the browser has no EventSource support)
  */
 function setupAutoRefresh() {
     // Initial load
     refreshData();
     
-    // Refresh every 10 seconds
-    setInterval(refreshData, CONFIG.REFRESH_INTERVAL);
+    if (window.EventSource) {
+        setupLiveUpdates();
+    } else {
+        setInterval(refreshData, CONFIG.REFRESH_INTERVAL);
+    }
 }
 
 // ========================================
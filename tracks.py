@@ -0,0 +1,14 @@
+"""
+Australian racetracks for the Horse Racing Dashboard
+Venues by state; kept free of app imports so tools like the benchmarks can use it
+"""
+
+AUSTRALIAN_TRACKS = {
+    "NSW": ["Randwick", "Rosehill", "Canterbury", "Warwick Farm", "Goulburn", "Canberra"],
+    "VIC": ["Flemington", "Caulfield", "Moonee Valley", "Sandown", "Bendigo", "Ballarat"],
+    "QLD": ["Eagle Farm", "Doomben", "Gold Coast", "Sunshine Coast", "Townsville", "Rockhampton"],
+    "WA": ["Ascot", "Belmont", "Northam"],
+    "SA": ["Morphettville", "Cheltenham", "Barossa Park"],
+    "TAS": ["Hobart", "Launceston"],
+    "ACT": ["Canberra Racecourse"]
+}
@@ -0,0 +1,74 @@
+"""
+Dataset versioning for the Horse Racing Dashboard
+Monotonic per-dataset versions backing ETag/304 responses and ?since= deltas
+"""
+
+from collections import deque
+from datetime import datetime
+import time
+
+
+class DatasetVersion:
+    """Monotonically increasing version of one dataset (races, movers, ...)
+
+    Versions start from the process start time in milliseconds so they keep
+    increasing across restarts. Each bump can record which keys (e.g. race
+    ids) changed; the last ``history`` bumps are kept for ``changed_since``.
+    """
+
+    def __init__(self, name: str, history: int = 1000):
+        self.name = name
+        self.version = int(time.time() * 1000)
+        self.updated_at = datetime.now().isoformat()
+        self._changes = deque(maxlen=history)
+        self._oldest = self.version
+
+    @property
+    def etag(self) -> str:
+        return f'W/"{self.name}-{self.version}"'
+
+    def bump(self, keys=None, version: int = None) -> int:
+        """Record a change (optionally of specific keys); returns the new version
+
+        ``version`` adopts a version assigned by another worker.
+        """
+        self.version = self.version + 1 if version is None else version
+        self.updated_at = datetime.now().isoformat()
+        if len(self._changes) == self._changes.maxlen:
+            self._oldest = self._changes[0][0]
+        self._changes.append((self.version, frozenset(keys) if keys is not None else None))
+        return self.version
+
+    def reset(self, version: int):
+        """Adopt another worker's version, forgetting the change history"""
+        self.version = version
+        self.updated_at = datetime.now().isoformat()
+        self._changes.clear()
+        self._oldest = version
+
+    def matches(self, if_none_match: str) -> bool:
+        """True if an If-None-Match header names the current version"""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in tags or self.etag[2:] in tags
+
+    def changed_since(self, version: int):
+        """Keys changed after ``version``
+
+        Returns an empty set if nothing changed, or None when the answer is
+        unknown (version too old, from the future, or a bump without keys)
+        and the caller should send the full dataset.
+        """
+        if version == self.version:
+            return set()
+        if version > self.version or version < self._oldest:
+            return None
+        changed = set()
+        for bumped, keys in self._changes:
+            if bumped <= version:
+                continue
+            if keys is None:
+                return None
+            changed.update(keys)
+        return changed